@@ -0,0 +1,475 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     hermetic.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+
+# Python specific imports
+import os
+import json
+import shutil
+import struct
+import tempfile
+import zlib
+from hashlib import sha256
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from StringIO import StringIO
+
+# rce specific imports
+#   The settings have to be loaded without the path checks before any other
+#   module of the cloud engine is imported, as the containers' filesystem is
+#   not needed for this measurement.
+from rce.util.settings import getSettings
+settings = getSettings(checks=False)
+
+# ROS specific imports
+from rospkg.environment import get_ros_paths
+
+# twisted specific imports
+from twisted.internet.defer import Deferred, DeferredList
+from twisted.cred.portal import Portal
+from twisted.cred.credentials import UsernamePassword
+from twisted.spread.pb import Referenceable, PBClientFactory, PBServerFactory
+from twisted.web.server import Site
+
+# Autobahn specific imports
+from autobahn.websocket import listenWS
+
+# rce specific imports
+from rce.client.connection import Connection
+from rce.comm.server import CloudEngineWebSocketFactory, RobotResource
+from rce.master import RoboEarthCloudEngine, UserRealm
+from rce.robot import RobotClient
+from rce.slave.endpoint import Endpoint
+from rce.slave.interface import Interface, Types
+from rce.slave.namespace import Namespace
+from rce.util.converter import Converter
+from rce.util.cred import RCECredChecker, RCEInternalChecker, encodeAES, \
+    cipher, salter
+from rce.util.loader import Loader
+
+# local imports
+from base import PASSES, SIZES, delay, LocalTest
+
+
+# Codecs which can be measured; 'json' uses Converters and 'binary' uses
+# Forwarders in the robot process
+CODECS = ('json', 'binary')
+
+# Passwords used for the temporary credentials database
+_ADMIN = 'admin'
+_INFRA = 'admin'
+_USER = 'testUser'
+
+# Offsets of the used ports from the base port
+_INTERNAL_PORT = 0  # Master: Perspective Broker for the slave processes
+_HTTP_PORT = 1  # Master: Distribution of the robot connections
+_CONSOLE_PORT = 2  # Master: Perspective Broker for the users
+_COMM_PORT = 3  # Robot: Cloud engine internal communication
+_WS_PORT = 4  # Robot: WebSocket connections
+_ENV_PORT = 10  # Environments: Cloud engine internal communication
+
+
+def _encode(data):
+    """ Serialize a string as ROS message of type 'std_msgs/String' as the
+        robot process expects it for a Forwarder.
+    """
+    msg = struct.pack('<I', len(data)) + data
+
+    if settings.gzip_lvl:
+        msg = zlib.compress(msg, settings.gzip_lvl)
+
+    return msg
+
+
+def _decode(msg):
+    """ Deserialize a ROS message of type 'std_msgs/String' which was received
+        from a Forwarder.
+    """
+    if settings.gzip_lvl:
+        msg = zlib.decompress(msg)
+
+    length, = struct.unpack('<I', msg[:4])
+    return msg[4:4 + length]
+
+
+class StubPublisherInterface(Interface):
+    """ Stub of the environment-side Publisher which, instead of publishing
+        the messages to ROS, echoes them to the Subscriber whose address is
+        the own address with 'Req' replaced by 'Resp', like the node
+        'stringEcho.py' of the package 'Test'.
+    """
+    def __init__(self, owner, uid, msgType, addr):
+        Interface.__init__(self, owner, uid, addr)
+
+    def _send(self, msg, msgID, protocol, remoteID):
+        self._owner.echo(self._addr.replace('Req', 'Resp'), msg, msgID)
+
+
+class StubSubscriberInterface(Interface):
+    """ Stub of the environment-side Subscriber which receives the messages
+        from the matching stub Publisher instead of ROS.
+    """
+    def __init__(self, owner, uid, msgType, addr):
+        Interface.__init__(self, owner, uid, addr)
+
+
+class StubServiceClientInterface(Interface):
+    """ Stub of the environment-side Service-Client which, instead of calling
+        a ROS service, responds with the request. Therefore, only services
+        whose request and response have the same format can be used.
+    """
+    def __init__(self, owner, uid, msgType, addr):
+        Interface.__init__(self, owner, uid, addr)
+
+    def _send(self, msg, msgID, protocol, remoteID):
+        self.respond(msg, msgID, protocol, remoteID)
+
+
+class StubEnvironment(Namespace):
+    """ Namespace of the stub environment which uses the stub interfaces
+        instead of the ROS interfaces.
+    """
+    def __init__(self, endpoint, uid):
+        Namespace.__init__(self, endpoint, uid)
+
+        interface_map = {
+            Types.encode('PublisherInterface') : StubPublisherInterface,
+            Types.encode('SubscriberInterface') : StubSubscriberInterface,
+            Types.encode('ServiceClientInterface') : StubServiceClientInterface
+        }
+        self._map.update(interface_map)
+
+    def echo(self, addr, msg, msgID):
+        """ Forward a message to the stub Subscriber with the given address.
+        """
+        try:
+            self._interfaces[addr].received(msg, msgID)
+        except KeyError:
+            pass
+
+
+class StubEnvironmentClient(Endpoint):
+    """ Environment endpoint which runs in the process of the measurement and
+        does not need a container or a ROS master.
+    """
+    def __init__(self, reactor, loader, commPort, uid):
+        Endpoint.__init__(self, reactor, loader, commPort)
+        self._uid = uid
+
+    def createEnvironment(self, _):
+        return self._avatar.callRemote('setupNamespace',
+                                       StubEnvironment(self, self._uid))
+
+    def remote_addUsertoROSProxy(self, userID, key):
+        pass
+
+    def remote_removeUserfromROSProxy(self, userID):
+        pass
+
+
+class StubContainer(Referenceable):
+    """ Stub of a container which is represented by its environment endpoint.
+    """
+    def __init__(self, client, port):
+        self._client = client
+        self._port = port
+
+    def remote_getPort(self):
+        return self._port
+
+    def remote_destroy(self):
+        if self._client:
+            self._client.terminate()
+            self._client = None
+
+
+class StubContainerClient(Referenceable):
+    """ Stub of the Container Client which, instead of starting a container,
+        creates a stub environment endpoint in the same process.
+    """
+    def __init__(self, reactor, masterPort, envPort):
+        self._reactor = reactor
+        self._masterPort = masterPort
+        self._envPort = envPort
+
+        self._masterPasswd = sha256(_ADMIN).hexdigest()
+        self._infraPasswd = sha256(_INFRA).hexdigest()
+
+    def remote_createContainer(self, uid, data):
+        port = self._envPort
+        self._envPort += 1
+
+        client = StubEnvironmentClient(self._reactor, None, port, uid)
+        passwd = encodeAES(cipher(self._masterPasswd),
+                           salter(uid, self._infraPasswd))
+
+        factory = PBClientFactory()
+        self._reactor.connectTCP('localhost', self._masterPort, factory)
+
+        d = factory.login(UsernamePassword(uid, passwd), (client, uid))
+        d.addCallback(client.registerAvatar)
+        d.addCallback(client.createEnvironment)
+
+        return StubContainer(client, port)
+
+
+class HermeticTest(LocalTest):
+    def __init__(self, conn, iTag, codec):
+        super(HermeticTest, self).__init__(conn, iTag, codec)
+
+    def _activate(self):
+        super(HermeticTest, self)._activate()
+
+        self._pub = self._conn.publisher(self._iTag[0], 'std_msgs/String')
+        self._sub = self._conn.subscriber(self._iTag[1], 'std_msgs/String',
+                                          self._resp)
+
+    def _deactivate(self):
+        self._pub = None
+        self._sub.unsubscribe()
+        self._sub = None
+
+    def _sendReq(self):
+        if self._testType == 'json':
+            self._pub.publish({'data' : self._str})
+        else:
+            self._pub.publish(StringIO(_encode(self._str)))
+
+    def _resp(self, msg):
+        if self._testType == 'json':
+            data = msg['data']
+        else:
+            data = _decode(msg.getvalue())
+
+        super(HermeticTest, self)._resp(data)
+
+    def __str__(self):
+        return json.dumps({'label' : 'hermetic {0}'.format(self._testType),
+                           'data' : self._data})
+
+
+class Measurement(object):
+    CTAG = 'hermetic'
+    ITYPES = {'json' : ('SubscriberConverter', 'PublisherConverter'),
+              'binary' : ('SubscriberForwarder', 'PublisherForwarder')}
+
+    def __init__(self, runs, conn, robot, codecs, reactor):
+        self._conn = conn
+        self._robot = robot
+        self._codecs = codecs
+
+        self._tests = [HermeticTest(conn, ('req_' + codec, 'resp_' + codec),
+                                    codec) for codec in codecs]
+
+        self._deferred = d = Deferred()
+
+        d.addCallback(self._setup)
+        d.addCallback(delay, 5, reactor)
+
+        for _ in xrange(runs):
+            for test in self._tests:
+                d.addCallback(test.run)
+
+        d.addCallback(self._postProcess)
+        d.addCallback(delay, 2, reactor)
+
+        def stop(_):
+            reactor.stop()
+            print('\ndone')
+
+        d.addCallback(stop)
+
+    def run(self, _):
+        if not self._tests:
+            print('No tests to run.')
+            return
+
+        if self._deferred.called:
+            print('Can run the measurement only once.')
+
+        self._deferred.callback(None)
+
+    def _setup(self, _):
+        print('Setup environment...')
+
+        self._conn.createContainer(self.CTAG)
+        cls = 'std_msgs/String'
+
+        for codec in self._codecs:
+            reqType, respType = self.ITYPES[codec]
+
+            tag = 'req_' + codec
+            self._conn.addInterface(self.CTAG, tag, 'PublisherInterface', cls,
+                                    'echoReq_' + codec)
+            self._conn.addInterface(self._robot, tag, reqType, cls)
+            self._conn.addConnection('{0}/{1}'.format(self.CTAG, tag),
+                                     '{0}/{1}'.format(self._robot, tag))
+
+            tag = 'resp_' + codec
+            self._conn.addInterface(self.CTAG, tag, 'SubscriberInterface', cls,
+                                    'echoResp_' + codec)
+            self._conn.addInterface(self._robot, tag, respType, cls)
+            self._conn.addConnection('{0}/{1}'.format(self.CTAG, tag),
+                                     '{0}/{1}'.format(self._robot, tag))
+
+    def _postProcess(self, _):
+        with open('hermetic.data', 'w') as f:
+            f.write(json.dumps(SIZES))
+            f.write('\n')
+
+            for test in self._tests:
+                f.write(str(test))
+                f.write('\n')
+
+        self._conn.destroyContainer(self.CTAG)
+
+
+def _startMaster(reactor, pwFile, port):
+    """ Start the Master with a temporary credentials database.
+    """
+    extCred = RCECredChecker(pwFile, True)
+    extCred.addUser('admin', _ADMIN, True)
+    extCred.addUser('adminInfra', _INFRA, True)
+    extCred.addUser(_USER, _USER, True)
+    intCred = RCEInternalChecker(extCred)
+
+    rce = RoboEarthCloudEngine(reactor, extCred, port + _COMM_PORT)
+    intCred.add_checker(rce.checkUIDValidity)
+
+    reactor.listenTCP(port + _INTERNAL_PORT,
+                      PBServerFactory(Portal(rce, (intCred,))))
+    reactor.listenTCP(port + _CONSOLE_PORT,
+                      PBServerFactory(Portal(UserRealm(rce), (extCred,))))
+    reactor.listenTCP(port + _HTTP_PORT, Site(RobotResource(rce)))
+
+    reactor.addSystemEventTrigger('before', 'shutdown', rce.preShutdown)
+    reactor.addSystemEventTrigger('after', 'shutdown', rce.postShutdown)
+
+
+def _startMachine(reactor, port):
+    """ Start the stub Container Client and login to the Master.
+    """
+    client = StubContainerClient(reactor, port + _INTERNAL_PORT,
+                                 port + _ENV_PORT)
+    data = {'size':100, 'cpu':0, 'memory':0, 'bandwidth':0}
+
+    factory = PBClientFactory()
+    reactor.connectTCP('localhost', port + _INTERNAL_PORT, factory)
+
+    cred = UsernamePassword('container', sha256(_INFRA).hexdigest())
+    return factory.login(cred, (client, data))
+
+
+def _startRobot(reactor, port):
+    """ Start the Robot Client and login to the Master.
+    """
+    loader = Loader(get_ros_paths())
+    converter = Converter(loader)
+
+    client = RobotClient(reactor, 'localhost', port + _CONSOLE_PORT,
+                         port + _COMM_PORT, 'localhost', port + _WS_PORT,
+                         loader, converter)
+
+    factory = PBClientFactory()
+    reactor.connectTCP('localhost', port + _INTERNAL_PORT, factory)
+
+    cred = UsernamePassword('robot', sha256(_INFRA).hexdigest())
+    d = factory.login(cred, client)
+    d.addCallback(lambda ref: setattr(client, '_avatar', ref))
+
+    listenWS(CloudEngineWebSocketFactory(client, 'ws://localhost:{0}'.format(
+                                                     port + _WS_PORT)))
+    reactor.addSystemEventTrigger('before', 'shutdown', client.terminate)
+
+    return d
+
+
+def _get_argparse():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(prog='hermetic',
+                            description='Run communication measurement for RCE '
+                                        'between a robot and a stub '
+                                        'environment using a string message. '
+                                        'The Master, the Robot process and '
+                                        'the environment run in this process, '
+                                        'such that neither containers nor a '
+                                        'ROS master are necessary.')
+
+    parser.add_argument('--passes', help='Number of passes to do.',
+                        type=int, default=PASSES)
+    parser.add_argument('--codec', help='Codecs which should be measured.',
+                        type=str, choices=CODECS, action='append')
+    parser.add_argument('--port', help='First port of the range of ports '
+                                       'used by the processes.',
+                        type=int, default=18000)
+
+    return parser
+
+
+def main(reactor, passes, codecs, port):
+    robot = 'testRobot'
+    tmpDir = tempfile.mkdtemp()
+    reactor.addSystemEventTrigger('after', 'shutdown', shutil.rmtree, tmpDir,
+                                  True)
+
+    _startMaster(reactor, os.path.join(tmpDir, 'credentials'), port)
+
+    connection = Connection(_USER, robot, _USER, reactor)
+    measurement = Measurement(passes, connection, robot, codecs, reactor)
+
+    def connect(_):
+        print('Connect...')
+        d = Deferred()
+        d.addCallback(measurement.run)
+        connection.connect('http://localhost:{0}/'.format(port + _HTTP_PORT),
+                           d)
+
+    def err(reason):
+        print(reason)
+        reactor.stop()
+
+    d = DeferredList([_startMachine(reactor, port), _startRobot(reactor, port)],
+                     fireOnOneErrback=True, consumeErrors=True)
+    d.addCallback(connect)
+    d.addErrback(err)
+
+    reactor.run()
+
+
+if __name__ == '__main__':
+    from twisted.internet import reactor
+
+    args = _get_argparse().parse_args()
+
+    main(reactor, args.passes, args.codec or CODECS, args.port)
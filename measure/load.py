@@ -0,0 +1,532 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     load.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+
+# Python specific imports
+import time
+import json
+import random
+
+# twisted specific imports
+from twisted.internet.defer import Deferred, DeferredList
+from twisted.internet.task import LoopingCall
+
+# rce specific imports
+from rce.client.connection import Connection
+
+# local imports
+from base import PASSES, delay
+
+
+# Default target rates per interface in Hz
+RATES = [1, 2, 5, 10, 20, 30, 50, 100]
+
+# Time in seconds after which an unanswered request is counted as dropped
+TIMEOUT = 5.0
+
+# Time in seconds at the beginning of each step which is not measured
+WARMUP = 2.0
+
+# Length in seconds of the windows of the timeline
+WINDOW = 1.0
+
+# Reported latency percentiles
+PERCENTILES = (('p50', 50.0), ('p95', 95.0), ('p99', 99.0), ('p999', 99.9))
+
+
+def percentile(values, q):
+    """ Get the percentile of a sorted list of values using the nearest rank
+        method; -1.0 is returned for an empty list to mark the measurement as
+        invalid.
+    """
+    if not values:
+        return -1.0
+
+    rank = int(q / 100.0 * len(values) + 0.5)
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+class LoadStats(object):
+    """ Statistics of all interfaces which are collected for the current step
+        and for the current window of the timeline.
+    """
+    def __init__(self):
+        self._timeline = []
+        self._window = None
+        self.reset()
+
+    def reset(self):
+        """ Start a new measurement, i.e. discard all collected values. """
+        self._start = time.time()
+        self._stop = None
+        self._sent = 0
+        self._received = 0
+        self._dropped = 0
+        self._latencies = []
+
+    def stop(self):
+        """ Stop the current measurement; only responses and drops of the
+            requests which were sent before are still counted.
+        """
+        self._stop = time.time()
+
+    def _measured(self, sent):
+        """ Check whether a request which was sent at the given time belongs
+            to the current measurement.
+        """
+        return self._start <= sent and (self._stop is None or
+                                        sent <= self._stop)
+
+    def sent(self, sent):
+        if self._measured(sent):
+            self._sent += 1
+
+        self._window[0] += 1
+
+    def received(self, sent, latency):
+        if self._measured(sent):
+            self._received += 1
+            self._latencies.append(latency * 1000)
+
+        self._window[1] += 1
+        self._window[3].append(latency * 1000)
+
+    def dropped(self, sent):
+        if self._measured(sent):
+            self._dropped += 1
+
+        self._window[2] += 1
+
+    def startWindow(self, step):
+        """ Start a new window of the timeline for the given step. """
+        self._window = [0, 0, 0, [], step, time.time()]
+
+    def endWindow(self):
+        """ Add the current window to the timeline. """
+        sent, received, dropped, latencies, step, start = self._window
+        duration = time.time() - start
+        latencies.sort()
+
+        self._timeline.append({'time':start, 'step':step,
+                               'sent':sent / duration,
+                               'received':received / duration,
+                               'dropped':dropped,
+                               'p99':percentile(latencies, 99.0)})
+        self.startWindow(step)
+
+    def result(self):
+        """ Get the result of the current measurement as a dictionary
+            containing the throughput in messages per second, the number of
+            dropped messages and the latency percentiles in milliseconds.
+        """
+        duration = (self._stop or time.time()) - self._start
+        latencies = sorted(self._latencies)
+
+        result = {'sent':self._sent / duration,
+                  'throughput':self._received / duration,
+                  'drops':self._dropped}
+
+        for label, q in PERCENTILES:
+            result[label] = percentile(latencies, q)
+
+        return result
+
+    @property
+    def timeline(self):
+        """ List of all windows of the timeline. """
+        return self._timeline
+
+
+class LoadInterface(object):
+    """ Single interface of a robot which sends requests at the target rate
+        without waiting for the responses and matches the echoed responses to
+        the requests using a sequence number.
+    """
+    def __init__(self, conn, iTag, stats):
+        self._conn = conn
+        self._iTag = iTag
+        self._stats = stats
+
+        self._seq = 0
+        self._outstanding = {}
+        self._payload = ''
+
+        self._loop = LoopingCall(self._send)
+        self._loop.clock = conn.reactor
+        self._call = None
+        self._active = False
+
+    def _activate(self):
+        pass
+
+    def _deactivate(self):
+        pass
+
+    def _request(self, data):
+        raise NotImplementedError
+
+    def start(self, rate, payload):
+        if not self._active:
+            self._activate()
+            self._active = True
+
+        self._payload = payload
+
+        # Spread the requests of the interfaces over the period
+        self._call = self._conn.reactor.callLater(random.random() / rate,
+                                                  self._loop.start, 1.0 / rate)
+
+    def stop(self):
+        if self._call and self._call.active():
+            self._call.cancel()
+
+        self._call = None
+
+        if self._loop.running:
+            self._loop.stop()
+
+    def expire(self, deadline):
+        """ Count all requests which were sent before the deadline and which
+            are still unanswered as dropped.
+        """
+        for seq, sent in [(seq, sent) for seq, sent
+                          in self._outstanding.iteritems() if sent < deadline]:
+            del self._outstanding[seq]
+            self._stats.dropped(sent)
+
+    def close(self):
+        self.stop()
+
+        if self._active:
+            self._deactivate()
+            self._active = False
+
+    def _send(self):
+        self._seq += 1
+        self._outstanding[self._seq] = sent = time.time()
+        self._stats.sent(sent)
+        self._request('{0}:{1}'.format(self._seq, self._payload))
+
+    def _response(self, data):
+        stop = time.time()
+
+        try:
+            seq = int(data.split(':', 1)[0])
+        except ValueError:
+            return
+
+        # Responses to requests which are already dropped are ignored
+        sent = self._outstanding.pop(seq, None)
+
+        if sent is not None:
+            self._stats.received(sent, stop - sent)
+
+
+class LoadServiceInterface(LoadInterface):
+    def _activate(self):
+        self._srv = self._conn.serviceClient(self._iTag, 'Test/StringEcho')
+
+    def _deactivate(self):
+        self._srv = None
+
+    def _request(self, data):
+        self._srv.call({'data' : data},
+                       lambda resp: self._response(resp['data']))
+
+
+class LoadTopicInterface(LoadInterface):
+    def _activate(self):
+        self._pub = self._conn.publisher(self._iTag[0], 'std_msgs/String')
+        self._sub = self._conn.subscriber(self._iTag[1], 'std_msgs/String',
+                                          self._resp)
+
+    def _deactivate(self):
+        self._pub = None
+        self._sub.unsubscribe()
+        self._sub = None
+
+    def _request(self, data):
+        self._pub.publish({'data' : data})
+
+    def _resp(self, msg):
+        self._response(msg['data'])
+
+
+class LoadMeasurement(object):
+    """ Measurement which drives several connections with multiple interfaces
+        each at a ladder of target rates to get the saturation curve of the
+        cloud engine.
+    """
+    CTAG = 'load'
+
+    def __init__(self, runs, conns, robots, nrInterfaces, mode, rates,
+                 duration, size, reactor):
+        self._conns = conns
+        self._robots = robots
+        self._nrInterfaces = nrInterfaces
+        self._mode = mode
+        self._rates = rates
+        self._reactor = reactor
+
+        self._stats = LoadStats()
+        self._payload = 'A' * size
+        self._results = []
+
+        if mode == 'service':
+            cls = LoadServiceInterface
+        else:
+            cls = LoadTopicInterface
+
+        self._interfaces = [cls(conn, self._tag(i, j), self._stats)
+                            for i, conn in enumerate(conns)
+                            for j in xrange(nrInterfaces)]
+
+        self._sweep = LoopingCall(self._expire)
+        self._sweep.clock = reactor
+
+        self._deferred = d = Deferred()
+
+        d.addCallback(self._setup)
+        d.addCallback(delay, 20, reactor)
+
+        for run in xrange(runs):
+            for rate in rates:
+                d.addCallback(self._step, run, rate, duration)
+
+        d.addCallback(self._postProcess)
+        d.addCallback(delay, 2, reactor)
+
+        def stop(_):
+            reactor.stop()
+            print('\ndone')
+
+        d.addCallback(stop)
+
+    def _tag(self, i, j):
+        if self._mode == 'service':
+            return 'echo{0}'.format(j)
+        else:
+            return ('req_{0}_{1}'.format(i, j), 'resp_{0}_{1}'.format(i, j))
+
+    def run(self, _):
+        if self._deferred.called:
+            print('Can run the measurement only once.')
+            return
+
+        self._deferred.callback(None)
+
+    def _setup(self, _):
+        print('Setup environment...')
+
+        master = self._conns[0]
+        master.createContainer(self.CTAG)
+
+        if self._mode == 'service':
+            # All interfaces use the same service of a single echo node
+            master.addNode(self.CTAG, 'strEcho', 'Test', 'stringEcho.py')
+            master.addInterface(self.CTAG, 'echo', 'ServiceClientInterface',
+                                'Test/StringEcho', 'stringEchoService')
+
+            for conn, robot in zip(self._conns, self._robots):
+                for j in xrange(self._nrInterfaces):
+                    tag = self._tag(None, j)
+                    conn.addInterface(robot, tag, 'ServiceProviderConverter',
+                                      'Test/StringEcho')
+                    conn.addConnection('{0}/echo'.format(self.CTAG),
+                                       '{0}/{1}'.format(robot, tag))
+        else:
+            # Each interface uses its own echo node to avoid that the echoed
+            # messages are broadcast to all interfaces
+            cls = 'std_msgs/String'
+
+            for i, (conn, robot) in enumerate(zip(self._conns, self._robots)):
+                for j in xrange(self._nrInterfaces):
+                    ns = '/r{0}i{1}'.format(i, j)
+                    req, resp = self._tag(i, j)
+
+                    master.addNode(self.CTAG, 'strEcho_{0}_{1}'.format(i, j),
+                                   'Test', 'stringEcho.py', namespace=ns)
+
+                    master.addInterface(self.CTAG, req, 'PublisherInterface',
+                                        cls, '{0}/stringEchoReq'.format(ns))
+                    conn.addInterface(robot, req, 'SubscriberConverter',
+                                      cls)
+                    conn.addConnection('{0}/{1}'.format(self.CTAG, req),
+                                       '{0}/{1}'.format(robot, req))
+
+                    master.addInterface(self.CTAG, resp, 'SubscriberInterface',
+                                        cls, '{0}/stringEchoResp'.format(ns))
+                    conn.addInterface(robot, resp, 'PublisherConverter',
+                                      cls)
+                    conn.addConnection('{0}/{1}'.format(self.CTAG, resp),
+                                       '{0}/{1}'.format(robot, resp))
+
+    def _expire(self):
+        deadline = time.time() - TIMEOUT
+
+        for interface in self._interfaces:
+            interface.expire(deadline)
+
+        self._stats.endWindow()
+
+    def _step(self, _, run, rate, duration):
+        print('Pass {0}: {1} Hz per interface...'.format(run + 1, rate))
+
+        step = len(self._results)
+        self._stats.startWindow(step)
+        self._sweep.start(WINDOW, now=False)
+
+        for interface in self._interfaces:
+            interface.start(rate, self._payload)
+
+        d = delay(None, WARMUP, self._reactor)
+        d.addCallback(lambda _: self._stats.reset())
+        d.addCallback(delay, duration, self._reactor)
+        d.addCallback(self._stopStep)
+
+        # Wait until all outstanding requests are answered or dropped
+        d.addCallback(delay, TIMEOUT + WINDOW, self._reactor)
+        d.addCallback(self._finishStep, run, rate)
+        return d
+
+    def _stopStep(self, _):
+        self._stats.stop()
+
+        for interface in self._interfaces:
+            interface.stop()
+
+    def _finishStep(self, _, run, rate):
+        self._sweep.stop()
+        self._expire()
+
+        result = self._stats.result()
+        result['pass'] = run
+        result['rate'] = rate
+        self._results.append(result)
+
+        print('    {0:.1f} msg/s, p50 {1:.1f} ms, p99 {2:.1f} ms, '
+              '{3} drops'.format(result['throughput'], result['p50'],
+                                 result['p99'], result['drops']))
+
+    def _writeData(self, fileName, labels):
+        """ Write the results in the format which is used by 'plot.py'; the
+            first column contains the pass and the first row the offered load
+            in messages per second.
+        """
+        nr = len(self._interfaces)
+        runs = sorted(set(r['pass'] for r in self._results))
+
+        with open(fileName, 'w') as f:
+            f.write(json.dumps(['rate'] + [rate * nr for rate in self._rates]))
+            f.write('\n')
+
+            for label in labels:
+                data = [[run] + [r[label] for r in self._results
+                                 if r['pass'] == run]
+                        for run in runs]
+                f.write(json.dumps({'label' : label, 'data' : data}))
+                f.write('\n')
+
+    def _postProcess(self, _):
+        for interface in self._interfaces:
+            interface.close()
+
+        self._writeData('load.data', [label for label, _ in PERCENTILES])
+        self._writeData('load-throughput.data', ['throughput', 'drops'])
+
+        with open('load-timeline.data', 'w') as f:
+            for window in self._stats.timeline:
+                f.write(json.dumps(window))
+                f.write('\n')
+
+        self._conns[0].destroyContainer(self.CTAG)
+
+
+def _get_argparse():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(prog='load',
+                            description='Run load measurement for RCE which '
+                                        'drives several concurrent connections '
+                                        'with multiple interfaces each at '
+                                        'increasing target rates.')
+
+    parser.add_argument('--passes', help='Number of passes to do.',
+                        type=int, default=PASSES)
+    parser.add_argument('--robots', help='Number of concurrent connections.',
+                        type=int, default=10)
+    parser.add_argument('--interfaces', help='Number of interfaces per '
+                                             'connection.',
+                        type=int, default=1)
+    parser.add_argument('--mode', help='Type of the interfaces.', type=str,
+                        choices=('service', 'topic'), default='service')
+    parser.add_argument('--rates', help='Target rates per interface in Hz.',
+                        type=float, nargs='+', default=RATES)
+    parser.add_argument('--duration', help='Time in seconds each rate is '
+                                           'measured.',
+                        type=float, default=10.0)
+    parser.add_argument('--size', help='Number of characters in a message.',
+                        type=int, default=100)
+    parser.add_argument('ipMaster', help='IP address of master process.',
+                        type=str)
+
+    return parser
+
+
+def main(reactor, passes, robots, interfaces, mode, rates, duration, size,
+         ip):
+    user = 'testUser'
+    robots = ['testRobot{0}'.format(i) for i in xrange(robots)]
+    connections = [Connection(user, robot, user, reactor) for robot in robots]
+    measurement = LoadMeasurement(passes, connections, robots, interfaces,
+                                  mode, rates, duration, size, reactor)
+
+    print('Connect...')
+    deferreds = []
+
+    for connection in connections:
+        d = Deferred()
+        connection.connect('http://{0}:9000/'.format(ip), d)
+        deferreds.append(d)
+
+    d = DeferredList(deferreds, fireOnOneErrback=True)
+    d.addCallback(measurement.run)
+
+    reactor.run()
+
+
+if __name__ == '__main__':
+    from twisted.internet import reactor
+
+    args = _get_argparse().parse_args()
+
+    main(reactor, args.passes, args.robots, args.interfaces, args.mode,
+         args.rates, args.duration, args.size, args.ipMaster)
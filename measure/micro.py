@@ -0,0 +1,418 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     micro.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+
+# Python specific imports
+import sys
+import json
+import time
+import random
+from uuid import uuid4
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from StringIO import StringIO
+
+# ROS specific imports
+from rospkg.environment import get_ros_paths
+
+# twisted specific imports
+from twisted.test.proto_helpers import StringTransport
+
+# rce specific imports
+from rce.comm import types
+from rce.comm.assembler import recursiveBinarySearch, MessageAssembler
+from rce.slave.interface import Types
+from rce.slave.protocol import RCEInternalProtocol
+from rce.util.converter import Converter
+from rce.util.converters.image import ImageConverter
+from rce.util.loader import Loader
+
+
+# Names of all interface types
+_INTERFACE_TYPES = [Types.decode(nr) for nr in xrange(12)]
+
+
+###
+### Fixtures
+###
+
+def _header(msg, frame):
+    msg.header.seq = 42
+    msg.header.stamp.secs = 1364000000
+    msg.header.frame_id = frame
+
+
+def _laserScan(loader):
+    msg = loader.loadMsg('sensor_msgs', 'LaserScan')()
+    _header(msg, '/base_laser')
+    msg.angle_min = -2.35
+    msg.angle_max = 2.35
+    msg.angle_increment = 0.0065
+    msg.range_min = 0.02
+    msg.range_max = 30.0
+    msg.ranges = [random.uniform(0.02, 30.0) for _ in xrange(720)]
+    msg.intensities = [random.uniform(0.0, 1.0) for _ in xrange(720)]
+    return msg
+
+
+def _image(loader):
+    msg = loader.loadMsg('sensor_msgs', 'Image')()
+    _header(msg, '/camera')
+    msg.height = 240
+    msg.width = 320
+    msg.encoding = 'rgb8'
+    msg.step = 3 * 320
+    msg.data = ''.join(chr(random.randint(0, 255))
+                       for _ in xrange(3 * 320 * 240))
+    return msg
+
+
+def _pointCloud(loader):
+    msg = loader.loadMsg('sensor_msgs', 'PointCloud2')()
+    fieldCls = loader.loadMsg('sensor_msgs', 'PointField')
+    _header(msg, '/camera')
+    msg.height = 1
+    msg.width = 5000
+    msg.point_step = 16
+    msg.row_step = 16 * 5000
+    msg.is_dense = True
+
+    for i, name in enumerate('xyz'):
+        msg.fields.append(fieldCls(name=name, offset=4 * i, datatype=7,
+                                   count=1))
+
+    msg.data = [random.randint(0, 255) for _ in xrange(16 * 5000)]
+    return msg
+
+
+def _tf(loader):
+    try:
+        msg = loader.loadMsg('tf2_msgs', 'TFMessage')()
+    except Exception:
+        msg = loader.loadMsg('tf', 'tfMessage')()
+
+    transformCls = loader.loadMsg('geometry_msgs', 'TransformStamped')
+
+    for i in xrange(10):
+        transform = transformCls()
+        _header(transform, '/link{0}'.format(i))
+        transform.child_frame_id = '/link{0}'.format(i + 1)
+        transform.transform.translation.x = 0.1 * i
+        transform.transform.rotation.w = 1.0
+        msg.transforms.append(transform)
+
+    return msg
+
+
+def _serviceRequest(loader):
+    msg = loader.loadSrv('nav_msgs', 'GetPlan')._request_class()
+
+    for pose, x in ((msg.start, 1.0), (msg.goal, 5.0)):
+        _header(pose, '/map')
+        pose.pose.position.x = x
+        pose.pose.position.y = -x
+        pose.pose.orientation.w = 1.0
+
+    msg.tolerance = 0.5
+    return msg
+
+
+# Fixtures as tuples (name, factory)
+FIXTURES = (('LaserScan', _laserScan),
+            ('Image', _image),
+            ('PointCloud2', _pointCloud),
+            ('TF', _tf),
+            ('GetPlanRequest', _serviceRequest))
+
+
+###
+### Helpers
+###
+
+class _Receiver(object):
+    """ Stub for the protocol of the assembler and for the endpoint and the
+        interface of the internal protocol.
+    """
+    def __init__(self):
+        self.UID = uuid4()
+
+    def processCompleteMessage(self, msg):
+        pass
+
+    def registerProtocol(self, protocol):
+        pass
+
+    def unregisterProtocol(self, protocol):
+        pass
+
+    def send(self, msg, msgID, protocol, remoteID):
+        pass
+
+
+def _clientMessage(converter, rosMsg, name, clsName):
+    """ Create the data message which the robot sends for the ROS message
+        over the WebSocket connection before the binary data is extracted.
+    """
+    return {'type' : types.DATA_MESSAGE,
+            'data' : {'iTag' : name, 'type' : clsName, 'msgID' : 'nil',
+                      'msg' : converter.encode(rosMsg)}}
+
+
+def _wsMessages(msg):
+    """ Split the data message into the messages which are sent over the
+        WebSocket connection.
+
+        @return:            List of tuples (message, binary flag).
+    """
+    uriBinary, msg = recursiveBinarySearch(msg)
+
+    return ([(json.dumps(msg), False)] +
+            [(uri + binary.getvalue(), True) for uri, binary in uriBinary])
+
+
+def _serialize(rosMsg):
+    buf = StringIO()
+    rosMsg.serialize(buf)
+    return buf.getvalue()
+
+
+def createBenchmarks(loader):
+    """ Create the benchmarks for all fixtures.
+
+        @return:            List of tuples (name, function, prepare), where
+                            prepare is None or a function whose return value
+                            is passed to the function and whose execution
+                            time is not measured.
+    """
+    converter = Converter(loader)
+    converter.addCustomConverter(ImageConverter)
+
+    benchmarks = []
+
+    for name, factory in FIXTURES:
+        rosMsg = factory(loader)
+        rosCls = type(rosMsg)
+        clsName = rosMsg._type
+
+        # The converted messages can't be reused as the binary data is
+        # consumed; therefore, they are created outside of the measurement
+        def clientMessage(rosMsg=rosMsg, name=name, clsName=clsName):
+            return _clientMessage(converter, rosMsg, name, clsName)
+
+        def encode(rosMsg=rosMsg):
+            return converter.encode(rosMsg)
+
+        def decode(data, rosCls=rosCls):
+            converter.decode(rosCls, data)
+
+        assembler = MessageAssembler(_Receiver(), 30)
+        wsMsgs = _wsMessages(clientMessage())
+
+        def process(assembler=assembler, wsMsgs=wsMsgs):
+            for msg, binary in wsMsgs:
+                assembler.processMessage(msg, binary)
+
+        benchmarks.append(('recursiveBinarySearch/' + name,
+                           recursiveBinarySearch, clientMessage))
+        benchmarks.append(('MessageAssembler.processMessage/' + name,
+                           process, None))
+        benchmarks.append(('Converter.encode/' + name, encode, None))
+        benchmarks.append(('Converter.decode/' + name, decode, encode))
+
+        # Internal protocol between the endpoints
+        payload = _serialize(rosMsg)
+        interface = _Receiver()
+        transport = StringTransport()
+
+        protocol = RCEInternalProtocol(_Receiver())
+        protocol.makeConnection(transport)
+        protocol._initSuccessful(None)
+        protocol.registerConnection(interface, interface.UID)
+
+        protocol.sendMessage(interface, payload, 'nil')
+        frame = transport.value()[4:]
+
+        def send(protocol=protocol, interface=interface, payload=payload,
+                 transport=transport):
+            protocol.sendMessage(interface, payload, 'nil')
+            transport.clear()
+
+        benchmarks.append(('RCEInternalProtocol.sendMessage/' + name, send,
+                           None))
+        benchmarks.append(('RCEInternalProtocol._messageReceived/' + name,
+                           lambda protocol=protocol, frame=frame:
+                               protocol._messageReceived(frame), None))
+
+    def encodeTypes():
+        for name in _INTERFACE_TYPES:
+            Types.encode(name)
+
+    def decodeTypes():
+        for nr in xrange(12):
+            Types.decode(nr)
+
+    benchmarks.append(('Types.encode', encodeTypes, None))
+    benchmarks.append(('Types.decode', decodeTypes, None))
+
+    return benchmarks
+
+
+###
+### Measurement
+###
+
+def _run(func, prepare, loops):
+    """ Execute the function the given number of times.
+
+        @return:            Time in seconds spent in the function.
+    """
+    if prepare:
+        args = [prepare() for _ in xrange(loops)]
+
+        start = time.time()
+
+        for arg in args:
+            func(arg)
+    else:
+        start = time.time()
+
+        for _ in xrange(loops):
+            func()
+
+    return time.time() - start
+
+
+def measure(func, prepare, repeat, minTime):
+    """ Measure the execution time of a function. The number of loops is
+        calibrated such that a run takes at least the given time.
+
+        @return:            Median and minimum time in seconds of a single
+                            call over all runs.
+        @rtype:             (float, float)
+    """
+    loops = 1
+
+    while _run(func, prepare, loops) < minTime:
+        loops *= 2
+
+    times = sorted(_run(func, prepare, loops) / loops
+                   for _ in xrange(repeat))
+
+    return times[len(times) // 2], times[0]
+
+
+def main(names, repeat, minTime, saveFile, baselineFile, tolerance):
+    random.seed(42)
+
+    loader = Loader(get_ros_paths())
+    benchmarks = [b for b in createBenchmarks(loader)
+                  if not names or any(n in b[0] for n in names)]
+
+    baseline = {}
+
+    if baselineFile:
+        with open(baselineFile, 'r') as f:
+            baseline = json.loads(f.read())
+
+    results = {}
+    regressions = []
+
+    print('{0:<50} | {1:>12} | {2:>12} | {3:>8}'.format('benchmark',
+                                                        'median [us]',
+                                                        'min [us]',
+                                                        'change'))
+
+    for name, func, prepare in benchmarks:
+        median, minimum = measure(func, prepare, repeat, minTime)
+        results[name] = median
+
+        if name in baseline:
+            change = '{0:+.1%}'.format(median / baseline[name] - 1)
+
+            if median > baseline[name] * (1 + tolerance):
+                regressions.append(name)
+        else:
+            change = ''
+
+        print('{0:<50} | {1:>12.1f} | {2:>12.1f} | {3:>8}'.format(
+                  name, median * 1e6, minimum * 1e6, change))
+        sys.stdout.flush()
+
+    if saveFile:
+        with open(saveFile, 'w') as f:
+            f.write(json.dumps(results))
+
+    for name in regressions:
+        print('Regression: {0} takes {1:.1f} us instead of {2:.1f} us.'.format(
+                  name, results[name] * 1e6, baseline[name] * 1e6))
+
+    if regressions:
+        exit(1)
+
+
+def _get_argparse():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(prog='micro',
+                            description='Run microbenchmarks for RCE which '
+                                        'report the time spent in the hot '
+                                        'paths of the message processing '
+                                        'using realistic ROS messages.')
+
+    parser.add_argument('--repeat', help='Number of runs per benchmark.',
+                        type=int, default=5)
+    parser.add_argument('--min-time', help='Minimal time in seconds of a run; '
+                                           'used to calibrate the number of '
+                                           'loops.',
+                        type=float, default=0.1, dest='minTime')
+    parser.add_argument('--save', help='File to which the results should be '
+                                       'saved.', type=str)
+    parser.add_argument('--baseline', help='File with the results of a '
+                                           'previous run which are used to '
+                                           'detect regressions.', type=str)
+    parser.add_argument('--tolerance', help='Allowed relative increase of the '
+                                            'time compared to the baseline.',
+                        type=float, default=0.1)
+    parser.add_argument('benchmarks', help='Only run the benchmarks whose '
+                                           'name contains one of the given '
+                                           'strings.',
+                        type=str, nargs='*')
+
+    return parser
+
+
+if __name__ == '__main__':
+    args = _get_argparse().parse_args()
+
+    main(args.benchmarks, args.repeat, args.minTime, args.save, args.baseline,
+         args.tolerance)
@@ -35,7 +35,7 @@ import pylab
 import json
 
 
-def main(fileNames, ylog, remote, plotStyle):
+def main(fileNames, ylog, remote, plotStyle, xlabel, ylabel):
     if ylog:
         pylab.subplot(111, xscale='log', yscale='log')
     else:
@@ -83,8 +83,8 @@ def main(fileNames, ylog, remote, plotStyle):
     if 'paper.data' in fileNames:
         pylab.figtext(0.8, 0.8, 'green: paper measurements', ha='right')
 
-    pylab.xlabel('number of characters')
-    pylab.ylabel('time [ms]')
+    pylab.xlabel(xlabel)
+    pylab.ylabel(ylabel)
     pylab.legend(loc='upper left')
     pylab.show()
 
@@ -105,6 +105,13 @@ def _get_argparse():
                         type=str, choices=('minmax', 'variance'))
     parser.add_argument('--paper', help='Flag to add measurement from paper for'
                                         ' comparison.', action='store_true')
+    parser.add_argument('--file', help='Files with the measurements to plot, '
+                                       "e.g. 'load.data'.",
+                        type=str, nargs='+', default=['benchmark.data'])
+    parser.add_argument('--xlabel', help='Label of the x axis.', type=str,
+                        default='number of characters')
+    parser.add_argument('--ylabel', help='Label of the y axis.', type=str,
+                        default='time [ms]')
 
     return parser
 
@@ -112,9 +119,9 @@ def _get_argparse():
 if __name__ == '__main__':
     args = _get_argparse().parse_args()
 
-    files = ['benchmark.data']
+    files = args.file
 
     if args.paper:
         files.append('paper.data')
 
-    main(files, args.ylog, args.show, args.errorbar)
+    main(files, args.ylog, args.show, args.errorbar, args.xlabel, args.ylabel)
@@ -0,0 +1,521 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     report.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+
+# Python specific imports
+import os
+import math
+import json
+import random
+from cgi import escape
+
+
+# Number of resamples used for the bootstrap confidence intervals
+BOOTSTRAP_SAMPLES = 1000
+
+# Confidence level of the confidence intervals
+CONFIDENCE = 0.95
+
+# Reported percentiles
+PERCENTILES = (50.0, 90.0, 99.0)
+
+# Colors used for the series in the plots
+COLORS = ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b',
+          '#e377c2', '#7f7f7f', '#bcbd22', '#17becf')
+
+# Size of the plots in pixels
+WIDTH = 720
+HEIGHT = 400
+MARGIN = 60
+
+
+###
+### Statistics
+###
+
+def percentile(values, q):
+    """ Get the percentile of a sorted list of values using linear
+        interpolation between the closest ranks.
+    """
+    if not values:
+        return None
+
+    pos = (len(values) - 1) * q / 100.0
+    lower = int(math.floor(pos))
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (pos - lower)
+
+
+def bootstrap(values, q, rng):
+    """ Get the bootstrap confidence interval of a percentile.
+
+        @return:            Lower and upper bound of the confidence interval.
+        @rtype:             (float, float)
+    """
+    n = len(values)
+
+    if n < 2:
+        return (values[0], values[0]) if values else (None, None)
+
+    estimates = sorted(percentile(sorted(rng.choice(values)
+                                         for _ in xrange(n)), q)
+                       for _ in xrange(BOOTSTRAP_SAMPLES))
+
+    alpha = (1 - CONFIDENCE) / 2 * 100
+    return percentile(estimates, alpha), percentile(estimates, 100 - alpha)
+
+
+def knee(xs, ys, logx):
+    """ Find the knee of a curve, i.e. the point after which the value
+        increases much faster (convex curve, e.g. latency) or much slower
+        (concave curve, e.g. throughput) than before. The normalized curve is
+        compared with the line through its end points and the point with the
+        largest distance is used.
+
+        @return:            Index of the knee or None if there is no knee.
+        @rtype:             int
+    """
+    points = [(math.log10(x) if logx else x, y)
+              for x, y in zip(xs, ys) if y is not None]
+
+    if len(points) < 3:
+        return None
+
+    x0, y0 = points[0]
+    x1, y1 = points[-1]
+
+    if x1 == x0 or y1 == y0:
+        return None
+
+    norm = [((x - x0) / (x1 - x0), (y - y0) / (y1 - y0)) for x, y in points]
+    dist = [x - y for x, y in norm]
+
+    # Below the line the curve is convex, otherwise concave
+    if sum(dist) < 0:
+        dist = [-d for d in dist]
+
+    best = max(xrange(len(dist)), key=dist.__getitem__)
+
+    if dist[best] <= 0:
+        return None
+
+    # Map the index back to the index in the unfiltered lists
+    return [i for i, y in enumerate(ys) if y is not None][best]
+
+
+class Series(object):
+    """ Statistics of one measured series, i.e. of one line in a data file.
+    """
+    def __init__(self, label, xs, runs, rng):
+        self.label = label
+        self.xs = xs
+        self.stats = []
+
+        for i in xrange(len(xs)):
+            column = [run[i] for run in runs if i < len(run)]
+            values = sorted(v for v in column if v != -1.0 and v is not None)
+
+            stat = {'n':len(values), 'invalid':len(column) - len(values)}
+
+            if values:
+                stat['mean'] = sum(values) / len(values)
+                stat['ci'] = bootstrap(values, 50.0, rng)
+
+                for q in PERCENTILES:
+                    stat['p{0:g}'.format(q)] = percentile(values, q)
+            else:
+                stat['mean'] = stat['ci'] = None
+
+                for q in PERCENTILES:
+                    stat['p{0:g}'.format(q)] = None
+
+            self.stats.append(stat)
+
+    @property
+    def medians(self):
+        return [stat['p50'] for stat in self.stats]
+
+    def compare(self, baseline):
+        """ Compare the medians with the medians of the baseline. A change is
+            significant if the confidence intervals do not overlap.
+
+            @return:            List with a tuple (ratio, significant) for
+                                each point or None if the point is missing.
+        """
+        result = []
+
+        for x, stat in zip(self.xs, self.stats):
+            try:
+                base = baseline.stats[baseline.xs.index(x)]
+            except ValueError:
+                result.append(None)
+                continue
+
+            if not stat['p50'] or not base['p50']:
+                result.append(None)
+                continue
+
+            (low, high), (baseLow, baseHigh) = stat['ci'], base['ci']
+            significant = low > baseHigh or high < baseLow
+            result.append((stat['p50'] / base['p50'], significant))
+
+        return result
+
+
+def load(fileName, rng):
+    """ Load a data file as written by the measurements.
+
+        @return:            List of the series in the file.
+        @rtype:             [Series]
+    """
+    with open(fileName, 'r') as f:
+        header = json.loads(f.readline())
+        lines = [json.loads(line) for line in f if line.strip()]
+
+    # The first column of the data is not part of the measured series
+    xs = header[1:]
+    series = []
+
+    for i, test in enumerate(lines):
+        label = test.get('label') or test.get('type') or str(i)
+        runs = [run[1:] for run in test['data']]
+        series.append(Series(label, xs, runs, rng))
+
+    return series
+
+
+###
+### Report
+###
+
+def _fmt(value):
+    if value is None:
+        return '-'
+
+    return '{0:.4g}'.format(value)
+
+
+class Plot(object):
+    """ Self-contained SVG plot of the medians and their confidence
+        intervals.
+    """
+    def __init__(self, xs, series, logx, logy):
+        self._logx = logx
+        self._logy = logy
+
+        ys = [y for s in series for stat in s.stats if stat['ci']
+              for y in stat['ci'] + (stat['p50'],) if y is not None]
+
+        self._x = self._range([x for x in xs if x > 0 or not logx], logx)
+        self._y = self._range([y for y in ys if y > 0 or not logy], logy)
+
+    @staticmethod
+    def _range(values, log):
+        if log:
+            values = [math.log10(v) for v in values]
+
+        if not values:
+            return (0.0, 1.0)
+
+        low, high = min(values), max(values)
+
+        if low == high:
+            return (low - 1, high + 1)
+
+        return (low, high)
+
+    def _pos(self, value, bounds, log, size, flip):
+        low, high = bounds
+
+        if log:
+            value = math.log10(value)
+
+        rel = (value - low) / (high - low)
+
+        if flip:
+            rel = 1 - rel
+
+        return MARGIN + rel * (size - 2 * MARGIN)
+
+    def x(self, value):
+        return self._pos(value, self._x, self._logx, WIDTH, False)
+
+    def y(self, value):
+        return self._pos(value, self._y, self._logy, HEIGHT, True)
+
+    def _ticks(self, bounds, log):
+        low, high = bounds
+
+        if log:
+            return [10 ** e for e in xrange(int(math.floor(low)),
+                                            int(math.ceil(high)) + 1)
+                    if low <= e <= high]
+
+        step = (high - low) / 5
+        return [low + i * step for i in xrange(6)]
+
+    def render(self, series, knees, xlabel, ylabel):
+        out = ['<svg xmlns="http://www.w3.org/2000/svg" width="{0}" '
+               'height="{1}" font-family="sans-serif" font-size="11">'.format(
+                   WIDTH, HEIGHT)]
+
+        # Axes and ticks
+        out.append('<rect x="{0}" y="{0}" width="{1}" height="{2}" '
+                   'fill="none" stroke="#888"/>'.format(
+                       MARGIN, WIDTH - 2 * MARGIN, HEIGHT - 2 * MARGIN))
+
+        for tick in self._ticks(self._x, self._logx):
+            x = self.x(tick)
+            out.append('<line x1="{0:.1f}" y1="{1}" x2="{0:.1f}" y2="{2}" '
+                       'stroke="#eee"/><text x="{0:.1f}" y="{3}" '
+                       'text-anchor="middle">{4}</text>'.format(
+                           x, MARGIN, HEIGHT - MARGIN, HEIGHT - MARGIN + 15,
+                           _fmt(tick)))
+
+        for tick in self._ticks(self._y, self._logy):
+            y = self.y(tick)
+            out.append('<line x1="{0}" y1="{1:.1f}" x2="{2}" y2="{1:.1f}" '
+                       'stroke="#eee"/><text x="{3}" y="{1:.1f}" '
+                       'text-anchor="end">{4}</text>'.format(
+                           MARGIN, y, WIDTH - MARGIN, MARGIN - 5, _fmt(tick)))
+
+        out.append('<text x="{0}" y="{1}" text-anchor="middle">{2}</text>'
+                   .format(WIDTH / 2, HEIGHT - 15, escape(xlabel)))
+        out.append('<text x="15" y="{0}" text-anchor="middle" '
+                   'transform="rotate(-90 15 {0})">{1}</text>'.format(
+                       HEIGHT / 2, escape(ylabel)))
+
+        # Confidence intervals, medians and knees
+        for i, s in enumerate(series):
+            color = COLORS[i % len(COLORS)]
+            points = [(x, stat) for x, stat in zip(s.xs, s.stats)
+                      if stat['p50'] is not None and self._valid(x, stat)]
+
+            if not points:
+                continue
+
+            band = ([(self.x(x), self.y(stat['ci'][1])) for x, stat in points] +
+                    [(self.x(x), self.y(stat['ci'][0]))
+                     for x, stat in reversed(points)])
+            out.append('<polygon points="{0}" fill="{1}" fill-opacity="0.2" '
+                       'stroke="none"/>'.format(
+                           ' '.join('{0:.1f},{1:.1f}'.format(*p)
+                                    for p in band), color))
+
+            line = [(self.x(x), self.y(stat['p50'])) for x, stat in points]
+            out.append('<polyline points="{0}" fill="none" stroke="{1}" '
+                       'stroke-width="2"/>'.format(
+                           ' '.join('{0:.1f},{1:.1f}'.format(*p)
+                                    for p in line), color))
+
+            if knees[i] is not None and self._valid(s.xs[knees[i]],
+                                                     s.stats[knees[i]]):
+                out.append('<circle cx="{0:.1f}" cy="{1:.1f}" r="5" '
+                           'fill="none" stroke="{2}" stroke-width="2"/>'
+                           .format(self.x(s.xs[knees[i]]),
+                                   self.y(s.stats[knees[i]]['p50']), color))
+
+            out.append('<text x="{0}" y="{1}" fill="{2}">{3}</text>'.format(
+                           MARGIN + 10, MARGIN + 15 * (i + 1), color,
+                           escape(s.label)))
+
+        out.append('</svg>')
+        return '\n'.join(out)
+
+    def _valid(self, x, stat):
+        if self._logx and x <= 0:
+            return False
+
+        if self._logy and min(stat['ci'] + (stat['p50'],)) <= 0:
+            return False
+
+        return True
+
+
+def _table(series, knees, comparison):
+    """ Create the HTML table with the statistics of one series.
+    """
+    cols = ['x', 'n', 'invalid', 'mean'] + ['p{0:g}'.format(q)
+                                            for q in PERCENTILES]
+    cols += ['median CI']
+
+    if comparison:
+        cols += ['vs. baseline']
+
+    out = ['<h3>{0}</h3>'.format(escape(series.label)), '<table>',
+           '<tr>{0}</tr>'.format(''.join('<th>{0}</th>'.format(c)
+                                         for c in cols))]
+
+    for i, (x, stat) in enumerate(zip(series.xs, series.stats)):
+        row = [_fmt(x), stat['n'], stat['invalid'], _fmt(stat['mean'])]
+        row += [_fmt(stat['p{0:g}'.format(q)]) for q in PERCENTILES]
+        row += ['[{0}, {1}]'.format(*map(_fmt, stat['ci']))
+                if stat['ci'] else '-']
+
+        cls = ' class="knee"' if i == knees else ''
+
+        if comparison:
+            if comparison[i] is None:
+                row.append('-')
+            else:
+                ratio, significant = comparison[i]
+
+                if significant:
+                    cls = ' class="{0}"'.format('worse' if ratio > 1
+                                                else 'better')
+
+                row.append('{0:+.1%}{1}'.format(ratio - 1,
+                                                ' *' if significant else ''))
+
+        out.append('<tr{0}>{1}</tr>'.format(cls, ''.join(
+                       '<td>{0}</td>'.format(v) for v in row)))
+
+    out.append('</table>')
+
+    if knees is not None:
+        out.append('<p>Knee at x = {0}</p>'.format(_fmt(series.xs[knees])))
+
+    return '\n'.join(out)
+
+
+_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; margin-bottom: 1em; }}
+th, td {{ border: 1px solid #ccc; padding: 2px 8px; text-align: right; }}
+tr.knee {{ font-weight: bold; }}
+tr.worse {{ background: #fdd; }}
+tr.better {{ background: #dfd; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>Medians with {confidence:.0%} bootstrap confidence intervals
+({samples} resamples); invalid measurements (-1.0) are excluded per point.
+Circles mark the knees of the curves. Changes compared to the baseline
+marked with * are significant, i.e. the confidence intervals do not
+overlap.</p>
+{body}
+</body>
+</html>
+"""
+
+
+def main(fileNames, baselineNames, output, xlabel, ylabel, ylog, seed):
+    rng = random.Random(seed)
+
+    baseline = {}
+
+    for fileName in baselineNames:
+        for s in load(fileName, rng):
+            baseline[s.label] = s
+
+    body = []
+    regressions = []
+
+    for fileName in fileNames:
+        series = load(fileName, rng)
+        xs = series[0].xs if series else []
+        logx = bool(xs) and min(xs) > 0 and max(xs) / min(xs) >= 100
+        knees = [knee(s.xs, s.medians, logx) for s in series]
+
+        body.append('<h2>{0}</h2>'.format(escape(os.path.basename(fileName))))
+        body.append(Plot(xs, series, logx, ylog).render(series, knees, xlabel,
+                                                        ylabel))
+
+        for s, k in zip(series, knees):
+            comparison = s.compare(baseline[s.label]) if s.label in baseline \
+                         else None
+            body.append(_table(s, k, comparison))
+
+            for x, result in zip(s.xs, comparison or []):
+                if result and result[1] and result[0] > 1:
+                    regressions.append((s.label, x, result[0]))
+
+    with open(output, 'w') as f:
+        f.write(_HTML.format(title='RCE measurement report',
+                             confidence=CONFIDENCE,
+                             samples=BOOTSTRAP_SAMPLES,
+                             body='\n'.join(body)))
+
+    print('Report written to {0}.'.format(output))
+
+    for label, x, ratio in regressions:
+        print('Regression: {0} at x = {1} is {2:.1%} slower than the '
+              'baseline.'.format(label, _fmt(x), ratio - 1))
+
+    if regressions:
+        exit(1)
+
+
+def _get_argparse():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(prog='report',
+                            description='Create a self-contained HTML report '
+                                        'with percentiles, bootstrap '
+                                        'confidence intervals and knees of '
+                                        'the measurements.')
+
+    parser.add_argument('--baseline', help='Data files of a previous '
+                                           'measurement which are compared '
+                                           'with the series of the same name; '
+                                           'significant regressions result in '
+                                           'a non-zero exit code; can be '
+                                           'given multiple times.',
+                        type=str, action='append', default=[])
+    parser.add_argument('--output', help='File to which the report should be '
+                                         'written.',
+                        type=str, default='report.html')
+    parser.add_argument('--xlabel', help='Label of the x axis.', type=str,
+                        default='number of characters')
+    parser.add_argument('--ylabel', help='Label of the y axis.', type=str,
+                        default='time [ms]')
+    parser.add_argument('--ylog', help='Flag to activate log scale for y axis.',
+                        action='store_true')
+    parser.add_argument('--seed', help='Seed for the bootstrap resampling.',
+                        type=int, default=42)
+    parser.add_argument('files', help='Data files written by the measurements, '
+                                      "e.g. 'r2c.data'.",
+                        type=str, nargs='+')
+
+    return parser
+
+
+if __name__ == '__main__':
+    args = _get_argparse().parse_args()
+
+    main(args.files, args.baseline, args.output, args.xlabel, args.ylabel,
+         args.ylog, args.seed)
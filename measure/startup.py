@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     startup.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+
+# Python specific imports
+import sys
+import json
+import time
+import subprocess
+import __builtin__
+
+
+# Entry modules of the cloud engine processes
+MODULES = ('rce.robot', 'rce.environment', 'rce.container', 'rce.master')
+
+
+class ImportProfiler(object):
+    """ Profiler which measures the time spent for each import, similar to
+        the option '-X importtime' of newer Python versions.
+    """
+    def __init__(self):
+        self._import = None
+
+        # Stack of the imports which are currently in progress; each element
+        # contains the time spent in nested imports
+        self._stack = []
+
+        # List of tuples (level, module, self time, cumulative time) in the
+        # order in which the imports finished
+        self._records = []
+
+    def install(self):
+        """ Replace the built-in import function by the profiling version.
+        """
+        self._import = __builtin__.__import__
+        __builtin__.__import__ = self._profiledImport
+
+    def uninstall(self):
+        """ Restore the built-in import function.
+        """
+        __builtin__.__import__ = self._import
+
+    def _profiledImport(self, name, *args, **kwargs):
+        nrModules = len(sys.modules)
+        level = len(self._stack)
+        self._stack.append(0.0)
+
+        start = time.time()
+
+        try:
+            return self._import(name, *args, **kwargs)
+        finally:
+            cumulative = time.time() - start
+            nested = self._stack.pop()
+
+            if self._stack:
+                self._stack[-1] += cumulative
+
+            # Only imports which loaded new modules are of interest
+            if len(sys.modules) > nrModules:
+                self._records.append((level, name, cumulative - nested,
+                                      cumulative))
+
+    @property
+    def records(self):
+        """ Measured imports as a list of tuples containing the nesting level,
+            the name of the module, the self time and the cumulative time
+            in seconds.
+        """
+        return self._records
+
+
+def _profile(module):
+    """ Import the module using the import profiler and write the measured
+        imports as JSON to stdout. Should be run in a fresh interpreter.
+    """
+    profiler = ImportProfiler()
+    profiler.install()
+
+    try:
+        __import__(module)
+    finally:
+        profiler.uninstall()
+
+    print(json.dumps(profiler.records))
+
+
+def _run(module, passes):
+    """ Profile the import of the module in the given number of fresh
+        interpreters.
+
+        @return:            Median self time and median cumulative time for
+                            each imported module as a dictionary and the order
+                            and nesting level of the imports from the first
+                            pass as a list of tuples.
+        @rtype:             ({ str : (float, float) }, [(int, str)])
+    """
+    runs = []
+
+    for _ in xrange(passes):
+        out = subprocess.check_output([sys.executable, __file__,
+                                       '--profile', module])
+        runs.append(json.loads(out.splitlines()[-1]))
+
+    order = [(level, name) for level, name, _, _ in runs[0]]
+    times = {}
+
+    for run in runs:
+        for _, name, selfTime, cumulative in run:
+            times.setdefault(name, []).append((selfTime, cumulative))
+
+    median = lambda values: sorted(values)[len(values) // 2]
+
+    stats = dict((name, (median([s for s, _ in values]),
+                         median([c for _, c in values])))
+                 for name, values in times.iteritems())
+
+    return stats, order
+
+
+def _report(module, stats, order):
+    """ Print the import time report of a module.
+    """
+    print('\nimport time: {0}'.format(module))
+    print('{0:>12} | {1:>12} | imported package'.format('self [us]',
+                                                       'cumulative'))
+
+    seen = set()
+
+    for level, name in order:
+        if name in seen:
+            continue
+
+        seen.add(name)
+        selfTime, cumulative = stats[name]
+        print('{0:>12d} | {1:>12d} | {2}{3}'.format(int(selfTime * 1e6),
+                                                    int(cumulative * 1e6),
+                                                    '  ' * level, name))
+
+
+def main(modules, passes, saveFile, baselineFile, tolerance):
+    results = {}
+
+    for module in modules:
+        stats, order = _run(module, passes)
+        _report(module, stats, order)
+        results[module] = stats[module][1] if module in stats else 0.0
+
+    print('\ntotal import time [ms]:')
+
+    for module in modules:
+        print('    {0:<20} {1:>10.1f}'.format(module, results[module] * 1e3))
+
+    if saveFile:
+        with open(saveFile, 'w') as f:
+            f.write(json.dumps(results))
+
+    if baselineFile:
+        with open(baselineFile, 'r') as f:
+            baseline = json.loads(f.read())
+
+        regressions = [module for module in modules
+                       if module in baseline and
+                          results[module] > baseline[module] * (1 + tolerance)]
+
+        for module in regressions:
+            print('Regression: import of {0} takes {1:.1f} ms instead of '
+                  '{2:.1f} ms.'.format(module, results[module] * 1e3,
+                                       baseline[module] * 1e3))
+
+        if regressions:
+            exit(1)
+
+
+def _get_argparse():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(prog='startup',
+                            description='Run startup benchmark for RCE which '
+                                        'reports the time spent to import the '
+                                        'entry modules of the processes.')
+
+    parser.add_argument('--passes', help='Number of passes to do.',
+                        type=int, default=5)
+    parser.add_argument('--save', help='File to which the total import times '
+                                       'should be saved.', type=str)
+    parser.add_argument('--baseline', help='File with the total import times '
+                                           'of a previous run which are used '
+                                           'to detect regressions.', type=str)
+    parser.add_argument('--tolerance', help='Allowed relative increase of the '
+                                            'import time compared to the '
+                                            'baseline.',
+                        type=float, default=0.2)
+    parser.add_argument('--profile', help='Internally used to profile a '
+                                          'single module.', type=str)
+    parser.add_argument('modules', help='Modules which should be measured.',
+                        type=str, nargs='*', default=MODULES)
+
+    return parser
+
+
+if __name__ == '__main__':
+    args = _get_argparse().parse_args()
+
+    if args.profile:
+        _profile(args.profile)
+    else:
+        main(args.modules, args.passes, args.save, args.baseline,
+             args.tolerance)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     traces.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+
+# Python specific imports
+import json
+
+
+def load(fileNames):
+    """ Load and merge the traces which have been exported by the processes.
+
+        @return:            Dictionary with the trace ID as key and the
+                            recorded stages as a list of tuples containing the
+                            timestamp, the stage and the process, sorted by
+                            the timestamps.
+        @rtype:             { str : [(float, str, str)] }
+    """
+    traces = {}
+
+    for fileName in fileNames:
+        with open(fileName, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+
+                trace = json.loads(line)
+                events = traces.setdefault(trace['trace'], [])
+                events.extend((timestamp, stage, trace['process'])
+                              for stage, timestamp in trace['events'])
+
+    # The sort is stable, i.e. stages of a process with the same timestamp
+    # keep the order in which they have been recorded
+    for events in traces.itervalues():
+        events.sort(key=lambda event: event[0])
+
+    return traces
+
+
+def _duration(events):
+    return events[-1][0] - events[0][0]
+
+
+def _breakdown(traceID, events):
+    """ Print the time spent between consecutive stages of a trace.
+    """
+    print('\ntrace {0}: {1:.3f} ms'.format(traceID, _duration(events) * 1e3))
+    print('{0:>10} | {1:>10} | {2:<20} | stage'.format('delta [ms]', 'total',
+                                                        'process'))
+
+    start = last = events[0][0]
+
+    for timestamp, stage, process in events:
+        print('{0:>10.3f} | {1:>10.3f} | {2:<20} | {3}'.format(
+                  (timestamp - last) * 1e3, (timestamp - start) * 1e3,
+                  process, stage))
+        last = timestamp
+
+
+def _summary(traces):
+    """ Print the median time spent between consecutive stages over all
+        traces.
+    """
+    steps = {}
+    order = []
+
+    for events in traces.itervalues():
+        for prev, cur in zip(events, events[1:]):
+            step = (prev[1], cur[1])
+
+            if step not in steps:
+                steps[step] = []
+                order.append(step)
+
+            steps[step].append(cur[0] - prev[0])
+
+    print('\nmedian time between stages over {0} traces:'.format(len(traces)))
+    print('{0:>10} | {1:>6} | step'.format('time [ms]', 'count'))
+
+    median = lambda values: sorted(values)[len(values) // 2]
+
+    for step in sorted(order, key=lambda s: -median(steps[s])):
+        print('{0:>10.3f} | {1:>6d} | {2} -> {3}'.format(
+                  median(steps[step]) * 1e3, len(steps[step]), *step))
+
+
+def main(fileNames, slowest):
+    traces = load(fileNames)
+
+    if not traces:
+        print('No traces found.')
+        return
+
+    ranked = sorted(traces.iteritems(), key=lambda t: -_duration(t[1]))
+
+    for traceID, events in ranked[:slowest]:
+        _breakdown(traceID, events)
+
+    _summary(traces)
+
+
+def _get_argparse():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(prog='traces',
+                            description='Merge the traces exported by the '
+                                        'Robot and Environment processes and '
+                                        'break the slowest traces down per '
+                                        'stage.')
+
+    parser.add_argument('--slowest', help='Number of slowest traces which '
+                                          'should be shown.',
+                        type=int, default=5)
+    parser.add_argument('files', help="Exported traces, e.g. 'robot.trace' "
+                                      "and the 'trace.json' files from the "
+                                      'data directories of the containers.',
+                        type=str, nargs='+')
+
+    return parser
+
+
+if __name__ == '__main__':
+    args = _get_argparse().parse_args()
+
+    main(args.files, args.slowest)
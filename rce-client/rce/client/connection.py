@@ -252,6 +252,14 @@ class _Connection(object):
 
     addParameter.__doc__ = RCE.addParameter.__doc__  #@UndefinedVariable
 
+    def addParameters(self, cTag, parameters):
+        if not self._rce:
+            raise ConnectionError('No connection to RCE.')
+
+        self._rce.addParameters(cTag, parameters)
+
+    addParameters.__doc__ = RCE.addParameters.__doc__  #@UndefinedVariable
+
     def removeParameter(self, cTag, name):
         if not self._rce:
             raise ConnectionError('No connection to RCE.')
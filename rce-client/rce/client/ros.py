@@ -74,8 +74,15 @@ class Environment(object):
             for container in self._containers:
                 self._conn.createContainer(**container)
 
+            # Send all parameters of a container in a single request
+            parameters = {}
+
             for parameter in self._parameters:
-                self._conn.addParameter(**parameter)
+                parameters.setdefault(parameter['cTag'], {})[
+                    parameter['name']] = parameter['value']
+
+            for cTag, params in parameters.iteritems():
+                self._conn.addParameters(cTag, params)
 
             for node in self._nodes:
                 self._conn.addNode(**node)
@@ -52,9 +52,19 @@ from twisted.python import log
 from twisted.internet.task import LoopingCall
 
 # rce specific imports
+from rce.util.metrics import registry
+from rce.util.trace import tracer
 from rce.comm.error import InvalidRequest
 
 
+_DROPPED_MSGS = registry.counter('rce_assembler_dropped_messages_total',
+                                 'Number of incomplete messages which have '
+                                 'been dropped after the timeout.')
+_DROPPED_BINARIES = registry.counter('rce_assembler_dropped_binaries_total',
+                                     'Number of unused binaries which have '
+                                     'been dropped after the timeout.')
+
+
 class AssemblerError(Exception):
     """ Exception is raised when an error in the message assembler occurs.
     """
@@ -299,6 +309,7 @@ class MessageAssembler(object):
                 raise InvalidRequest('Message is not in valid JSON format.')
 
             uris = self._recursiveURISearch(msg)
+            tracer.record('MessageAssembler.processMessage')
 
             if uris:
                 self._handleString(msg, uris)
@@ -332,6 +343,7 @@ class MessageAssembler(object):
 
             log.msg('{0} incomplete messages have been dropped '
                     'from assembler.'.format(len(toClean)))
+            _DROPPED_MSGS.inc(len(toClean))
 
         toClean = [uri for uri, (_, timestamp) in self._binaries.iteritems()
                    if timestamp < limit]
@@ -342,3 +354,4 @@ class MessageAssembler(object):
 
             log.msg('{0} unused binaries have been dropped '
                     'from assembler.'.format(len(toClean)))
+            _DROPPED_BINARIES.inc(len(toClean))
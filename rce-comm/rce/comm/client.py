@@ -512,6 +512,23 @@ class RCE(object):
         param = {'containerTag':cTag, 'name':name, 'value':value}
         self._sendMessage(types.CONFIGURE_COMPONENT, {'setParam':[param]})
 
+    def addParameters(self, cTag, parameters):
+        """ Add multiple parameters using a single request.
+
+            @param cTag:        Tag of container in which the parameters should
+                                be added.
+            @type  cTag:        str
+
+            @param parameters:  Names and values of the parameters which should
+                                be added. String values can contain the
+                                directives $(find PKG) or $(env VAR).
+            @type  parameters:  { str : int/float/bool/str/[] }
+        """
+        print("Request addition of {0} parameters to container "
+              "'{1}'.".format(len(parameters), cTag))
+        params = {'containerTag':cTag, 'parameters':parameters}
+        self._sendMessage(types.CONFIGURE_COMPONENT, {'setParams':[params]})
+
     def removeParameter(self, cTag, name):
         """ Remove a parameter.
 
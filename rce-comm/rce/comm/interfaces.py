@@ -289,6 +289,23 @@ class IRobot(Interface):
             @type  value:       str, int, float, bool, list
         """
 
+    def addParameters(cTag, parameters):  #@NoSelf
+        """ Add multiple parameters to a container / ROS environment using a
+            single round trip to the parameter server.
+
+            @param cTag:        Tag which is used to identify the container /
+                                ROS environment to which the parameters should
+                                be added.
+            @type  cTag:        str
+
+            @param parameters:  Names and values of the parameters which should
+                                be added. The names are also used to identify
+                                the parameters in subsequent requests.
+                                Top-level string values can contain the
+                                directives $(find PKG) and/or $(env VAR).
+            @type  parameters:  { str : str/int/float/bool/list }
+        """
+
     def removeParameter(cTag, name):  #@NoSelf
         """ Remove a parameter from a container / ROS environment.
 
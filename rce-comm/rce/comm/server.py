@@ -54,6 +54,7 @@ from autobahn.websocket import HttpException, \
     WebSocketServerFactory, WebSocketServerProtocol
 
 # rce specific imports
+from rce.util.trace import tracer
 from rce.comm import types
 from rce.comm._version import MINIMAL_VERSION, CURRENT_VERSION
 from rce.comm.error import InvalidRequest, DeadConnection
@@ -360,6 +361,15 @@ class RobotWebSocketProtocol(WebSocketServerProtocol):
                                      "request. 'setParam' is missing key: "
                                      '{0}'.format(e))
 
+        for params in data.pop('setParams', []):
+            try:
+                self._avatar.addParameters(params['containerTag'],
+                                           params['parameters'])
+            except KeyError as e:
+                raise InvalidRequest("Can not process 'ConfigureComponent' "
+                                     "request. 'setParams' is missing key: "
+                                     '{0}'.format(e))
+
         for param in data.pop('deleteParam', []):
             try:
                 self._avatar.removeParameter(param['containerTag'],
@@ -421,6 +431,10 @@ class RobotWebSocketProtocol(WebSocketServerProtocol):
 #        print('WebSocket: Received new message from client. '
 #              '(binary={0})'.format(binary))
 
+        # The trace is only valid while the message is processed
+        tracer.sample()
+        tracer.record('RobotWebSocketProtocol.onMessage')
+
         try:
             self._assembler.processMessage(msg, binary)
         except InvalidRequest as e:
@@ -432,6 +446,8 @@ class RobotWebSocketProtocol(WebSocketServerProtocol):
             import traceback
             traceback.print_exc()
             self.sendErrorMessage('Fatal Error')
+        finally:
+            tracer.current = None
 
     def sendMessage(self, msg):
         """ Internally used method to send a message to the robot.
@@ -478,6 +494,7 @@ class RobotWebSocketProtocol(WebSocketServerProtocol):
         self.sendMessage({'type' : types.DATA_MESSAGE,
                           'data' : {'iTag' : iTag, 'type' : clsName,
                                     'msgID' : msgID, 'msg' : msg}})
+        tracer.record('RobotWebSocketProtocol.sendDataMessage')
 
     def sendInterfaceStatusUpdateMessage(self, iTag, status):
         """ Callback for Connection object to send a interface status message to
@@ -47,6 +47,9 @@ from twisted.python.log import err, startLogging
 from twisted.cred.credentials import UsernamePassword
 from twisted.internet import reactor
 from twisted.internet import stdio
+from twisted.internet.defer import gatherResults, succeed
+from twisted.internet.protocol import Protocol
+from twisted.web.client import Agent
 from twisted.spread.pb import PBClientFactory
 from twisted.conch.recvline import HistoricRecvLine
 from twisted.conch.insults.insults import ServerProtocol
@@ -224,6 +227,7 @@ class ContainerOptions(CustomOptions):
         ("stop", "t", None, "Stop a Container"),
         ("services", "v", None, "List services running on the container"),
         ("topics", "o", None, "List topics running on the container"),
+        ("graph", "r", None, "Show topics and services with their nodes"),
         ("username", "u", None, "List containers by username"),
     )
     optFlags = (
@@ -258,13 +262,34 @@ class NodeStopOptions(CustomOptions):
     )
 
 
+class NodeLogsOptions(CustomOptions):
+    """
+        Parameters for node logs.
+    """
+    optParameters = (
+        ("ctag", "c", None, "Container tag"),
+        ("ntag", "n", None, "Node tag"),
+        ("lines", "l", 50, "Number of lines", int),
+        ("stream", "s", "out", "Stream which is followed (out or err)"),
+    )
+    optFlags = (
+        ("follow", "f", "Follow the output of the Node"),
+        ("stop", "x", "Stop following the output of the Node"),
+    )
+
+
 class NodeOptions(CustomOptions):
     """
         Options for node command.
     """
+    optParameters = (
+        ("stats", "s", None, "Resource usage of the nodes in a container"),
+    )
+
     subCommands = (
         ('start', None, NodeStartOptions, "Start Node"),
         ('stop', None, NodeStopOptions, "Stop Node"),
+        ('logs', None, NodeLogsOptions, "Show the output of a Node"),
     )
 
 
@@ -377,6 +402,53 @@ class MachineOptions(CustomOptions):
     )
 
 
+class ProfileOptions(CustomOptions):
+    """
+        Options for profile command.
+    """
+    optParameters = (
+        ("username", "u", None, "Owner of the Robot or Container"),
+        ("robot", "r", None, "Profile the process of the Robot"),
+        ("container", "c", None, "Profile the environment of the Container"),
+        ("duration", "d", 10, "Duration of the profile in seconds", int),
+        ("output", "o", "profile.folded", "File for the collapsed stacks"),
+    )
+    optFlags = (
+        ("master", "m", "Profile the Master process"),
+    )
+
+
+class _NodeLogPrinter(Protocol):
+    """ Protocol which writes the streamed output of a node to the terminal.
+    """
+    def __init__(self, terminal, prefix, finished):
+        self._terminal = terminal
+        self._prefix = prefix
+        self._finished = finished
+        self._partial = ''
+
+    def dataReceived(self, data):
+        lines = (self._partial + data).split('\n')
+        self._partial = lines.pop()
+
+        for line in lines:
+            self._terminal.nextLine()
+            self._terminal.write('{0}{1}'.format(self._prefix, line))
+
+    def connectionLost(self, reason):
+        if self._partial:
+            self._terminal.nextLine()
+            self._terminal.write('{0}{1}'.format(self._prefix, self._partial))
+
+        self._partial = ''
+        self._finished()
+
+    def stop(self):
+        """ Stop following the output of the node.
+        """
+        self.transport.stopProducing()
+
+
 def _errorHandle(func):
         def call(self, *args, **kwargs):
             try:
@@ -407,6 +479,7 @@ class ConsoleClient(HistoricRecvLine):
         self._password = None
         self._factory = None
         self._connected_rosapi_nodes = {}
+        self._followed_nodes = {}
         self._privilege = None
 
     def showPrompt(self):
@@ -541,6 +614,124 @@ class ConsoleClient(HistoricRecvLine):
             d = self._user[domain].callRemote(command, *args)
             d.addCallback(lambda result: self.terminal.write(str(result)))
 
+    @_errorHandle
+    def saveProfile(self, fileName, command, *args):
+        """ Profile a process and save the collapsed stacks, which can be used
+            to create a flame graph, to a file.
+
+            @param fileName:   File to which the profile should be written
+            @type  fileName:   string
+
+            @param command:    The command to be executed
+            @type  command:    string
+        """
+        def save(profile):
+            with open(fileName, 'w') as f:
+                f.write(profile)
+                f.write('\n')
+
+            self.terminal.write('Profile written to {0}.'.format(fileName))
+
+        self.terminal.write('Profiling...')
+        d = self._user.callRemote(command, *args)
+        d.addCallback(save)
+        d.addErrback(lambda err: self.terminal.write(str(err.value)))
+
+    @_errorHandle
+    def displayNodeLog(self, cTag, nTag, lines):
+        """ Display the last lines of the output of a node.
+
+            @param cTag:       Tag of the container in which the node runs
+            @type  cTag:       string
+
+            @param nTag:       Tag of the node
+            @type  nTag:       string
+
+            @param lines:      Number of lines which should be displayed
+            @type  lines:      int
+        """
+        def display(log):
+            for stream in ('out', 'err'):
+                self.terminal.write('--- std{0} ---'.format(stream))
+
+                for line in log[stream]:
+                    self.terminal.nextLine()
+                    self.terminal.write(line)
+
+                self.terminal.nextLine()
+
+        d = self._user['console'].callRemote('node_log', cTag, nTag, lines)
+        d.addCallback(display)
+        d.addErrback(lambda err: self.terminal.write(str(err.value)))
+
+    @_errorHandle
+    def followNodeLog(self, cTag, nTag, stream, lines):
+        """ Follow the output of a node by streaming it from the rosproxy of
+            the container.
+
+            @param cTag:       Tag of the container in which the node runs
+            @type  cTag:       string
+
+            @param nTag:       Tag of the node
+            @type  nTag:       string
+
+            @param stream:     Stream which should be followed, 'out' or 'err'
+            @type  stream:     string
+
+            @param lines:      Number of previous lines which should be
+                               displayed
+            @type  lines:      int
+        """
+        if (cTag, nTag) in self._followed_nodes:
+            self.terminal.write('Already following the Node.')
+            return
+
+        view = self._user['console']
+
+        def request((log, (url, key))):
+            self._connected_rosapi_nodes[cTag] = (url, key)
+            argList = [('userID', self._username), ('action', 'logs'),
+                       ('key', key), ('node', log['id']), ('stream', stream),
+                       ('lines', lines)]
+            return Agent(reactor).request('GET', '{0}?{1}'.format(
+                                                url, urlencode(argList)))
+
+        def follow(response):
+            if response.code != 200:
+                self.terminal.write('HTTP Error {0}: '
+                                    '{1}'.format(response.code,
+                                                 response.phrase))
+
+            printer = _NodeLogPrinter(self.terminal, '[{0}] '.format(nTag),
+                lambda: self._followed_nodes.pop((cTag, nTag), None))
+            self._followed_nodes[(cTag, nTag)] = printer
+            response.deliverBody(printer)
+
+        try:
+            info = succeed(self._connected_rosapi_nodes[cTag])
+        except KeyError:
+            info = view.callRemote('get_rosapi_connect_info', cTag)
+
+        d = gatherResults([view.callRemote('node_log', cTag, nTag, 0), info],
+                          consumeErrors=True)
+        d.addCallback(request)
+        d.addCallback(follow)
+        d.addErrback(lambda err: self.terminal.write(str(err.value)))
+
+    def unfollowNodeLog(self, cTag, nTag):
+        """ Stop following the output of a node.
+
+            @param cTag:       Tag of the container in which the node runs
+            @type  cTag:       string
+
+            @param nTag:       Tag of the node
+            @type  nTag:       string
+        """
+        try:
+            self._followed_nodes.pop((cTag, nTag)).stop()
+        except KeyError:
+            self.terminal.write('The Node is not followed.')
+
     # Various commands follow
     def cmd_EXIT(self, line):
         """ Handler for exit command.
@@ -622,6 +813,8 @@ class ConsoleClient(HistoricRecvLine):
                 self.callToRosProxy('services', config['services'])
             elif config['topics']:
                 self.callToRosProxy('topics', config['topics'])
+            elif config['graph']:
+                self.callToRosProxy('graph', config['graph'])
             elif config['list']:
                 self.callToUserAndDisplay('list_containers', 'console')
             elif config['username']:
@@ -657,6 +850,19 @@ class ConsoleClient(HistoricRecvLine):
                 if opts['ctag'] and opts['ntag']:
                     self.callToUser('removeNode', 'robot', opts['ctag'],
                                     opts['ntag'])
+            elif cmd == 'logs':
+                if opts['ctag'] and opts['ntag']:
+                    if opts['stop']:
+                        self.unfollowNodeLog(opts['ctag'], opts['ntag'])
+                    elif opts['follow']:
+                        self.followNodeLog(opts['ctag'], opts['ntag'],
+                                           opts['stream'], opts['lines'])
+                    else:
+                        self.displayNodeLog(opts['ctag'], opts['ntag'],
+                                            opts['lines'])
+            elif config['stats']:
+                self.callToUserAndDisplay('node_stats', 'console',
+                                          config['stats'])
 
     def cmd_PARAMETER(self, line):
         """ Handler for parameter command.
@@ -775,6 +981,30 @@ class ConsoleClient(HistoricRecvLine):
                 self.callToUserAndDisplay('machine_containers', 'admin',
                                           config['containers'])
 
+    def cmd_PROFILE(self, line):
+        """ Handler for profile command.
+
+            @param line:    line input from terminal.
+            @type  line:    string
+        """
+        config = ProfileOptions(self.terminal)
+        try:
+            config.parseOptions(line)
+        except usage.UsageError as errortext:
+            self.terminal.write("BUG in usage: {0}".format(errortext))
+        else:
+            if config['master']:
+                self.saveProfile(config['output'], 'profile_master',
+                                 config['duration'])
+            elif config['username'] and config['robot']:
+                self.saveProfile(config['output'], 'profile_robot',
+                                 config['username'], config['robot'],
+                                 config['duration'])
+            elif config['username'] and config['container']:
+                self.saveProfile(config['output'], 'profile_container',
+                                 config['username'], config['container'],
+                                 config['duration'])
+
     def cmd_HELP(self, line):
         """ Handler for help command.
 
@@ -785,7 +1015,8 @@ class ConsoleClient(HistoricRecvLine):
                    NodeOptions(self.terminal), ParameterOptions(self.terminal),
                    InterfaceOptions(self.terminal),
                    ConnectionOptions(self.terminal),
-                   RobotOptions(self.terminal), MachineOptions(self.terminal)]
+                   RobotOptions(self.terminal), MachineOptions(self.terminal),
+                   ProfileOptions(self.terminal)]
 
         for config in configs:
             self.terminal.nextLine()
@@ -34,6 +34,7 @@
 import os
 import sys
 import stat
+import time
 import shutil
 from random import choice
 from string import letters
@@ -56,7 +57,11 @@ except ImportError:
 
 # twisted specific imports
 from twisted.python import log
-from twisted.internet.defer import  DeferredList, succeed
+from twisted.python.failure import Failure
+from twisted.internet.defer import  Deferred, DeferredList, succeed, \
+    maybeDeferred
+from twisted.internet.threads import deferToThreadPool
+from twisted.internet.task import LoopingCall
 from twisted.spread.pb import Referenceable, PBClientFactory, \
     DeadReferenceError, PBConnectionLost
 
@@ -66,6 +71,11 @@ from rce.util.container import Container
 from rce.util.cred import salter, encodeAES, cipher
 from rce.util.network import isLocalhost
 from rce.util.process import execute
+from rce.util.threadpool import InstrumentedThreadPool
+from rce.util.metrics import Histogram
+from rce.util import sysinfo
+from rce.util.telemetry import encodeBatch
+from rce.util.watchdog import ReactorWatchdog
 from rce.core.error import MaxNumberExceeded
 # from rce.util.ssl import createKeyCertPair, loadCertFile, loadKeyFile, \
 #    writeCertToFile, writeKeyToFile
@@ -118,23 +128,147 @@ class RCEContainer(Referenceable):
         """
         self._client = client
         self._nr = nr
+        self._uid = uid
         self._name = name = 'C{0}'.format(nr)
         self._terminating = None
 
-        # Additional container parameters to use
-        # TODO: At the moment not used; currently data also does not contain
-        #       these information
-#        self._size = data.get('size', 1)
-#        self._cpu = data.get('cpu', 0)
-#        self._memory = data.get('memory', 0)
-#        self._bandwidth = data.get('bandwidth', 0)
+        # Additional container parameters to use; the cpu is given as number
+        # of CPUs, the memory in MB and the bandwidth in Mbit/s, where 0 means
+        # that the limit is derived from the size of the container
+        self._size = data.get('size', 1)
+        self._cpu = data.get('cpu', 0)
+        self._memory = data.get('memory', 0)
+        self._bandwidth = data.get('bandwidth', 0)
 #        self._specialFeatures = data.get('specialFeatures', [])
 
+        # Last CPU usage read from the cgroup used to compute the utilization
+        self._lastCPUUsage = None
+
         client.registerContainer(self)
 
-        # Create the directories for the container
-        self._confDir = confDir = pjoin(client.confDir, name)
-        self._dataDir = dataDir = pjoin(client.dataDir, name)
+        # Directories of the container; set as soon as they are created
+        self._confDir = None
+        self._dataDir = None
+
+        # Create network variables
+        bridgeIP = client.bridgeIP
+        self._ip = ip = '{0}.{1}'.format(bridgeIP.rsplit('.', 1)[0], nr)
+        self._address = '{0}:{1}'.format(ip, client.envPort)
+        self._rosproxyAddress = '{0}:{1}'.format(ip, client.rosproxyPort)
+        self._fwdPort = str(nr + 8700)
+        self._rosproxyFwdPort = str(nr + 10700)
+
+        self._ovsname = data.get('name')
+        self._ovsip = data.get('ip')
+
+        # Files which are bind mounted into the container as a list of tuples
+        # (source path, destination path, read-only flag)
+        self._mounts = []
+
+        # Setup pipeline; the container is created in the last but one stage
+        self._container = None
+        self._setup = None
+        self._started = False
+        self._timing = []
+
+    def setup(self):
+        """ Set up and start the container. The stages of the setup which
+            block on file I/O run in the setup thread pool of the container
+            client; therefore, several containers can be prepared concurrently.
+
+            @return:            Deferred whose callback is triggered with the
+                                container as soon as the container is started
+                                or whose errback is triggered if a stage
+                                failed or the container was destroyed during
+                                the setup.
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        if self._setup or self._started:
+            raise InternalError('Container is already set up.')
+
+        self._setup = d = succeed(None)
+
+        for stage, func, threaded in (('directories', self._createDirectories,
+                                       True),
+                                      ('configuration',
+                                       self._writeConfiguration, True),
+                                      ('container', self._createContainer,
+                                       True),
+                                      ('start', self.start, False)):
+            d.addCallback(self._runStage, stage, func, threaded)
+
+        d.addCallbacks(self._setupDone, self._setupFailed)
+        return d
+
+    def _runStage(self, _, stage, func, threaded):
+        """ Internally used method to run a single stage of the setup and to
+            record the time spent in the stage.
+        """
+        if self._terminating:
+            raise InternalError('Container has been destroyed during the '
+                                'setup.')
+
+        client = self._client
+        start = time.time()
+
+        if threaded:
+            d = deferToThreadPool(client.reactor, client.setupPool, func)
+        else:
+            d = maybeDeferred(func)
+
+        def record(result):
+            duration = time.time() - start
+            self._timing.append((stage, duration))
+            client.recordSetupStage(stage, duration)
+            return result
+
+        return d.addBoth(record)
+
+    def _setupDone(self, _):
+        """ Internally used method which is called when all stages of the
+            setup succeeded.
+        """
+        if self._terminating:
+            # The container has been destroyed during the last stage
+            return self._setupFailed(Failure(InternalError(
+                'Container has been destroyed during the setup.')))
+
+        self._setup = None
+        log.msg("Container '{0}' set up in {1:.3f} s ({2})".format(
+                    self._name, sum(t for _, t in self._timing),
+                    ', '.join('{0}: {1:.3f} s'.format(*stage)
+                              for stage in self._timing)))
+        return self
+
+    def _setupFailed(self, failure):
+        """ Internally used method which is called when a stage of the setup
+            failed or the container has been destroyed during the setup.
+        """
+        self._setup = None
+
+        if self._started:
+            # The container is already (partially) started
+            d = maybeDeferred(self._stop)
+            d.addErrback(lambda _: None)
+        else:
+            d = succeed(None)
+
+        d.addCallback(lambda _: self._destroy())
+
+        if self._terminating and not self._terminating.called:
+            d.chainDeferred(self._terminating)
+
+        return d.addCallback(lambda _: failure)
+
+    def _createDirectories(self):
+        """ Internally used method to create the directories of the container.
+            Runs in a thread.
+        """
+        client = self._client
+        name = self._name
+
+        confDir = pjoin(client.confDir, name)
+        dataDir = pjoin(client.dataDir, name)
 
         if os.path.isdir(confDir):
             raise ValueError('There is already a configuration directory for '
@@ -148,7 +282,9 @@ class RCEContainer(Referenceable):
                              'did not shut down correctly on last execution and '
                              'you are sure it is not in use. \n dir: {1}.'.format(name, dataDir))
         os.mkdir(confDir)
+        self._confDir = confDir
         os.mkdir(dataDir)
+        self._dataDir = dataDir
 
         # Create additional folders for the container
         rceDir = pjoin(dataDir, 'rce')
@@ -162,39 +298,38 @@ class RCEContainer(Referenceable):
             shutil.copytree(pjoin(client.rootfs, 'root/.ros/rosdep'),
                             pjoin(rceDir, '.ros/rosdep'))
 
-        # Create network variables
-        bridgeIP = client.bridgeIP
-        ip = '{0}.{1}'.format(bridgeIP.rsplit('.', 1)[0], nr)
-        self._address = '{0}:{1}'.format(ip, client.envPort)
-        self._rosproxyAddress = '{0}:{1}'.format(ip, client.rosproxyPort)
-        self._fwdPort = str(nr + 8700)
-        self._rosproxyFwdPort = str(nr + 10700)
-
-        ovsname = data.get('name')
-        ovsip = data.get('ip')
-
-        if ovsname and ovsip:
-            ovsif = 'eth1'
-            ovsup = pjoin(confDir, 'ovsup')
+        self._mounts.append((rosDir, 'home/ros', False))
+        self._mounts.append((rceDir, 'opt/rce/data', False))
+        self._mounts.append((client.SHM_DIR, 'opt/rce/shm', False))
 
-            if client.ubuntuRel > 'quantal':
-                ovsdown = pjoin(confDir, 'ovsdown')
-            else:
-                ovsdown = None
-        else:
-            ovsif = ovsup = ovsdown = None
+    def _writeConfiguration(self):
+        """ Internally used method to write the configuration files which are
+            used inside the container. Runs in a thread.
+        """
+        client = self._client
+        confDir = self._confDir
+        bridgeIP = client.bridgeIP
 
         # Construct password
         passwd = encodeAES(cipher(client.masterPassword),
-                           salter(uid, client.infraPassword))
+                           salter(self._uid, client.infraPassword))
 
         # Create upstart scripts
         upComm = pjoin(confDir, 'upstartComm')
         with open(upComm, 'w') as f:
+            preload = ' '.join('--preload {0}:{1}'.format(*cls)
+                               for cls in client.preload)
+
+            if client.metricsPort:
+                metrics = '--metrics-port {0}'.format(client.metricsPort)
+            else:
+                metrics = ''
+
             f.write(_UPSTART_COMM.format(masterIP=client.masterIP,
                                          masterPort=client.masterPort,
                                          internalPort=client.envPort,
-                                         uid=uid, passwd=passwd))
+                                         uid=self._uid, passwd=passwd,
+                                         preload=preload, metrics=metrics))
 
         upRosapi = pjoin(confDir, 'upstartRosapi')
         with open(upRosapi, 'w') as f:
@@ -213,30 +348,31 @@ class RCEContainer(Referenceable):
             f.write('\n')
             f.write('auto eth0\n')
             f.write('iface eth0 inet static\n')
-            f.write('    address {0}\n'.format(ip))
+            f.write('    address {0}\n'.format(self._ip))
             f.write('    gateway {0}\n'.format(bridgeIP))
             f.write('    dns-nameservers {0} 127.0.0.1\n'.format(bridgeIP))
 
-            if ovsif:
+            if self._ovsname and self._ovsip:
                 f.write('\n')
-                f.write('auto {0}\n'.format(ovsif))
-                f.write('iface {0} inet static\n'.format(ovsif))
-                f.write('    address {0}\n'.format(ovsip))
+                f.write('auto eth1\n')
+                f.write('iface eth1 inet static\n')
+                f.write('    address {0}\n'.format(self._ovsip))
 
         # Create up/down script for virtual network interface if necessary
-        if ovsup:
-            with open(ovsup, 'w') as f:
+        if self._ovsname and self._ovsip:
+            with open(pjoin(confDir, 'ovsup'), 'w') as f:
                 f.write(_LXC_NETWORK_SCRIPT.format(if_op='up', ovs_op='add',
-                                                   name=ovsname))
+                                                   name=self._ovsname))
 
-            os.chmod(ovsup, stat.S_IRWXU)
+            os.chmod(pjoin(confDir, 'ovsup'), stat.S_IRWXU)
 
-        if ovsdown:
-            with open(ovsdown, 'w') as f:
-                f.write(_LXC_NETWORK_SCRIPT.format(if_op='down', ovs_op='del',
-                                                   name=ovsname))
+            if client.ubuntuRel > 'quantal':
+                with open(pjoin(confDir, 'ovsdown'), 'w') as f:
+                    f.write(_LXC_NETWORK_SCRIPT.format(if_op='down',
+                                                       ovs_op='del',
+                                                       name=self._ovsname))
 
-            os.chmod(ovsdown, stat.S_IRWXU)
+                os.chmod(pjoin(confDir, 'ovsdown'), stat.S_IRWXU)
 
         # TODO: SSL stuff
 #        if self._USE_SSL:
@@ -251,31 +387,123 @@ class RCEContainer(Referenceable):
 #            writeCertToFile(cert, os.path.join(rceDir, 'cert.pem'))
 #            writeKeyToFile(key, os.path.join(rceDir, 'key.pem'))
 
+        self._mounts.append((upComm, 'etc/init/rceComm.conf', True))
+        # TODO: For the moment there is no upstart script for the launcher.
+#        self._mounts.append((upLauncher, 'etc/init/rceLauncher.conf', True))
+        self._mounts.append((upRosapi, 'etc/init/rceRosapi.conf', True))
+        self._mounts.append((networkIF, 'etc/network/interfaces', True))
+
+    def _createContainer(self):
+        """ Internally used method to create the container and write its
+            configuration and fstab file. Runs in a thread.
+        """
+        client = self._client
+        confDir = self._confDir
+
         # Create the container
-        self._container = container = Container(client.reactor, client.rootfs,
-                                                confDir, name)
+        container = Container(client.reactor, client.rootfs, confDir,
+                              self._name)
 
-        # Add lxc bridge
-        container.addNetworkInterface('eth0', client.bridgeIF, ip)
+        # Add lxc bridge
+        pair = 'veth{0}'.format(self._name)
+        container.addNetworkInterface('eth0', client.bridgeIF, self._ip,
+                                      pair=pair)
 
-        # Add the virtual network bridge if necessary
-        if ovsname and ovsip:
-            container.addNetworkInterface(ovsif, None, ovsip, ovsup, ovsdown)
+        # Limit the resources according to the requested container size
+        cpu, memory, bandwidth = self._getLimits(client.resources)
+        container.limitResources(1024 * self._size, cpu,
+                                 memory * 1024 * 1024 if memory else None)
+
+        if bandwidth:
+            container.limitBandwidth(pair, int(bandwidth * 1000))
+
+        # Add the virtual network bridge if necessary
+        if self._ovsname and self._ovsip:
+            ovsup = pjoin(confDir, 'ovsup')
+            ovsdown = pjoin(confDir, 'ovsdown')
+
+            if not os.path.exists(ovsdown):
+                ovsdown = None
+
+            container.addNetworkInterface('eth1', None, self._ovsip, ovsup,
+                                          ovsdown)
 
         # Add additional lines to fstab file of container
-        container.extendFstab(rosDir, 'home/ros', False)
-        container.extendFstab(rceDir, 'opt/rce/data', False)
-        container.extendFstab(upComm, 'etc/init/rceComm.conf', True)
-        # TODO: For the moment there is no upstart script for the launcher.
-#        container.extendFstab(upLauncher, 'etc/init/rceLauncher.conf', True)
-        container.extendFstab(upRosapi, 'etc/init/rceRosapi.conf', True)
-        container.extendFstab(networkIF, 'etc/network/interfaces', True)
+        for srcPath, destPath, ro in self._mounts:
+            container.extendFstab(srcPath, destPath, ro)
 
         for srcPath, destPath in client.pkgDirIter:
             container.extendFstab(srcPath, destPath, True)
 
+        container.prepare()
+        self._container = container
+
+    def _getLimits(self, resources):
+        """ Internally used method to get the resource limits of the
+            container. Limits which are not explicitly requested are given
+            the share of the machine resources matching the container size.
+
+            @param resources:   Total resources of the machine.
+            @type  resources:   dict
+
+            @return:            Number of CPUs, memory in MB and bandwidth in
+                                Mbit/s, where None means that there is no
+                                limit.
+            @rtype:             (float, int, float)
+        """
+        machineSize = resources.get('size')
+        share = float(self._size) / machineSize if machineSize else None
+
+        def limit(requested, total):
+            if requested:
+                return requested
+
+            if share and total:
+                return total * share
+
+            return None
+
+        memory = limit(self._memory, resources.get('memory'))
+
+        return (limit(self._cpu, resources.get('cpu')),
+                int(memory) if memory else None,
+                limit(self._bandwidth, resources.get('bandwidth')))
+
+    @property
+    def started(self):
+        """ Flag whether the container has been started. """
+        return self._started
+
+    def getUsage(self):
+        """ Get the resource usage of the container.
+
+            @return:            Dictionary with the CPU utilization in percent
+                                of one CPU since the last call ('cpu'), the
+                                currently used memory ('memory') and the
+                                maximal used memory ('memoryMax') in bytes.
+                                Values which are not available are None.
+            @rtype:             dict
+        """
+        usage = self._container.getUsage(self._name)
+        now = time.time()
+        cpu, usage['cpu'] = usage['cpu'], None
+
+        if cpu is not None:
+            if self._lastCPUUsage:
+                lastTime, lastCPU = self._lastCPUUsage
+                dt = now - lastTime
+
+                if dt > 0 and cpu >= lastCPU:
+                    usage['cpu'] = (cpu - lastCPU) / dt / 1e7
+
+            self._lastCPUUsage = (now, cpu)
+
+        return usage
+
     def start(self):
-        """ Method which starts the container.
+        """ Method which starts the container. The container has to be set
+            up using the method 'setup' which calls this method as its last
+            stage.
         """
         # NOTE: can raise iptc.xtables.XTablesError
         # add remote rule for RCE internal communication
@@ -320,10 +548,25 @@ class RCEContainer(Referenceable):
         t.to_destination = self._rosproxyAddress
         self._roslocalRule = rule
 
-        self._client.prerouting.insert_rule(self._remoteRule)
-        self._client.output.insert_rule(self._localRule)
-        self._client.prerouting.insert_rule(self._rosremoteRule)
-        self._client.output.insert_rule(self._roslocalRule)
+        rules = ((self._client.prerouting, self._remoteRule),
+                 (self._client.output, self._localRule),
+                 (self._client.prerouting, self._rosremoteRule),
+                 (self._client.output, self._roslocalRule))
+        inserted = []
+
+        try:
+            for chain, rule in rules:
+                chain.insert_rule(rule)
+                inserted.append((chain, rule))
+        except:
+            # The container is not marked as started and is therefore not
+            # stopped; remove the rules which have already been inserted
+            for chain, rule in inserted:
+                chain.delete_rule(rule)
+
+            raise
+
+        self._started = True
 
         return self._container.start(self._name)
 
@@ -368,10 +611,14 @@ class RCEContainer(Referenceable):
         """ Method should be called to destroy the container.
         """
         if not self._terminating:
-            if self._container:
+            if self._setup:
+                # The setup is aborted after the current stage
+                self._terminating = Deferred()
+            elif self._started:
                 self._terminating = self._stop()
                 self._terminating.addBoth(passthrough(self._destroy))
             else:
+                self._destroy()
                 self._terminating = succeed(None)
 
         return self._terminating
@@ -388,9 +635,18 @@ class ContainerClient(Referenceable):
     """
     _UID_LEN = 8
 
+    # CONFIG
+    SYSINFO_INTERVAL = 5  # Time in seconds between two resource samples
+    SYSINFO_BATCH = 6  # Number of samples which are sent in one batch
+    SYSINFO_BACKLOG = 120  # Maximum number of samples buffered if not sent
+    SETUP_POOL_MIN = 1  # Minimum number of threads used to set up containers
+    SETUP_POOL_MAX = 4  # Maximum number of containers set up concurrently
+    SHM_DIR = '/dev/shm/rce'  # Directory for local endpoint connections
+
     def __init__(self, reactor, masterIP, masterPort, masterPasswd, infraPasswd,
                  bridgeIF, intIP, bridgeIP, envPort, rosproxyPort, rootfsDir,
-                 confDir, dataDir, pkgDir, ubuntuRel, rosRel, data):
+                 confDir, dataDir, pkgDir, ubuntuRel, rosRel, preload,
+                 metricsPort, data):
         """ Initialize the Container Client.
 
             @param reactor:         Reference to the twisted reactor.
@@ -464,6 +720,18 @@ class ContainerClient(Referenceable):
                                     deployment instance of the cloud engine
             @type  rosRel:          str
 
+            @param preload:         ROS classes which should be loaded by the
+                                    environment processes before they accept
+                                    connections as a list of tuples where each
+                                    tuple contains the type of the class, i.e.
+                                    'msg' or 'srv', and the name of the class.
+            @type  preload:         [(str, str)]
+
+            @param metricsPort:     Port where the environment processes serve
+                                    their metrics over HTTP; 0 disables the
+                                    metrics servers.
+            @type  metricsPort:     int
+
             @param data:            More data about the machine configuration.
             @type  data:            dict
         """
@@ -491,9 +759,27 @@ class ContainerClient(Referenceable):
         self._ubuntuRel = ubuntuRel
         self._rosRel = rosRel
 
+        # ROS classes loaded by the environment processes
+        self._preload = preload
+
+        # Port of the metrics servers of the environment processes
+        self._metricsPort = metricsPort
+
         for _, path in self._pkgDir:
             os.mkdir(os.path.join(self._rootfs, path))
 
+        # Directory for the shared memory and the Unix domain sockets of the
+        # endpoints in this machine, which is bind mounted into all containers;
+        # the files in it can only be opened if their name is known
+        if not os.path.isdir(self.SHM_DIR):
+            os.mkdir(self.SHM_DIR)
+            os.chmod(self.SHM_DIR, 01733)
+
+        shmDir = os.path.join(self._rootfs, 'opt/rce/shm')
+
+        if not os.path.isdir(shmDir):
+            os.mkdir(shmDir)
+
         # Container info
         self._nrs = set(range(100, 200))
         self._containers = set()
@@ -520,6 +806,112 @@ class ContainerClient(Referenceable):
         self._prerouting = iptc.Chain(nat, 'PREROUTING')
         self._output = iptc.Chain(nat, 'OUTPUT')
 
+        # Reference to the Master; set after the login
+        self._avatar = None
+
+        # Samples of the machine resources which are pushed to the Master
+        self._samples = []
+        self._usage = []
+        self._sampler = LoopingCall(self._sampleSysinfo)
+        self._sampler.clock = reactor
+        self._sampler.start(self.SYSINFO_INTERVAL)
+
+        # The stages of the container setup which block on file I/O run in
+        # their own pool; the time spent in each stage is recorded
+        self._setupPool = InstrumentedThreadPool(self.SETUP_POOL_MIN,
+                                                 self.SETUP_POOL_MAX,
+                                                 'ContainerSetup')
+        self._setupPool.start()
+        self._setupTimes = {}
+        reactor.addSystemEventTrigger('during', 'shutdown',
+                                      self._stopSetupPool)
+
+    def _stopSetupPool(self):
+        """ Internally used method to stop the thread pool for the container
+            setup.
+        """
+        log.msg('Container setup statistics: {0}'.format(self.setupStats))
+        self._setupPool.stop()
+
+    def recordSetupStage(self, stage, duration):
+        """ Record the time spent in a stage of a container setup.
+
+            @param stage:       Name of the stage.
+            @type  stage:       str
+
+            @param duration:    Time in seconds spent in the stage.
+            @type  duration:    float
+        """
+        if stage not in self._setupTimes:
+            self._setupTimes[stage] = Histogram()
+
+        self._setupTimes[stage].observe(duration)
+
+    @property
+    def setupPool(self):
+        """ Thread pool which is used for the container setup. """
+        return self._setupPool
+
+    @property
+    def setupStats(self):
+        """ Statistics of the container setup as a dictionary containing the
+            statistics of the setup thread pool ('pool') and a snapshot of
+            the histogram of the time spent in each stage ('stages').
+        """
+        return {'pool':self._setupPool.stats,
+                'stages':dict((stage, hist.snapshot)
+                              for stage, hist in self._setupTimes.iteritems())}
+
+    def _sampleSysinfo(self):
+        """ Internally used method to take a sample of the machine resources
+            and push the samples to the Master once a batch is complete.
+        """
+        mem = sysinfo.get_sys_meminfo()
+
+        # Only count the traffic of the physical interfaces; the traffic of
+        # the containers would be counted twice otherwise
+        net = [c for name, c in sysinfo.network_io_counters().iteritems()
+               if name not in ('lo', self._bridgeIF)
+                  and not name.startswith('veth')]
+        disk = sysinfo.disk_io_counters().values()
+
+        self._samples.append((int(time.time()),
+                              int(sysinfo.cpu_percent(interval=None) * 10),
+                              mem.total - mem.available, mem.total,
+                              sum(c.bytes_sent for c in net),
+                              sum(c.bytes_recv for c in net),
+                              sum(c.read_bytes for c in disk),
+                              sum(c.write_bytes for c in disk)))
+
+        # Resource usage of the containers read from the cgroups
+        self._usage = [(container, container.getUsage())
+                       for container in self._containers if container.started]
+
+        if len(self._samples) >= self.SYSINFO_BATCH:
+            self._pushSysinfo()
+
+    def _pushSysinfo(self):
+        """ Internally used method to send the buffered samples to the
+            Master as a delta encoded batch together with the most recent
+            resource usage of the containers.
+        """
+        if not self._avatar:
+            del self._samples[:-self.SYSINFO_BACKLOG]
+            return
+
+        batch = encodeBatch(self._samples)
+        self._samples = []
+
+        def eb(failure):
+            if not failure.check(PBConnectionLost):
+                log.err(failure)
+
+        try:
+            self._avatar.callRemote('pushSysinfo', batch,
+                                    self._usage).addErrback(eb)
+        except (DeadReferenceError, PBConnectionLost):
+            pass
+
     def remote_getSysinfo(self, request):
         """ Get realtime Sysinfo data from machine.
 
@@ -612,6 +1004,28 @@ class ContainerClient(Referenceable):
         """
         return self._rosRel
 
+    @property
+    def resources(self):
+        """ Total resources of the machine as a dictionary with the keys
+            'size', 'cpu', 'memory' and 'bandwidth'.
+        """
+        return {'size':self._size, 'cpu':self._cpu, 'memory':self._memeory,
+                'bandwidth':self._bandwidth}
+
+    @property
+    def preload(self):
+        """ ROS classes which are loaded by the environment processes before
+            they accept connections.
+        """
+        return self._preload
+
+    @property
+    def metricsPort(self):
+        """ Port where the environment processes serve their metrics; 0 if
+            the metrics servers are disabled.
+        """
+        return self._metricsPort
+
     @property
     def bridgeIF(self):
         """ Network interface used for the communication with the containers.
@@ -670,8 +1084,7 @@ class ContainerClient(Referenceable):
         except KeyError:
             raise MaxNumberExceeded('Can not manage any additional container.')
 
-        container = RCEContainer(self, nr, uid, data)
-        return container.start().addCallback(lambda _: container)
+        return RCEContainer(self, nr, uid, data).setup()
 
     def registerContainer(self, container):
         assert container not in self._containers
@@ -802,6 +1215,9 @@ class ContainerClient(Referenceable):
         """ Method should be called to terminate all running containers before
             the reactor is stopped.
         """
+        if self._sampler.running:
+            self._sampler.stop()
+
         deferreds = []
 
         for container in self._containers.copy():
@@ -817,7 +1233,8 @@ class ContainerClient(Referenceable):
 
 def main(reactor, cred, masterIP, masterPort, masterPassword, infraPasswd,
          bridgeIF, internalIP, bridgeIP, envPort, rosproxyPort, rootfsDir,
-         confDir, dataDir, pkgDir, ubuntuRel, rosRel, data):
+         confDir, dataDir, pkgDir, ubuntuRel, rosRel, preload, metricsPort,
+         data):
     log.startLogging(sys.stdout)
 
     def _err(reason):
@@ -830,11 +1247,15 @@ def main(reactor, cred, masterIP, masterPort, masterPassword, infraPasswd,
     client = ContainerClient(reactor, masterIP, masterPort, masterPassword,
                              infraPasswd, bridgeIF, internalIP, bridgeIP,
                              envPort, rosproxyPort, rootfsDir, confDir, dataDir,
-                             pkgDir, ubuntuRel, rosRel, data)
+                             pkgDir, ubuntuRel, rosRel, preload, metricsPort,
+                             data)
 
     d = factory.login(cred, (client, data))
     d.addCallback(lambda ref: setattr(client, '_avatar', ref))
     d.addErrback(_err)
 
+    # Detect callbacks which block the reactor
+    ReactorWatchdog(reactor).start()
+
     reactor.addSystemEventTrigger('before', 'shutdown', client.terminate)
     reactor.run()
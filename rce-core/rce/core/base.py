@@ -30,6 +30,9 @@
 #
 #
 
+# Python specific imports
+from time import time
+
 # twisted specific imports
 from twisted.python import log
 from twisted.python.failure import Failure
@@ -38,6 +41,7 @@ from twisted.spread.pb import RemoteReference, \
     DeadReferenceError, PBConnectionLost
 
 # rce specific imports
+from rce.util.metrics import registry
 from rce.core.error import AlreadyDead
 
 
@@ -93,8 +97,17 @@ class Proxy(object):
 
         d.addCallback(lambda ref: ref.callRemote(_name, *args, **kw))
         d.addErrback(self.__filter, _name)
+        d.addBoth(self.__observe, _name, time())
         return d
 
+    def __observe(self, result, name, start):
+        """ Internally used method to measure the latency of a remote call.
+        """
+        registry.histogram('rce_pb_call_seconds',
+                           'Latency of the Perspective Broker calls made by '
+                           'the Master.', method=name).observe(time() - start)
+        return result
+
     def callback(self, obj):
         """ Register the remote reference which provides the necessary methods
             for this Proxy. Fires all pending callbacks passing on the remote
@@ -187,11 +200,21 @@ class Proxy(object):
         """
         self.__destroy()
 
+    def refersTo(self, remoteObject):
+        """ Method to compare given remote reference with Proxy's remote
+            reference.
+
+            @return:            True if the Proxy represents the given remote
+                                object.
+            @rtype:             bool
+        """
+        return remoteObject == self.__obj
+
     def destroyExternal(self, remoteObject):
         """ Method to compare given remote reference with Proxy's remote
             reference and destroy if they are the same.
         """
-        if remoteObject == self.__obj:
+        if self.refersTo(remoteObject):
             self.destroy()
             return True
 
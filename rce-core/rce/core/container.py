@@ -69,6 +69,8 @@ class Container(Proxy):
         self._pending = set()
         self._address = None
 
+        self._usage = None
+
     @property
     def size(self):
         """ # TODO: Add doc """
@@ -104,12 +106,32 @@ class Container(Proxy):
         """ Reference to the machine proxy in which the container resides. """
         return self._machine
 
+    @property
+    def usage(self):
+        """ Most recent resource usage of the container read from its cgroup
+            as a dictionary with the keys 'cpu' (in percent of one CPU),
+            'memory' and 'memoryMax' (in bytes) or None if there is no
+            information yet.
+        """
+        return self._usage
+
     @property
     def serialized(self):
         """ Property is used to store the relevant container information for
             the container process.
         """
-        return {'name':self._group.name, 'ip':self._ip}
+        return {'name':self._group.name, 'ip':self._ip, 'size':self._size,
+                'cpu':self._cpu, 'memory':self._memory,
+                'bandwidth':self._bandwidth}
+
+    def setUsage(self, usage):
+        """ Update the resource usage of the container.
+
+            @param usage:       Resource usage as reported by the container
+                                process.
+            @type  usage:       dict
+        """
+        self._usage = usage
 
     def assignMachine(self, machine):
         """ # TODO: Add doc
@@ -50,6 +50,42 @@ class Node(Proxy):
         self._namespace = namespace
         namespace.registerNode(self)
 
+        self._stats = None
+
+    @property
+    def stats(self):
+        """ Most recent resource usage of the node, i.e. a dictionary with the
+            keys 'pid', 'cpu' (in percent of one CPU), 'memory' (resident
+            memory in bytes), 'threads', 'fds', 'processes' and 'restarts',
+            or None if there is no information yet.
+        """
+        return self._stats
+
+    def setStats(self, stats):
+        """ Update the resource usage of the node.
+
+            @param stats:       Resource usage as reported by the environment
+                                process.
+            @type  stats:       dict
+        """
+        self._stats = stats
+
+    def getLog(self, lines):
+        """ Get the last lines of the output of the node.
+
+            @param lines:       Number of lines which should be returned for
+                                stdout and stderr.
+            @type  lines:       int
+
+            @return:            Last lines of stdout and stderr with the keys
+                                'out' and 'err' and the unique ID of the node,
+                                which is used to stream the output, with the
+                                key 'id'.
+                                (type: dict)
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        return self.callRemote('getLog', lines)
+
     def destroy(self):
         """ Method should be called to destroy the node and will take care
             of deleting all circular references.
@@ -143,6 +179,32 @@ class Environment(Namespace):
         self.callRemote('createParameter', name, value).chainDeferred(parameter)
         return parameter
 
+    def createParameters(self, parameters):
+        """ Create multiple parameters (in ROS parameter server) inside the
+            environment using a single request.
+
+            @param parameters:  List of tuples containing the name and the
+                                value of the parameters which should be added.
+            @type  parameters:  [(str, str/int/float/bool/list)]
+
+            @return:            New Parameter instances in the same order as
+                                the given parameters.
+            @rtype:             [rce.core.environment.Parameter]
+        """
+        params = [Parameter(self) for _ in parameters]
+
+        def cb(remoteParams):
+            for param, remoteParam in zip(params, remoteParams):
+                param.callback(remoteParam)
+
+        def eb(failure):
+            for param in params:
+                param.errback(failure)
+
+        d = self.callRemote('createParameters', parameters)
+        d.addCallbacks(cb, eb)
+        return params
+
     def getAddress(self):
         """ Get the address of the endpoint of the environment namespace.
         """
@@ -181,6 +243,19 @@ class Environment(Namespace):
             if node.destroyExternal(remoteNode):
                 break
 
+    def updateNodeStats(self, stats):
+        """ Update the resource usage of the node proxies.
+
+            @param stats:       List of tuples containing the reference to the
+                                remote node and its resource usage.
+            @type  stats:       [(twisted.spread.pb.RemoteReference, dict)]
+        """
+        for remoteNode, nodeStats in stats:
+            for node in self._nodes:
+                if node.refersTo(remoteNode):
+                    node.setStats(nodeStats)
+                    break
+
     def destroyParameter(self, remoteParam):
         """ Method should be called to destroy the parameter proxy referenced by
             the remote parameter namespace.
@@ -284,6 +359,19 @@ class EnvironmentEndpoint(Endpoint):
         except StopIteration:
             pass
 
+    def updateNodeStats(self, stats):
+        """ Update the resource usage of the node proxies.
+
+            @param stats:       List of tuples containing the reference to the
+                                remote node and its resource usage.
+            @type  stats:       [(twisted.spread.pb.RemoteReference, dict)]
+        """
+        # TODO: Workaround for now...
+        try:
+            iter(self._namespaces).next().updateNodeStats(stats)
+        except StopIteration:
+            pass
+
     def destroyParameter(self, remoteParam):
         """ Method should be called to destroy the parameter proxy referenced by
             the remote parameter namespace.
@@ -329,6 +417,16 @@ class EnvironmentEndpointAvatar(EndpointAvatar):
         """
         self._endpoint.destroyNode(remoteNode)
 
+    def perspective_pushNodeStats(self, stats):
+        """ Push the resource usage of the nodes.
+
+            @param stats:       List of tuples containing the reference to the
+                                Node in the Environment process and its
+                                resource usage.
+            @type  stats:       [(twisted.spread.pb.RemoteReference, dict)]
+        """
+        self._endpoint.updateNodeStats(stats)
+
     def perspective_parameterDied(self, remoteParameter):
         """ Notify that a remote parameter died.
 
@@ -43,6 +43,7 @@ from rce.util.error import InternalError
 from rce.util.settings import getSettings
 from rce.util.network import isLocalhost
 from rce.util.iaas import IaasHook
+from rce.util.telemetry import SysinfoBuffer
 from rce.core.error import InvalidRequest, MaxNumberExceeded
 from rce.core.container import Container
 
@@ -214,10 +215,14 @@ class LoadBalancer(object):
 
         candidates = [m for m in machines if m.getUserCount(userID)]
 
+        # Prefer the machine with the most free capacity; if there are
+        # multiple, the one with the lowest CPU load
+        key = lambda m: (m.availability, -(m.cpuLoad or 0.0))
+
         if candidates:
-            return max(candidates, key=lambda m: m.availability)
+            return max(candidates, key=key)
         else:
-            return max(machines, key=lambda m: m.availability)
+            return max(machines, key=key)
 
     def createContainer(self, uid, userID, data):
         """ Select an appropriate machine and create a container.
@@ -284,6 +289,10 @@ class Machine(object):
     """ Representation of a machine in which containers can be created. It
         keeps track of all the containers running in the machine.
     """
+    # CONFIG
+    SYSINFO_SIZE = 720  # Number of resource samples kept for each machine
+    SYSINFO_AVERAGE = 12  # Number of samples used to compute the load
+
     def __init__(self, ref, data, balancer):
         """ Initialize the Machine.
 
@@ -313,6 +322,8 @@ class Machine(object):
         self._containers = set()
         self._users = Counter()
 
+        self._sysinfo = SysinfoBuffer(self.SYSINFO_SIZE)
+
     @property
     def active(self):
         """ The number of active containers in the machine. """
@@ -354,6 +365,44 @@ class Machine(object):
         """
         return self._ip
 
+    @property
+    def sysinfo(self):
+        """ Ring buffer with the most recent resource samples of the machine.
+        """
+        return self._sysinfo
+
+    @property
+    def cpuLoad(self):
+        """ Average CPU utilization of the machine in percent over the most
+            recent samples or None if there are no samples.
+        """
+        return self._sysinfo.average('cpu', self.SYSINFO_AVERAGE)
+
+    def addSysinfo(self, batch):
+        """ Add resource samples pushed from the machine.
+
+            @param batch:       Delta encoded batch of samples. Refer to
+                                rce.util.telemetry for more information.
+            @type  batch:       [[int]]
+        """
+        try:
+            self._sysinfo.add(batch)
+        except (TypeError, ValueError):
+            raise InvalidRequest('Received invalid resource samples.')
+
+    def updateUsage(self, usage):
+        """ Update the resource usage of the containers in the machine.
+
+            @param usage:       List of tuples containing the reference to the
+                                remote container and its resource usage.
+            @type  usage:       [(twisted.spread.pb.RemoteReference, dict)]
+        """
+        for remoteContainer, containerUsage in usage:
+            for container in self._containers:
+                if container.refersTo(remoteContainer):
+                    container.setUsage(containerUsage)
+                    break
+
     def getUserCount(self, userID):
         """ # TODO: Add doc
         """
@@ -441,11 +490,13 @@ class Machine(object):
         else:
             del self._users[container.userID]
 
-# TODO: Not used
-#    def listContainers(self):
-#        """ # TODO: Add doc
-#        """
-#        return self._containers
+    def listContainers(self):
+        """ Get the Container proxies which are running in the machine.
+
+            @return:            Container proxies of the machine.
+            @rtype:             [rce.core.container.Container]
+        """
+        return list(self._containers)
 
     def destroyContainer(self, remoteContainer):
         """ Destroy Container proxy.
@@ -496,6 +547,21 @@ class MachineAvatar(Avatar):
         """
         self._machine.destroyContainer(remoteContainer)
 
+    def perspective_pushSysinfo(self, batch, usage):
+        """ Push resource samples of the machine.
+
+            @param batch:       Delta encoded batch of samples. Refer to
+                                rce.util.telemetry for more information.
+            @type  batch:       [[int]]
+
+            @param usage:       List of tuples containing the reference to the
+                                remote container and its resource usage read
+                                from the cgroup of the container.
+            @type  usage:       [(twisted.spread.pb.RemoteReference, dict)]
+        """
+        self._machine.addSysinfo(batch)
+        self._machine.updateUsage(usage)
+
     def logout(self):
         """ Callback which should be called upon disconnection of the Machine
         """
@@ -35,7 +35,7 @@ from uuid import uuid4
 
 # twisted specific imports
 from twisted.python.failure import Failure
-from twisted.internet.defer import Deferred, DeferredList
+from twisted.internet.defer import Deferred, DeferredList, gatherResults
 from twisted.spread.pb import Referenceable, Error, PBConnectionLost, Avatar
 
 # rce specific imports
@@ -229,6 +229,28 @@ class Endpoint(Proxy):
 
         return self._loopback
 
+    def profile(self, duration):
+        """ Profile the process of the endpoint.
+
+            @param duration:    Duration of the profile in seconds.
+            @type  duration:    float
+
+            @return:            Collapsed stacks of the process. (type: str)
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        return self.callRemote('profile', duration)
+
+    def getSocketName(self):
+        """ Get the name of the Unix domain socket of the endpoint's internal
+            communication server, which is used by endpoints in the same
+            machine.
+
+            @return:            Name of the socket or None if the endpoint does
+                                not accept local connections. (type: str)
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        return self.callRemote('getSocketName')
+
     def prepareConnection(self, connID, key, auth):
         """ Prepare the endpoint for the connection attempt by adding the
             necessary connection information to the remote process. When the
@@ -253,7 +275,7 @@ class Endpoint(Proxy):
         """
         return self.callRemote('prepareConnection', connID, key, auth)
 
-    def connect(self, connID, addr):
+    def connect(self, connID, addr, socketName=None):
         """ Tell the endpoint to connect to the given address using the
             authentication details matching the given connection ID. This
             means that the connection has to be first prepared using
@@ -269,10 +291,17 @@ class Endpoint(Proxy):
                                 It consists of an IP address and a port number.
             @type  addr:        (str, int)
 
+            @param socketName:  Name of the Unix domain socket of the other
+                                endpoint, if the two endpoints are in the same
+                                machine. The socket is used instead of the
+                                address and shared memory is used for the
+                                payload of large messages.
+            @type  socketName:  str
+
             @return:            None.
             @rtype:             twisted.internet.defer.Deferred
         """
-        return self.callRemote('connect', connID, addr)
+        return self.callRemote('connect', connID, addr, socketName)
 
     def registerNamespace(self, namespace):
         assert namespace not in self._namespaces
@@ -833,14 +862,20 @@ class EndpointConnection(object):
         """ Internally used method which is part of a callback chain.
             Its task is to verify that both endpoints are ready for the
             connection attempt. In case both signal readiness the address
-            of the designated server endpoint is retrieved.
+            of the designated server endpoint is retrieved. If both endpoints
+            report the same host, the Unix domain socket of the server
+            endpoint is preferred.
 
             @param result:      Response of the DeferredList containing the
                                 Deferreds of the 'prepareConnection' calls.
 
-            @return:            Address of the endpoint's internal
-                                communication server.
-            @rtype:             twisted.internet.address.IPv4Address
+            @return:            Address of the server endpoint's internal
+                                communication server and the name of its Unix
+                                domain socket, which is None if the endpoints
+                                are not in the same machine.
+                                (type: (twisted.internet.address.IPv4Address,
+                                        str))
+            @rtype:             twisted.internet.defer.Deferred
         """
         ((serverReady, _), (clientReady, _)) = result
 
@@ -851,15 +886,34 @@ class EndpointConnection(object):
             return Failure(InternalError('Server/Client could not be prepared '
                                          'for connection attempt.'))
 
-        return self._serverEndpoint.getAddress()
+        d = gatherResults([self._serverEndpoint.getAddress(),
+                           self._clientEndpoint.getAddress()])
+        d.addCallback(self._getSocketName)
+        return d
+
+    def _getSocketName(self, addresses):
+        """ Internally used method which is part of a callback chain.
+            Its task is to retrieve the name of the Unix domain socket of the
+            server endpoint if both endpoints report the same host.
+        """
+        serverAddr, clientAddr = addresses
+
+        if serverAddr.host != clientAddr.host:
+            return serverAddr, None
 
-    def _connect(self, addr, connID):
+        d = self._serverEndpoint.getSocketName()
+        d.addCallback(lambda socketName: (serverAddr, socketName))
+        return d
+
+    def _connect(self, result, connID):
         """ Internally used method which is part of a callback chain.
             Its task is to send the 'connect' command to the client.
 
-            @param addr:        Address of the endpoint's internal
-                                communication server.
-            @rtype:             twisted.internet.address.IPv4Address
+            @param result:      Address of the endpoint's internal
+                                communication server and the name of its Unix
+                                domain socket, which is None if the endpoints
+                                are not in the same machine.
+            @type  result:      (twisted.internet.address.IPv4Address, str)
 
             @param connID:      Connection ID which is used to identify the
                                 appropriate authentication key.
@@ -868,7 +922,9 @@ class EndpointConnection(object):
             @return:            None.
             @rtype:             twisted.internet.defer.Deferred
         """
-        return self._clientEndpoint.connect(connID, (addr.host, addr.port))
+        addr, socketName = result
+        return self._clientEndpoint.connect(connID, (addr.host, addr.port),
+                                            socketName)
 
     def _connectPrepError(self, failure, authenticator):
         """ Internally used method which is part of an errback chain.
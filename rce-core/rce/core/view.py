@@ -199,6 +199,31 @@ class ControlView(Viewable):
 
         # TODO: Return some info about success/failure of request
 
+    def view_addParameters(self, user, cTag, parameters):
+        """ Add multiple parameters to a ROS environment using a single round
+            trip to the parameter server.
+
+            @param user:        User for which the parameters will be added.
+            @type  user:        rce.core.user.User
+
+            @param cTag:        Tag which is used to identify the ROS
+                                environment to which the parameters should be
+                                added.
+            @type  cTag:        str
+
+            @param parameters:  Names and values of the parameters which should
+                                be added. String values can contain the
+                                directives $(find PKG) or $(env VAR).
+            @type  parameters:  { str : str/int/float/bool/list }
+        """
+        try:
+            container = user.containers[cTag]
+        except KeyError:
+            raise InvalidRequest('Can not add Parameters, because Container '
+                                 '{0} does not exist.'.format(cTag))
+
+        container.addParameters(parameters)
+
     def view_removeParameter(self, user, cTag, name):
         """ Remove a parameter from a ROS environment.
 
@@ -435,6 +460,58 @@ class MonitorView(Viewable):
         d.addCallback(lambda addr: (addr, uid))
         return d
 
+    def view_node_stats(self, user, tag):
+        """ Remote call to get the resource usage of the nodes in a container.
+
+            @param user:        User who owns the container.
+            @type  user:        rce.core.user.User
+
+            @param tag:         Tag used to identify the container.
+            @type  tag:         str
+
+            @return:            Resource usage of the nodes by node tag, i.e.
+                                the CPU usage in percent of one CPU, resident
+                                memory in bytes, number of threads, open files,
+                                processes and restarts.
+            @rtype:             { str : dict }
+        """
+        try:
+            container = user.containers[tag]
+        except KeyError:
+            raise InvalidRequest('Container {0} does not exist.'.format(tag))
+
+        return container.getNodeStats()
+
+    def view_node_log(self, user, cTag, nTag, lines=50):
+        """ Remote call to get the last lines of the output of a node.
+
+            @param user:        User who owns the container.
+            @type  user:        rce.core.user.User
+
+            @param cTag:        Tag used to identify the container.
+            @type  cTag:        str
+
+            @param nTag:        Tag used to identify the node.
+            @type  nTag:        str
+
+            @param lines:       Number of lines which should be returned for
+                                stdout and stderr.
+            @type  lines:       int
+
+            @return:            Last lines of stdout and stderr with the keys
+                                'out' and 'err' and the unique ID of the node,
+                                which is used to stream the output, with the
+                                key 'id'.
+                                (type: dict)
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        try:
+            container = user.containers[cTag]
+        except KeyError:
+            raise InvalidRequest('Container {0} does not exist.'.format(cTag))
+
+        return container.getNodeLog(nTag, lines)
+
 
 class AdminMonitorView(Viewable):
     """ View implementing all monitor actions which an admin user can perform to
@@ -476,16 +553,27 @@ class AdminMonitorView(Viewable):
                                 listed.
             @type  machineIP:   str
 
-            @return:            Stats of the machine.
-            @rtype:             { str : int }
+            @return:            Stats of the machine, i.e. the number of
+                                active containers, the capacity, the average
+                                CPU load, the most recent resource sample
+                                (refer to rce.util.telemetry.SysinfoBuffer)
+                                and the size and resource usage of each
+                                container.
+            @rtype:             dict
         """
         try:
             machine = (machine for machine in user.realm._balancer._machines
                        if machineIP == machine.IP).next()
-            return {'active':machine.active, 'size':machine.size}
         except StopIteration:
             raise InvalidRequest('No such machine.')
 
+        containers = [{'user':c.userID, 'size':c.size, 'usage':c.usage}
+                      for c in machine.listContainers()]
+
+        return {'active':machine.active, 'size':machine.size,
+                'cpuLoad':machine.cpuLoad, 'latest':machine.sysinfo.latest,
+                'containers':containers}
+
     def view_list_users(self, user):
         """ Remote call to list all users currently logged into
             the RoboEarth Cloud Engine.
@@ -566,3 +654,74 @@ class AdminMonitorView(Viewable):
             @type  userID:      str
         """
         return user._realm.getUser(userID).robots.keys()
+
+    def view_profile_master(self, user, duration):
+        """ Remote call to profile the master process.
+
+            @param user:        User who requested the profile.
+            @type  user:        rce.core.user.User
+
+            @param duration:    Duration of the profile in seconds.
+            @type  duration:    float
+
+            @return:            Collapsed stacks which can be used to create a
+                                flame graph. (type: str)
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        return user.realm.profile(duration)
+
+    def view_profile_robot(self, user, userID, robotID, duration):
+        """ Remote call to profile the robot process in which a robot is
+            running.
+
+            @param user:        User who requested the profile.
+            @type  user:        rce.core.user.User
+
+            @param userID:      The username of the user who owns the robot.
+            @type  userID:      str
+
+            @param robotID:     ID used to identify the robot.
+            @type  robotID:     str
+
+            @param duration:    Duration of the profile in seconds.
+            @type  duration:    float
+
+            @return:            Collapsed stacks which can be used to create a
+                                flame graph. (type: str)
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        try:
+            robot = user.realm._users[userID].robots[robotID]
+        except KeyError:
+            raise InvalidRequest('Robot {0} of user {1} does not '
+                                 'exist.'.format(robotID, userID))
+
+        return robot._obj._endpoint.profile(duration)
+
+    def view_profile_container(self, user, userID, tag, duration):
+        """ Remote call to profile the environment process of a container.
+
+            @param user:        User who requested the profile.
+            @type  user:        rce.core.user.User
+
+            @param userID:      The username of the user who owns the
+                                container.
+            @type  userID:      str
+
+            @param tag:         Tag used to identify the container.
+            @type  tag:         str
+
+            @param duration:    Duration of the profile in seconds.
+            @type  duration:    float
+
+            @return:            Collapsed stacks which can be used to create a
+                                flame graph. (type: str)
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        try:
+            container = user.realm._users[userID].containers[tag]
+        except KeyError:
+            raise InvalidRequest('Container {0} of user {1} does not '
+                                 'exist.'.format(tag, userID))
+
+        return container._obj._endpoint.profile(duration)
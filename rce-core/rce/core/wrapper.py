@@ -291,6 +291,40 @@ class Container(_Wrapper):
             raise InvalidRequest('Can not remove a non existent node '
                                  "'{0}' from the container.".format(nTag))
 
+    def getNodeStats(self):
+        """ Get the resource usage of the nodes in the container.
+
+            @return:            Resource usage of the nodes by node tag.
+                                Refer to rce.core.environment.Node.stats for
+                                more information.
+            @rtype:             { str : dict }
+        """
+        return dict((nTag, node.stats)
+                    for nTag, node in self._nodes.iteritems())
+
+    def getNodeLog(self, nTag, lines):
+        """ Get the last lines of the output of a node in the container.
+
+            @param nTag:        Tag which is used to identify the ROS node.
+            @type  nTag:        str
+
+            @param lines:       Number of lines which should be returned for
+                                stdout and stderr.
+            @type  lines:       int
+
+            @return:            Last lines of stdout and stderr with the keys
+                                'out' and 'err' and the unique ID of the node,
+                                which is used to stream the output, with the
+                                key 'id'.
+                                (type: dict)
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        try:
+            return self._nodes[nTag].getLog(lines)
+        except KeyError:
+            raise InvalidRequest('Can not get the log of a non existent node '
+                                 "'{0}' from the container.".format(nTag))
+
     def addParameter(self, name, value):
         """ Add a parameter to the ROS environment inside the container.
 
@@ -313,6 +347,31 @@ class Container(_Wrapper):
         self._parameters[name] = parameter
         parameter.notifyOnDeath(self._parameterDied)
 
+    def addParameters(self, parameters):
+        """ Add multiple parameters to the ROS environment inside the container
+            using a single request.
+
+            @param parameters:  Names and values of the parameters which should
+                                be added. The names are also used to identify
+                                the parameters in subsequent requests.
+            @type  parameters:  { str : str/int/float/bool/list }
+        """
+        for name in parameters:
+            if not name:
+                raise InvalidRequest('Parameter name is not a valid.')
+
+            if name in self._parameters:
+                raise InvalidRequest("Can not use the same parameter name "
+                                     "'{0}' in the same container "
+                                     'twice.'.format(name))
+
+        parameters = parameters.items()
+        params = self._obj.createParameters(parameters)
+
+        for (name, _), parameter in zip(parameters, params):
+            self._parameters[name] = parameter
+            parameter.notifyOnDeath(self._parameterDied)
+
     def removeParameter(self, name):
         """ Remove a parameter from the ROS environment inside the container.
 
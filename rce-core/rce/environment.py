@@ -31,20 +31,26 @@
 #
 
 # Python specific imports
-import fcntl
+import os
 
 # ROS specific imports
 import rospy
 
 # twisted specific imports
 from twisted.python import log
-from twisted.spread.pb import PBClientFactory
+from twisted.spread.pb import PBClientFactory, DeadReferenceError, \
+    PBConnectionLost
+from twisted.web.server import Site
 
 # rce specific imports
 from rce.util.error import InternalError
 from rce.util.loader import Loader
-from rce.monitor.node import Node
-from rce.monitor.parameter import Parameter
+from rce.util.metrics import MetricsResource, registry
+from rce.util.threadpool import InstrumentedThreadPool
+from rce.util.trace import tracer
+from rce.util.watchdog import ReactorWatchdog
+from rce.monitor.node import Node, NodeMonitor, NodeLogFactory
+from rce.monitor.parameter import Parameter, createParameters
 from rce.monitor.interface.environment import PublisherInterface, \
     SubscriberInterface, ServiceClientInterface, ServiceProviderInterface
 from rce.slave.endpoint import Endpoint
@@ -56,14 +62,18 @@ class Environment(Namespace):
     """ Representation of the namespace in the environment process, which is
         part of the cloud engine internal communication.
     """
-    def __init__(self, endpoint):
+    def __init__(self, endpoint, uid):
         """ Initialize the Environment.
 
             @param endpoint:    Environment Client which is responsible for
                                 monitoring the environment in this process.
             @type  endpoint:    rce.robot.EnvironmentClient
+
+            @param uid:         Unique ID of the container in which the
+                                environment is running.
+            @type  uid:         str
         """
-        Namespace.__init__(self, endpoint)
+        Namespace.__init__(self, endpoint, uid)
 
         interface_map = {
             Types.encode('PublisherInterface') : PublisherInterface,
@@ -76,6 +86,16 @@ class Environment(Namespace):
         self._nodes = set()
         self._parameters = set()
 
+    @property
+    def servicePool(self):
+        """ Thread pool which is used for the ROS service calls. """
+        return self._endpoint.servicePool
+
+    @property
+    def nodeMonitor(self):
+        """ Monitor which samples the resource usage of the nodes. """
+        return self._endpoint.nodeMonitor
+
     def registerNode(self, node):
         assert node not in self._nodes
         self._nodes.add(node)
@@ -85,6 +105,23 @@ class Environment(Namespace):
         self._nodes.remove(node)
         self._endpoint.referenceDied('nodeDied', node)
 
+    def getNode(self, uid):
+        """ Get the node with the given unique ID.
+
+            @param uid:         Unique ID of the node.
+            @type  uid:         str
+
+            @return:            Node with the given ID.
+            @rtype:             rce.monitor.node.Node
+
+            @raise:             KeyError, if there is no node with the ID.
+        """
+        for node in self._nodes:
+            if node.uid == uid:
+                return node
+
+        raise KeyError(uid)
+
     def registerParameter(self, parameter):
         assert parameter not in self._parameters
         self._parameters.add(parameter)
@@ -132,6 +169,22 @@ class Environment(Namespace):
         """
         return Parameter(self, name, value)
 
+    def remote_createParameters(self, parameters):
+        """ Create multiple Parameter objects in the environment namespace and
+            therefore in the endpoint. The parameters are added to the
+            parameter server using a single round trip in a separate thread.
+
+            @param parameters:  List of tuples containing the name and the
+                                value of the parameters which should be added.
+            @type  parameters:  [(str, str/int/float/bool/list)]
+
+            @return:            New Parameter instances in the same order as
+                                the given parameters.
+                                (type: [rce.monitor.parameter.Parameter])
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        return createParameters(self, parameters)
+
     def remote_destroy(self):
         """ Method should be called to destroy the environment and will take
             care of destroying all objects owned by this Environment as well
@@ -156,22 +209,128 @@ class EnvironmentClient(Endpoint):
     """ Environment client is responsible for the cloud engine components
         inside a container.
     """
-    def __init__(self, reactor, commPort):
+    # CONFIG
+    SERVICE_POOL_MIN = 2  # Minimal number of threads for ROS service calls
+    SERVICE_POOL_MAX = 20  # Maximal number of threads for ROS service calls
+    NODE_LOG_SOCKET = '/opt/rce/data/nodelog.sock'  # Socket for log streams
+    SHM_DIR = '/opt/rce/shm'  # Directory for local connections (container)
+
+    def __init__(self, reactor, loader, commPort, uid):
         """ Initialize the Environment Client.
 
             @param reactor:     Reference to the twisted reactor used in this
                                 robot process.
             @type  reactor:     twisted::reactor
 
+            @param loader:      Object which is used to load Python modules
+                                from ROS packages.
+            @type  loader:      rce.util.loader.Loader
+
             @param commPort:    Port where the server for the cloud engine
                                 internal communication will listen for incoming
                                 connections.
             @type  commPort:    int
+
+            @param uid:         Unique ID of the container in which the
+                                environment is running.
+            @type  uid:         str
         """
-        Endpoint.__init__(self, reactor, Loader(), commPort)
+        Endpoint.__init__(self, reactor, loader, commPort)
+
+        self._uid = uid
+
+        # The ROS service calls block a thread until the response arrives;
+        # therefore, they use their own pool to not starve the reactor's pool
+        self._servicePool = InstrumentedThreadPool(self.SERVICE_POOL_MIN,
+                                                   self.SERVICE_POOL_MAX,
+                                                   'ROSServiceCalls')
+        self._servicePool.start()
+        reactor.addSystemEventTrigger('during', 'shutdown',
+                                      self._stopServicePool)
+
+        self._nodeMonitor = NodeMonitor(reactor, self._pushNodeStats)
+        self._nodeMonitor.start()
+        reactor.addSystemEventTrigger('during', 'shutdown',
+                                      self._nodeMonitor.stop)
+
+        # Local server which is used by the rosproxy to stream node output
+        if os.path.exists(self.NODE_LOG_SOCKET):
+            os.remove(self.NODE_LOG_SOCKET)
+
+        reactor.listenUNIX(self.NODE_LOG_SOCKET, NodeLogFactory(self),
+                           mode=0600)
 
         self._dbFile = '/opt/rce/data/rosenvbridge.db' # TODO: Hardcoded?
 
+        # The entries of a previous run of the process are kept, because the
+        # whole file is rewritten when the users change
+        try:
+            with open(self._dbFile, 'r') as bridgefile:
+                self._dbEntries = ['{0}\n'.format(line.rstrip())
+                                   for line in bridgefile if line.strip()]
+        except IOError:
+            self._dbEntries = []
+
+    @property
+    def servicePool(self):
+        """ Thread pool which is used for the ROS service calls. """
+        return self._servicePool
+
+    @property
+    def nodeMonitor(self):
+        """ Monitor which samples the resource usage of the nodes. """
+        return self._nodeMonitor
+
+    def getNodeLog(self, uid, stream):
+        """ Get the log file of a node.
+
+            @param uid:         Unique ID of the node.
+            @type  uid:         str
+
+            @param stream:      Output stream, either 'out' or 'err'.
+            @type  stream:      str
+
+            @return:            Log file of the requested stream.
+            @rtype:             rce.util.logfile.BufferedLogFile
+
+            @raise:             KeyError, if the node or stream does not exist.
+        """
+        for namespace in self._namespaces:
+            try:
+                return namespace.getNode(uid).getLogFile(stream)
+            except KeyError:
+                pass
+
+        raise KeyError(uid)
+
+    def _stopServicePool(self):
+        """ Internally used method to stop the thread pool for the ROS
+            service calls.
+        """
+        log.msg('ROS service call statistics: {0}'.format(
+                    self._servicePool.stats))
+        self._servicePool.stop()
+
+    def _pushNodeStats(self, stats):
+        """ Internally used method to send the resource usage of the nodes to
+            the Master.
+
+            @param stats:       List of tuples containing the node and its
+                                resource usage.
+            @type  stats:       [(rce.monitor.node.Node, dict)]
+        """
+        if not self._avatar or not stats:
+            return
+
+        def eb(failure):
+            if not failure.check(PBConnectionLost):
+                log.err(failure)
+
+        try:
+            self._avatar.callRemote('pushNodeStats', stats).addErrback(eb)
+        except (DeadReferenceError, PBConnectionLost):
+            pass
+
     def createEnvironment(self, _):
         """ Create the Environment namespace.
         """
@@ -179,7 +338,7 @@ class EnvironmentClient(Endpoint):
             raise InternalError('The environment can have only one namespace '
                                 'at a time.')
 
-        environment = Environment(self)
+        environment = Environment(self, self._uid)
         return self._avatar.callRemote('setupNamespace', environment)
 
     def remote_addUsertoROSProxy(self, userID, key):
@@ -187,22 +346,46 @@ class EnvironmentClient(Endpoint):
             file that maintains list of users that can call functions of
             rosproxy.
 
+            The file is replaced atomically such that the rosproxy never sees
+            a partially written file and can detect changes by its inode.
+
             @param userID:      Username
             @type  userID:      str
 
             @param key:         Secret key
             @type  key:         str
         """
-        # TODO: Should this be deferred to a separate thread due to flock,
-        #       which is a blocking call?
-        with open(self._dbFile, "a") as bridgefile:
-            fcntl.flock(bridgefile.fileno(), fcntl.LOCK_EX)
-            bridgefile.write('{0}:{1}\n'.format(userID, key))
+        self._dbEntries.append('{0}:{1}\n'.format(userID, key))
+        self._writeDB()
+
+    def remote_removeUserfromROSProxy(self, userID):
+        """ Method to remove all keys of a username from the
+            rosproxy-environment bridge file.
+
+            @param userID:      Username
+            @type  userID:      str
+        """
+        prefix = '{0}:'.format(userID)
+        self._dbEntries = [entry for entry in self._dbEntries
+                           if not entry.startswith(prefix)]
+        self._writeDB()
+
+    def _writeDB(self):
+        """ Internally used method to replace the rosproxy-environment bridge
+            file atomically by the current entries.
+        """
+        tmpFile = '{0}.tmp'.format(self._dbFile)
+
+        with open(tmpFile, 'w') as bridgefile:
+            bridgefile.write(''.join(self._dbEntries))
 
+        os.rename(tmpFile, self._dbFile)
 
-def main(reactor, cred, masterIP, masterPort, commPort, uid):
+def main(reactor, cred, masterIP, masterPort, commPort, uid, preload,
+         metricsPort):
     f = open('/opt/rce/data/env.log', 'w') # TODO: Use os.getenv('HOME') ?
     log.startLogging(f)
+    tracer.configure('environment/{0}'.format(uid))
 
     rospy.init_node('RCE_Master')
     print 'connect to ', masterIP, masterPort
@@ -210,7 +393,19 @@ def main(reactor, cred, masterIP, masterPort, commPort, uid):
     factory = PBClientFactory()
     reactor.connectTCP(masterIP, masterPort, factory)
 
-    client = EnvironmentClient(reactor, commPort)
+    # Load the ROS classes before any connections are accepted such that the
+    # first message does not have to wait for the imports
+    loader = Loader()
+    loader.preload(list(preload) + loader.getMostUsed())
+
+    client = EnvironmentClient(reactor, loader, commPort, uid)
+
+    # Metrics
+    if metricsPort:
+        reactor.listenTCP(metricsPort, Site(MetricsResource(registry)))
+
+    # Detect callbacks which block the reactor
+    ReactorWatchdog(reactor).start()
 
     def terminate():
         reactor.callFromThread(client.terminate)
@@ -229,4 +424,9 @@ def main(reactor, cred, masterIP, masterPort, commPort, uid):
 
     reactor.run(installSignalHandlers=False)
 
+    loader.persist()
+
+    # Traces are only recorded for messages which have been sampled by the
+    # Robot processes
+    tracer.export('/opt/rce/data/trace.json')
     f.close()
@@ -46,6 +46,9 @@ from twisted.web.server import Site
 # rce specific imports
 from rce.util.error import InternalError
 from rce.util.cred import CredentialError
+from rce.util.metrics import MetricsResource, registry
+from rce.util.profiler import SamplingProfiler
+from rce.util.watchdog import ReactorWatchdog
 from rce.comm.interfaces import IMasterRealm
 from rce.comm.server import RobotResource
 from rce.core.machine import LoadBalancer, ContainerProcessError, \
@@ -83,9 +86,13 @@ class RoboEarthCloudEngine(object):
     """
     implements(IRealm, IMasterRealm)
 
-    def __init__(self, checker, port):
+    def __init__(self, reactor, checker, port):
         """ Initialize the RoboEarth Cloud Engine realm.
 
+            @param reactor:     Reference to the twisted reactor used in the
+                                master process.
+            @type  reactor:     twisted::reactor
+
             @param checker:     Login checker which authenticates the User when
                                 an initial request is received.
             @type  checker:     twisted.cred.checkers.ICredentialsChecker
@@ -104,6 +111,8 @@ class RoboEarthCloudEngine(object):
         self._users = {}
         self._pendingContainer = {}
 
+        self._profiler = SamplingProfiler(reactor)
+
     def requestAvatar(self, avatarId, mind, *interfaces):
         """ Returns Avatar for slave processes of the cloud engine.
 
@@ -152,6 +161,18 @@ class RoboEarthCloudEngine(object):
 
         return self._users[userID]
 
+    def profile(self, duration):
+        """ Profile the master process.
+
+            @param duration:    Duration of the profile in seconds.
+            @type  duration:    float
+
+            @return:            Collapsed stacks of the master process.
+                                (type: str)
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        return self._profiler.profile(duration)
+
     def requestURL(self, userID):
         """ Callback for Robot resource to retrieve the location of the Robot
             process to which a WebSocket connection should be established.
@@ -244,11 +265,11 @@ class RoboEarthCloudEngine(object):
 
 
 def main(reactor, internalCred, externalCred, internalPort, externalPort,
-         commPort, consolePort):
+         commPort, consolePort, metricsPort):
     log.startLogging(sys.stdout)
 
     # Realms
-    rce = RoboEarthCloudEngine(externalCred, commPort)
+    rce = RoboEarthCloudEngine(reactor, externalCred, commPort)
     user = UserRealm(rce)
 
     internalCred.add_checker(rce.checkUIDValidity)
@@ -264,6 +285,13 @@ def main(reactor, internalCred, externalCred, internalPort, externalPort,
     reactor.listenTCP(consolePort, PBServerFactory(consolePortal))
     reactor.listenTCP(externalPort, Site(RobotResource(rce)))
 
+    # Metrics
+    if metricsPort:
+        reactor.listenTCP(metricsPort, Site(MetricsResource(registry)))
+
+    # Detect callbacks which block the reactor
+    ReactorWatchdog(reactor).start()
+
     reactor.addSystemEventTrigger('before', 'shutdown', rce.preShutdown)
     reactor.addSystemEventTrigger('after', 'shutdown', rce.postShutdown)
 
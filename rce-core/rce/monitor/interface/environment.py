@@ -31,6 +31,10 @@
 #
 
 # Python specific imports
+import time
+import errno
+import socket
+from collections import deque
 from threading import Event, Lock
 from uuid import uuid4
 
@@ -38,12 +42,15 @@ from uuid import uuid4
 from genmsg.names import package_resource_name
 from genpy.message import Message
 import rospy
+from rospy.exceptions import TransportException
 
 # twisted specific imports
 from twisted.internet.threads import deferToThreadPool
 
 # rce specific imports
 from rce.util.error import InternalError
+from rce.util.metrics import registry
+from rce.util.trace import tracer
 from rce.util.ros import decorator_has_connection
 from rce.slave.interface import Interface, InvalidResoureName
 
@@ -85,7 +92,22 @@ class _ROSInterfaceBase(Interface):
 
 class ServiceClientInterface(_ROSInterfaceBase):
     """ Class which is used as a Service-Client Interface.
+
+        The interface keeps persistent service proxies, which are reused for
+        the following calls, to avoid a lookup at the ROS master and a new
+        connection for each call.
+
+        If the connection of a reused proxy turns out to be broken, e.g.
+        because the service provider has been restarted, the call is retried
+        once with a new proxy. A connection can also break after the request
+        has been delivered, but before the response has been received; in
+        this case the request is executed a second time by the service.
+        Therefore, calls through this interface are not at-most-once.
     """
+    # Prefix of the message of the rospy.ServiceException which rospy raises
+    # if the connection of a persistent proxy breaks during a call
+    _TRANSPORT_ERROR = 'transport error completing service call'
+
     def __init__(self, owner, uid, clsName, addr):
         _ROSInterfaceBase.__init__(self, owner, uid, clsName, ('SC', addr))
 
@@ -99,24 +121,130 @@ class ServiceClientInterface(_ROSInterfaceBase):
         self._srvCls._request_class = rospy.AnyMsg
         self._srvCls._response_class = rospy.AnyMsg
 
+        self._pool = owner.servicePool
+
+        # Persistent service proxies which are currently not used by a call;
+        # a persistent proxy can not be used by multiple calls concurrently
+        self._proxiesLock = Lock()
+        self._proxies = []
+        self._stopped = False
+
     __init__.__doc__ = _ROSInterfaceBase.__init__.__doc__
 
+    def _start(self):
+        with self._proxiesLock:
+            self._stopped = False
+
+    def _stop(self):
+        # Calls which are still running close their proxy when they are done
+        with self._proxiesLock:
+            self._stopped = True
+            proxies, self._proxies = self._proxies, []
+
+        for proxy in proxies:
+            proxy.close()
+
     def _send(self, msg, msgID, protocol, remoteID):
-        d = deferToThreadPool(self._reactor, self._reactor.getThreadPool(),
-                              self._threadedCall, msg)
-        d.addCallback(self._respond, msgID, protocol, remoteID)
+        # The call is done in a thread; therefore, the trace has to be passed
+        # explicitly
+        traceID = tracer.current
+        d = deferToThreadPool(self._reactor, self._pool, self._threadedCall,
+                              msg, traceID)
+        d.addCallback(self._respond, msgID, protocol, remoteID, traceID)
         d.addErrback(self._errHandler)
 
-    def _threadedCall(self, msg):
+    def _createProxy(self):
+        """ Internally used method to create a new persistent service proxy.
+        """
+        rospy.wait_for_service(self._addr[1], timeout=5)
+        return rospy.ServiceProxy(self._addr[1], self._srvCls, persistent=True)
+
+    def _isConnected(self, proxy):
+        """ Internally used method to check whether the connection of a
+            persistent service proxy is still usable.
+        """
+        transport = proxy.transport
+
+        if transport is None:
+            return True  # Not yet connected; connects on the next call
+
+        if transport.done or not transport.socket:
+            return False
+
+        # A readable idle connection has been closed by the service provider
+        timeout = transport.socket.gettimeout()
+
+        try:
+            transport.socket.setblocking(0)
+
+            try:
+                return transport.socket.recv(1, socket.MSG_PEEK) != ''
+            finally:
+                transport.socket.settimeout(timeout)
+        except socket.error as e:
+            return e.errno in (errno.EAGAIN, errno.EWOULDBLOCK)
+
+    def _threadedCall(self, msg, traceID):
+        tracer.record('ServiceClientInterface.call', traceID)
+
         rosMsg = rospy.AnyMsg()
         rosMsg._buff = msg
 
-        rospy.wait_for_service(self._addr[1], timeout=5)
-        serviceFunc = rospy.ServiceProxy(self._addr[1], self._srvCls)
-        return serviceFunc(rosMsg)
+        with self._proxiesLock:
+            proxy = self._proxies.pop() if self._proxies else None
+
+        if proxy and not self._isConnected(proxy):
+            proxy.close()
+            proxy = None
+
+        if proxy:
+            try:
+                resp = proxy(rosMsg)
+            except (TransportException, socket.error):
+                # The request could not be sent over the reused connection;
+                # retry with a new proxy
+                proxy.close()
+                proxy = None
+            except rospy.ServiceException as e:
+                proxy.close()
+
+                # The connection broke while waiting for the response; the
+                # request might already have been executed by the service
+                if not str(e).startswith(self._TRANSPORT_ERROR):
+                    raise
+
+                proxy = None
+            except:
+                proxy.close()
+                raise
+
+        if not proxy:
+            proxy = self._createProxy()
+
+            try:
+                resp = proxy(rosMsg)
+            except:
+                proxy.close()
+                raise
+
+        with self._proxiesLock:
+            if not self._stopped:
+                self._proxies.append(proxy)
+                proxy = None
+
+        if proxy:
+            proxy.close()
+
+        tracer.record('ServiceClientInterface.called', traceID)
+        return resp
+
+    def _respond(self, resp, msgID, protocol, remoteID, traceID):
+        tracer.current = traceID
 
-    def _respond(self, resp, msgID, protocol, remoteID):
-        self.respond(resp._buff, msgID, protocol, remoteID)
+        try:
+            self.respond(resp._buff, msgID, protocol, remoteID)
+        finally:
+            tracer.current = None
 
     def _errHandler(self, e):
         if e.check(rospy.ROSInterruptException):
@@ -127,9 +255,36 @@ class ServiceClientInterface(_ROSInterfaceBase):
             e.printTraceback()
 
 
+class _SlotRequest(object):
+    """ Request of a thread for a free slot of a Service-Provider Interface.
+    """
+    def __init__(self):
+        self.event = Event()
+        self.granted = False
+
+
 class ServiceProviderInterface(_ROSInterfaceBase):
     """ Class which is used as a Service-Provider Interface.
+
+        Each request blocks a thread of the ROS service until the response
+        arrives. Therefore, the number of concurrently forwarded requests is
+        bounded, a bounded number of additional requests is queued for a
+        limited time, further requests are rejected immediately, and stale
+        requests are answered with an error after a timeout.
+
+        The threads of the ROS service wait without a timeout, because a
+        timed wait polls in Python 2; the timeouts are enforced by the reactor
+        instead.
     """
+    # CONFIG
+    MAX_PENDING = 50  # Maximal number of concurrently forwarded requests
+    MAX_QUEUED = 50  # Maximal number of requests waiting for a slot
+    QUEUE_TIMEOUT = 10  # Maximal time in seconds a request waits for a slot
+    REQUEST_TIMEOUT = 60  # Time in seconds after which a request is dropped
+
+    # Marker which is stored as response of a request which timed out
+    _TIMEOUT = object()
+
     def __init__(self, owner, uid, clsName, addr):
         _ROSInterfaceBase.__init__(self, owner, uid, clsName, ('SP', addr))
 
@@ -143,6 +298,20 @@ class ServiceProviderInterface(_ROSInterfaceBase):
         self._pendingLock = Lock()
         self._pending = {}
 
+        # Timeouts of the forwarded requests; only used in the reactor thread
+        self._timers = {}
+
+        # Slots for concurrently forwarded requests and the requests which
+        # wait for a free slot
+        self._slotsLock = Lock()
+        self._active = 0
+        self._queue = deque()
+
+        # Metrics; registered while the service is running
+        self._latency = None
+        self._timeouts = None
+        self._rejected = None
+
         self._srvCls = owner.loader.loadSrv(pkg, name)
         self._srvCls._request_class = rospy.AnyMsg
         self._srvCls._response_class = rospy.AnyMsg
@@ -159,19 +328,67 @@ class ServiceProviderInterface(_ROSInterfaceBase):
     remote_connect.__doc__ = _ROSInterfaceBase.remote_connect.__doc__
 
     def _start(self):
-        self._service = rospy.Service(self._addr[1], self._srvCls, self._callback)
+        service = self._addr[1]
+        self._latency = registry.histogram(
+            'rce_service_provider_seconds', 'Time between the arrival of a '
+            'request and the return of its response.', service=service)
+        self._timeouts = registry.counter(
+            'rce_service_provider_timeouts_total', 'Number of requests which '
+            'timed out.', service=service)
+        self._rejected = registry.counter(
+            'rce_service_provider_rejected_total', 'Number of requests which '
+            'were rejected, because there was no free slot.', service=service)
+        registry.gauge('rce_service_provider_active',
+                       'Number of currently forwarded requests.',
+                       lambda: self._active, service=service)
+        registry.gauge('rce_service_provider_queued',
+                       'Number of requests waiting for a free slot.',
+                       lambda: len(self._queue), service=service)
+
+        self._service = rospy.Service(service, self._srvCls, self._callback)
 
     def _stop(self):
         self._service.shutdown()
         self._service = None
 
+        for timer in self._timers.itervalues():
+            timer.cancel()
+
+        self._timers = {}
+
+        # Requests which already have a response or timed out are left to
+        # their threads
         with self._pendingLock:
-            for event in self._pending.itervalues():
-                event.set()
+            for msgID, event in self._pending.items():
+                if event is not self._TIMEOUT and not isinstance(event,
+                                                                 Message):
+                    del self._pending[msgID]
+                    event.set()
+
+        with self._slotsLock:
+            queue, self._queue = self._queue, deque()
 
-            self._pending = {}
+        for request in queue:
+            request.event.set()
+
+        service = self._addr[1]
+
+        for name in ('rce_service_provider_seconds',
+                     'rce_service_provider_timeouts_total',
+                     'rce_service_provider_rejected_total',
+                     'rce_service_provider_active',
+                     'rce_service_provider_queued'):
+            registry.remove(name, service=service)
 
     def _send(self, msg, msgID, protocol, remoteID):
+        # Responses to requests which timed out are dropped
+        timer = self._timers.pop(msgID, None)
+
+        if not timer:
+            return
+
+        timer.cancel()
+
         rosMsg = rospy.AnyMsg()
         rosMsg._buff = msg
 
@@ -184,6 +401,90 @@ class ServiceProviderInterface(_ROSInterfaceBase):
 
         event.set()
 
+    def _forward(self, msg, msgID):
+        """ Internally used method to forward a request and to start its
+            timeout; runs in the reactor thread.
+        """
+        self._timers[msgID] = self._reactor.callLater(self.REQUEST_TIMEOUT,
+                                                      self._requestTimeout,
+                                                      msgID)
+        self.received(msg, msgID)
+
+    def _requestTimeout(self, msgID):
+        """ Internally used method which is called by the reactor when a
+            request did not receive a response in time.
+        """
+        del self._timers[msgID]
+
+        with self._pendingLock:
+            try:
+                event = self._pending[msgID]
+            except KeyError:
+                return
+
+            self._pending[msgID] = self._TIMEOUT
+
+        self._timeouts.inc()
+        event.set()
+
+    def _queueTimeout(self, request):
+        """ Internally used method which is called by the reactor when a
+            request waited too long for a free slot.
+        """
+        with self._slotsLock:
+            try:
+                self._queue.remove(request)
+            except ValueError:
+                return  # The request already got a slot
+
+        request.event.set()
+
+    def _acquireSlot(self):
+        """ Internally used method to wait for a free slot to forward a
+            request.
+
+            @return:        True if a slot was acquired; False if the queue
+                            is full or the queue timeout was reached.
+            @rtype:         bool
+        """
+        with self._slotsLock:
+            if self._active < self.MAX_PENDING:
+                self._active += 1
+                return True
+
+            # Waiting blocks the thread of the ROS service; therefore, the
+            # number of waiting requests is bounded as well
+            if len(self._queue) >= self.MAX_QUEUED:
+                self._rejected.inc()
+                return False
+
+            request = _SlotRequest()
+            self._queue.append(request)
+
+        self._reactor.callFromThread(self._reactor.callLater,
+                                     self.QUEUE_TIMEOUT, self._queueTimeout,
+                                     request)
+        request.event.wait()
+
+        if not request.granted:
+            self._rejected.inc()
+
+        return request.granted
+
+    def _releaseSlot(self):
+        """ Internally used method to free a slot after a request has been
+            processed; the slot is handed over to the oldest waiting request.
+        """
+        with self._slotsLock:
+            if self._queue:
+                request = self._queue.popleft()
+                request.granted = True
+            else:
+                self._active -= 1
+                return
+
+        request.event.set()
+
     def _callback(self, request):
         """ This method is called by the ROS framework when a Service request
             has arrived.
@@ -191,25 +492,37 @@ class ServiceProviderInterface(_ROSInterfaceBase):
             response is present, because the return value of this method is
             used as response to the request.
         """
-        msgID = uuid4().hex
-        event = Event()
+        start = time.time()
 
-        with self._pendingLock:
-            self._pending[msgID] = event
+        if not self._acquireSlot():
+            raise rospy.ServiceException('Too many pending requests.')
 
-        self._reactor.callFromThread(self.received, request._buff, msgID)
+        try:
+            msgID = uuid4().hex
+            event = Event()
 
-        # Block execution here until the event is set, i.e. a response has
-        # arrived
-        event.wait()
+            with self._pendingLock:
+                self._pending[msgID] = event
 
-        with self._pendingLock:
-            response = self._pending.pop(msgID, None)
+            self._reactor.callFromThread(self._forward, request._buff, msgID)
+
+            # Block execution here until the event is set, i.e. a response has
+            # arrived, the request timed out or the interface was stopped
+            event.wait()
+
+            with self._pendingLock:
+                response = self._pending.pop(msgID, None)
+        finally:
+            self._releaseSlot()
+
+        if response is self._TIMEOUT:
+            raise rospy.ServiceException('Request timed out.')
 
         if not isinstance(response, Message):
             # TODO: Change exception?
             raise rospy.ROSInterruptException('Interrupted.')
 
+        self._latency.observe(time.time() - start)
         return response
 
 
@@ -245,6 +558,7 @@ class PublisherInterface(_ROSInterfaceBase):
 
         try:
             self._publisher.publish(rosMsg)
+            tracer.record('PublisherInterface.published')
         except rospy.ROSInterruptException:
             pass  # TODO: How should the error be returned?
         except rospy.ROSSerializationException:
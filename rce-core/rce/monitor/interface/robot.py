@@ -48,6 +48,7 @@ except ImportError:
 
 # rce specific imports
 from rce.util.error import InternalError
+from rce.util.trace import tracer
 from rce.slave.interface import Interface, InvalidResoureName
 from rce.util.settings import getSettings
 settings = getSettings()
@@ -153,6 +154,8 @@ class _ConverterBase(_AbstractRobotInterface):
             raise InvalidResoureName('Sent message type does not match the '
                                      'used message type for this interface.')
 
+        tracer.record('_ConverterBase.receive')
+
         try:
             msg = self._converter.decode(self._inputMsgCls, msg)
         except (TypeError, ValueError) as e:
@@ -162,6 +165,7 @@ class _ConverterBase(_AbstractRobotInterface):
         msg.serialize(buf)
         msg = buf.getvalue()
 
+        tracer.record('_ConverterBase.decoded')
         self._receive(msg, msgID)
 
     def _send(self, msg, msgID, protocol, remoteID):
@@ -185,6 +189,8 @@ class _ConverterBase(_AbstractRobotInterface):
             raise InternalError('This converter can not handle outgoing '
                                 'messages.')
 
+        tracer.record('_ConverterBase.send')
+
         rosMsg = self._outputMsgCls()
         rosMsg.deserialize(msg)
 
@@ -193,6 +199,7 @@ class _ConverterBase(_AbstractRobotInterface):
         except (TypeError, ValueError) as e:
             raise ConversionError(str(e))
 
+        tracer.record('_ConverterBase.encoded')
         self._sendToClient(jsonMsg, msgID, protocol, remoteID)
 
 
@@ -38,10 +38,14 @@ from uuid import uuid4
 # twisted specific imports
 from twisted.python import log
 from twisted.internet.error import ProcessExitedAlready
-from twisted.internet.protocol import ProcessProtocol
+from twisted.internet.protocol import ProcessProtocol, ServerFactory
+from twisted.internet.task import LoopingCall
+from twisted.protocols.basic import LineReceiver
 from twisted.spread.pb import Referenceable
 
 # rce specific imports
+from rce.util import sysinfo
+from rce.util.logfile import BufferedLogFile
 from rce.monitor.common import ArgumentMixin
 
 
@@ -52,25 +56,181 @@ class NodeProtocol(ProcessProtocol):
         stderr to files.
     """
     def __init__(self, monitor, out, err):
-        self._monitor = monitor
+        """ Initialize the Node Protocol.
+
+            @param monitor:     Node which is monitored by the protocol.
+            @type  monitor:     rce.monitor.node.Node
+
+            @param out:         Log file for the stdout of the node.
+            @type  out:         rce.util.logfile.BufferedLogFile
 
-        self._out = open(out, 'w')
-        self._err = open(err, 'w')
+            @param err:         Log file for the stderr of the node.
+            @type  err:         rce.util.logfile.BufferedLogFile
+        """
+        self._monitor = monitor
 
         # Overwrite method from base class
-        self.outReceived = self._out.write
-        self.errReceived = self._err.write
+        self.outReceived = out.write
+        self.errReceived = err.write
 
     def connectionMade(self):
-        self._monitor.started()
+        self._monitor.started(self.transport.pid)
 
     def processEnded(self, reason):
         self._monitor.stopped(reason.value.exitCode)
         self._monitor = None
 
-    def __del__(self):
-        self._out.close()
-        self._err.close()
+
+class NodeLogProtocol(LineReceiver):
+    """ Protocol which is used to stream the output of a node over a local
+        connection.
+
+        The request is a single line '{node ID} {out|err} {lines}'. The
+        response starts with the line 'OK' followed by the last lines of the
+        output and all new lines until the node stops, or with the line
+        'ERROR {message}' if the request is invalid.
+    """
+    delimiter = '\n'
+
+    def __init__(self, endpoint):
+        self._endpoint = endpoint
+        self._log = None
+
+    def lineReceived(self, line):
+        if self._log:
+            return
+
+        try:
+            uid, stream, lines = line.split()
+            lines = int(lines)
+            log = self._endpoint.getNodeLog(uid, stream)
+        except ValueError:
+            self.sendLine('ERROR Invalid request.')
+            self.transport.loseConnection()
+            return
+        except KeyError:
+            self.sendLine('ERROR Node does not exist.')
+            self.transport.loseConnection()
+            return
+
+        self._log = log
+        self.sendLine('OK')
+        self._send(log.tail(lines))
+        log.addListener(self._send)
+
+    def _send(self, lines):
+        if lines is None:
+            self._log = None
+            self.transport.loseConnection()
+        else:
+            self.transport.write(''.join('{0}\n'.format(line)
+                                         for line in lines))
+
+    def connectionLost(self, reason):
+        if self._log:
+            self._log.removeListener(self._send)
+            self._log = None
+
+
+class NodeLogFactory(ServerFactory):
+    """ Factory for the local server which streams the output of the nodes.
+    """
+    def __init__(self, endpoint):
+        """ Initialize the Node Log Factory.
+
+            @param endpoint:    Endpoint which is used to look up the nodes.
+            @type  endpoint:    rce.environment.EnvironmentClient
+        """
+        self._endpoint = endpoint
+
+    def buildProtocol(self, addr):
+        return NodeLogProtocol(self._endpoint)
+
+
+class NodeMonitor(object):
+    """ Monitor which periodically samples the resource usage of all node
+        processes, including their children, in an environment.
+    """
+    # CONFIG
+    INTERVAL = 5  # Interval in seconds between two samples
+    CHILDREN_SCAN = 6  # Number of samples between two scans for children
+
+    def __init__(self, reactor, report):
+        """ Initialize the Node Monitor.
+
+            @param reactor:     Reference to the twisted reactor.
+            @type  reactor:     twisted::reactor
+
+            @param report:      Callable which is called after each sample
+                                with a list of tuples containing the node and
+                                its resource usage.
+            @type  report:      callable
+        """
+        self._report = report
+        self._nodes = set()
+        self._sampler = sysinfo.ProcessSampler()
+        self._samples = 0
+
+        self._call = LoopingCall(self._sample)
+        self._call.clock = reactor
+
+    def start(self):
+        """ Start the periodic sampling.
+        """
+        self._call.start(self.INTERVAL, now=False)
+
+    def stop(self):
+        """ Stop the periodic sampling and release all open files.
+        """
+        if self._call.running:
+            self._call.stop()
+
+        self._sampler.close()
+        self._nodes = set()
+
+    def registerNode(self, node):
+        self._nodes.add(node)
+
+    def unregisterNode(self, node):
+        self._nodes.discard(node)
+
+    def _sample(self):
+        """ Internally used method to take a sample of all node processes.
+        """
+        if self._samples % self.CHILDREN_SCAN == 0:
+            children = sysinfo.get_children_map()
+
+            for node in self._nodes:
+                node.pids = [node.pid] + sysinfo.get_descendants(node.pid,
+                                                                 children)
+
+        self._samples += 1
+
+        pids = set()
+
+        for node in self._nodes:
+            pids.update(node.pids)
+
+        for pid in self._sampler.pids - pids:
+            self._sampler.remove(pid)
+
+        for pid in pids - self._sampler.pids:
+            try:
+                self._sampler.add(pid)
+            except (sysinfo.NoSuchProcess, sysinfo.AccessDenied):
+                pass
+
+        samples, _ = self._sampler.sample()
+        stats = []
+
+        for node in self._nodes.copy():
+            nodeSamples = [samples[pid] for pid in node.pids if pid in samples]
+            node.pids = [sample.pid for sample in nodeSamples]
+
+            if nodeSamples:
+                stats.append((node, node.updateStats(nodeSamples)))
+
+        self._report(stats)
 
 
 class Node(Referenceable, ArgumentMixin):
@@ -79,6 +239,10 @@ class Node(Referenceable, ArgumentMixin):
     # CONFIG
     _STOP_ESCALATION = [('INT', 15), ('TERM', 2), ('KILL', None)]
     _LOG_DIR = '/opt/rce/data'  # TODO: After splitting process: '/home/ros'
+    MAX_MEMORY = 0  # Resident memory in MB above which a node is stopped
+    MAX_CPU = 0  # CPU usage in percent of one CPU above which a node is stopped
+    MAX_CPU_SAMPLES = 6  # Number of consecutive samples above MAX_CPU
+    MAX_RESTARTS = 3  # Restarts of a node exceeding a limit before it's killed
 
     def __init__(self, owner, pkg, exe, args, name, namespace):
         """ Initialize and start the Node.
@@ -119,6 +283,13 @@ class Node(Referenceable, ArgumentMixin):
         self._call = None
         self._protocol = None
 
+        self.pid = None
+        self.pids = []
+        self._stats = None
+        self._cpuExceeded = 0
+        self._restarts = 0
+        self._restart = False
+
         # Find and validate executable
         cmd = [self._loader.findNode(pkg, exe)]  # raises ResourceNotFound
 
@@ -147,18 +318,48 @@ class Node(Referenceable, ArgumentMixin):
         err = os.path.join(self._LOG_DIR,
                            '{0}-{1}-err.log'.format(uid, name or exe))
 
-        self._protocol = NodeProtocol(self, out, err)
+        self._uid = uid
+
+        # The log files are kept when the node is restarted
+        self._out = BufferedLogFile(self._reactor, out)
+        self._err = BufferedLogFile(self._reactor, err)
+        self._cmd = cmd
 
         # Start node
         log.msg('Start Node {0}/{1} [pkg: {2}, exe: '
                 '{3}].'.format(namespace, name or exe, pkg, exe))
-        self._reactor.spawnProcess(self._protocol, cmd[0], cmd, env=os.environ)
+        self._spawn()
 
         self._name = '{0}/{1}'.format(pkg, exe)
 
-    def started(self):
+    @property
+    def uid(self):
+        """ Unique ID of the node which is used to identify its log files. """
+        return self._uid
+
+    @property
+    def stats(self):
+        """ Most recent resource usage of the node or None if there is no
+            information yet.
+        """
+        return self._stats
+
+    def _spawn(self):
+        """ Internally used method to launch the node process.
+        """
+        self._protocol = NodeProtocol(self, self._out, self._err)
+        self._reactor.spawnProcess(self._protocol, self._cmd[0], self._cmd,
+                                   env=os.environ)
+
+    def started(self, pid):
         """ Callback for NodeProtocol to signal that the process has started.
         """
+        self.pid = pid
+        self.pids = [pid]
+        self._cpuExceeded = 0
+
+        if self._owner:
+            self._owner.nodeMonitor.registerNode(self)
 
     def stopped(self, exitCode):
         """ Callback for NodeProtocol to signal that the process has died.
@@ -167,18 +368,108 @@ class Node(Referenceable, ArgumentMixin):
 
         if self._call:
             self._call.cancel()
+            self._call = None
+
+        if self._owner:
+            self._owner.nodeMonitor.unregisterNode(self)
 
         if exitCode:
             log.msg('Node ({0}) terminated with exit code: '
                     '{1}'.format(self._name, exitCode))
 
+        if self._restart and self._owner:
+            self._restart = False
+            self._restarts += 1
+            log.msg('Restart Node ({0}) [restart {1}].'.format(self._name,
+                                                                self._restarts))
+            self._spawn()
+            return
+
+        self._out.close()
+        self._err.close()
+
         if self._owner:
             self._owner.unregisterNode(self)
             self._owner = None
 
+    def getLogFile(self, stream):
+        """ Get the log file of the node.
+
+            @param stream:      Output stream, either 'out' or 'err'.
+            @type  stream:      str
+
+            @return:            Log file of the requested stream.
+            @rtype:             rce.util.logfile.BufferedLogFile
+
+            @raise:             KeyError, if the stream is not valid.
+        """
+        return {'out':self._out, 'err':self._err}[stream]
+
+    def remote_getLog(self, lines):
+        """ Get the last lines of the output of the node.
+
+            @param lines:       Number of lines which should be returned for
+                                stdout and stderr.
+            @type  lines:       int
+
+            @return:            Last lines of stdout and stderr with the keys
+                                'out' and 'err' and the unique ID of the node,
+                                which is used to stream the output, with the
+                                key 'id'.
+            @rtype:             dict
+        """
+        return {'out':self._out.tail(lines), 'err':self._err.tail(lines),
+                'id':self._uid}
+
+    def updateStats(self, samples):
+        """ Update the resource usage of the node and enforce the limits.
+
+            @param samples:     Samples of the node process and its children.
+            @type  samples:     [rce.util.sysinfo.nt_proc_sample]
+
+            @return:            Resource usage of the node, i.e. CPU usage in
+                                percent of one CPU, resident memory in bytes,
+                                number of threads, number of open files,
+                                number of processes and number of restarts.
+            @rtype:             dict
+        """
+        self._stats = {'pid':self.pid,
+                       'cpu':sum(s.cpu_percent for s in samples),
+                       'memory':sum(s.rss for s in samples),
+                       'threads':sum(s.num_threads for s in samples),
+                       'fds':sum(s.num_fds or 0 for s in samples),
+                       'processes':len(samples),
+                       'restarts':self._restarts}
+
+        if self.MAX_CPU and self._stats['cpu'] > self.MAX_CPU:
+            self._cpuExceeded += 1
+        else:
+            self._cpuExceeded = 0
+
+        if self.MAX_MEMORY and self._stats['memory'] > self.MAX_MEMORY * 1e6:
+            self._limitExceeded('memory')
+        elif self._cpuExceeded >= self.MAX_CPU_SAMPLES:
+            self._limitExceeded('CPU')
+
+        return self._stats
+
+    def _limitExceeded(self, resource):
+        """ Internally used method to restart or kill a node which exceeds
+            a resource limit.
+        """
+        if not self._protocol or self._call:
+            return
+
+        log.msg('Node ({0}) exceeds the {1} limit.'.format(self._name,
+                                                           resource))
+
+        self._restart = self._restarts < self.MAX_RESTARTS
+        self._destroy()
+
     def remote_destroy(self):
         """ Method should be called to stop/kill this node.
         """
+        self._restart = False
         self._destroy()
 
     def _destroy(self, lvl=0):
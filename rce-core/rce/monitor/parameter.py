@@ -30,11 +30,17 @@
 #
 #
 
+# Python specific imports
+import socket
+import xmlrpclib
+
 # ROS specific imports
 import rospy
+import rosgraph
 
 # twisted specific imports
 from twisted.python import log
+from twisted.internet.threads import deferToThreadPool
 from twisted.spread.pb import Referenceable
 
 # rce specific imports
@@ -42,10 +48,96 @@ from rce.util.error import InternalError
 from rce.monitor.common import ArgumentMixin
 
 
+def _uploadParameters(parameters):
+    """ Add multiple parameters to the parameter server using a single XML-RPC
+        round trip. This method blocks and should not be called from the
+        reactor.
+
+        @param parameters:  List of tuples containing the name and the value of
+                            the parameters.
+        @type  parameters:  [(str, str/int/float/bool/list)]
+
+        @raise:             rce.util.error.InternalError
+    """
+    callerID = rospy.get_caller_id()
+    multicall = xmlrpclib.MultiCall(
+        xmlrpclib.ServerProxy(rosgraph.get_master_uri()))
+
+    for name, _ in parameters:
+        multicall.hasParam(callerID, rospy.resolve_name(name))
+
+    for name, value in parameters:
+        multicall.setParam(callerID, rospy.resolve_name(name), value)
+
+    try:
+        results = list(multicall())
+    except (xmlrpclib.Error, socket.error) as e:
+        raise InternalError('ROS Parameter Server reported an error: '
+                            '{0}'.format(e))
+
+    for (name, _), (code, msg, exists) in zip(parameters, results):
+        if code == 1 and exists:
+            log.msg("Warning: Parameter '{0}' already exists.".format(name))
+
+    for code, msg, _ in results[len(parameters):]:
+        if code != 1:
+            raise InternalError('ROS Parameter Server reported an error: '
+                                '{0}'.format(msg))
+
+
+def createParameters(owner, parameters):
+    """ Add multiple Parameters to the parameter server. The parameters are
+        uploaded in a separate thread using a single round trip.
+
+        @param owner:       Environment in which the parameters will be
+                            created.
+        @type  owner:       rce.environment.Environment
+
+        @param parameters:  List of tuples containing the name and the value of
+                            the parameters which should be added. Top-level
+                            string values can contain the directives
+                            $(find PKG) and/or $(env VAR).
+        @type  parameters:  [(str, str/int/float/bool/list)]
+
+        @return:            New Parameter instances in the same order as the
+                            given parameters.
+                            (type: [rce.monitor.parameter.Parameter])
+        @rtype:             twisted.internet.defer.Deferred
+    """
+    params = []
+
+    try:
+        for name, value in parameters:
+            params.append(Parameter(owner, name, value, False))
+    except Exception:
+        for param in params:
+            param.remote_destroy()
+
+        raise
+
+    def cb(_):
+        for param in params:
+            param.registered()
+
+        return params
+
+    def eb(failure):
+        for param in params:
+            param.remote_destroy()
+
+        return failure
+
+    reactor = owner.reactor
+    d = deferToThreadPool(reactor, reactor.getThreadPool(), _uploadParameters,
+                          [(param.name, param.value) for param in params])
+    d.addCallbacks(cb, eb)
+    return d
+
+
 class Parameter(Referenceable, ArgumentMixin):
     """ Representation of a Parameter inside an environment.
     """
-    def __init__(self, owner, name, value):
+    def __init__(self, owner, name, value, upload=True):
         """ Add the Parameter to the parameter server.
 
             @param owner:       Environment in which the node will be created.
@@ -58,6 +150,12 @@ class Parameter(Referenceable, ArgumentMixin):
                                 Top-level string values can contain the
                                 directives $(find PKG) and/or $(env VAR).
             @type  value:       str, int, float, bool, list
+
+            @param upload:      Flag whether the parameter should be added to
+                                the parameter server immediately. Otherwise,
+                                the method 'registered' has to be called once
+                                the parameter has been added.
+            @type  upload:      bool
         """
         self._registered = False
 
@@ -70,6 +168,10 @@ class Parameter(Referenceable, ArgumentMixin):
             value = self.processArgument(value)
 
         self._name = name
+        self._value = value
+
+        if not upload:
+            return
 
         try:
             if rospy.has_param(name):
@@ -81,6 +183,23 @@ class Parameter(Referenceable, ArgumentMixin):
             raise InternalError('ROS Parameter Server reported an error: '
                                 '{0}'.format(e))
 
+    @property
+    def name(self):
+        """ Name of the parameter. """
+        return self._name
+
+    @property
+    def value(self):
+        """ Value of the parameter with the processed directives. """
+        return self._value
+
+    def registered(self):
+        """ Method should be called when the parameter has been added to the
+            parameter server externally.
+        """
+        if self._owner:
+            self._registered = True
+
     def remote_destroy(self):
         """ Method should be called to delete the Parameter from the parameter
             server.
@@ -44,14 +44,18 @@ from twisted.python import log
 from twisted.cred.credentials import UsernamePassword
 from twisted.spread.pb import PBClientFactory, \
     DeadReferenceError, PBConnectionLost
+from twisted.web.server import Site
 
 # Autobahn specific imports
 from autobahn.websocket import listenWS
 
 # rce specific imports
 from rce.util.converter import Converter
-from rce.util.loader import Loader
+from rce.util.loader import Loader, ResourceNotFound
 from rce.util.interface import verifyObject
+from rce.util.metrics import MetricsResource, registry
+from rce.util.trace import tracer
+from rce.util.watchdog import ReactorWatchdog
 from rce.comm.error import DeadConnection
 from rce.comm.interfaces import IRobotRealm, IProtocol, \
     IRobot, IMessageReceiver
@@ -256,6 +260,14 @@ class Connection(object):
 
     addParameter.__doc__ = IRobot.get('addParameter').getDoc()
 
+    def addParameters(self, cTag, parameters):
+        if not self._view:
+            raise ForwardingError('Reference of the view is missing.')
+
+        self._view.addParameters(cTag, parameters)
+
+    addParameters.__doc__ = IRobot.get('addParameters').getDoc()
+
     def removeParameter(self, cTag, name):
         if not self._view:
             raise ForwardingError('Reference of the view is missing.')
@@ -390,6 +402,16 @@ class RobotView(object):
 
     addParameter.__doc__ = IRobot.get('addParameter').getDoc()
 
+    def addParameters(self, cTag, parameters):
+        try:
+            d = self._view.callRemote('addParameters', cTag, parameters)
+        except (DeadReferenceError, PBConnectionLost):
+            raise DeadConnection
+
+        d.addErrback(self._reportError)
+
+    addParameters.__doc__ = IRobot.get('addParameters').getDoc()
+
     def removeParameter(self, cTag, name):
         try:
             d = self._view.callRemote('removeParameter', cTag, name)
@@ -441,7 +463,8 @@ class Robot(Namespace):
             @param connection:  The connection manager for robot namespaces.
             @type  connection:  rce.robot.Connection
         """
-        Namespace.__init__(self, endpoint)
+        Namespace.__init__(self, endpoint, '{0}/{1}'.format(
+            connection.userID, connection.robotID))
 
         interface_map = {
             Types.encode('PublisherConverter') : PublisherConverter,
@@ -492,6 +515,8 @@ class Robot(Namespace):
         #       connections?
         #       For now the message is just dropped, which is fatal if it is a
         #       service call, i.e. the caller will wait forever for a response
+        tracer.record('Robot.receivedFromClient')
+
         try:
             self._interfaces[iTag].receive(clsName, msgID, msg)
         except (DeadReferenceError, PBConnectionLost):
@@ -531,6 +556,7 @@ class Robot(Namespace):
             #       once reconnecting clients are available... ?
             return
 
+        tracer.record('Robot.sendToClient')
         self._connection.sendMessage(iTag, msgType, msgID, msg)
 
     def sendToClientInterfaceStatusUpdate(self, iTag, status):
@@ -584,6 +610,7 @@ class RobotClient(Endpoint):
     # CONFIG
     CONNECT_TIMEOUT = 30
     RECONNECT_TIMEOUT = 10
+    SHM_DIR = '/dev/shm/rce'  # Directory for local connections (host)
 
     def __init__(self, reactor, masterIP, masterPort, commPort, extIP, extPort,
                  loader, converter):
@@ -809,9 +836,17 @@ class RobotClient(Endpoint):
 
 
 def main(reactor, cred, masterIP, masterPort, consolePort,
-                extIP, extPort, commPort, pkgPath, customConverters):
+                extIP, extPort, commPort, pkgPath, customConverters, preload,
+                traceRate, traceFile, metricsPort):
     log.startLogging(sys.stdout)
 
+    # Traces are started in the Robot process for the sampled messages which
+    # are received from the robots
+    if traceRate:
+        tracer.configure('robot', traceRate)
+        reactor.addSystemEventTrigger('before', 'shutdown', tracer.export,
+                                      traceFile)
+
     def _err(reason):
         print(reason)
         reactor.stop()
@@ -835,6 +870,14 @@ def main(reactor, cred, masterIP, masterPort, consolePort,
         mod = __import__(module, fromlist=[className])
         converter.addCustomConverter(getattr(mod, className))
 
+    # Load the ROS classes before any connections are accepted such that the
+    # first message does not have to wait for the imports
+    for cls in loader.preload(list(preload) + loader.getMostUsed()):
+        try:
+            converter.prepare(cls)
+        except (ValueError, ResourceNotFound, TypeError) as e:
+            log.msg('Could not prepare converter: {0}'.format(e))
+
     client = RobotClient(reactor, masterIP, consolePort, commPort, extIP,
                          extPort, loader, converter)
     d = factory.login(cred, client)
@@ -846,5 +889,13 @@ def main(reactor, cred, masterIP, masterPort, consolePort,
                                         'ws://localhost:{0}'.format(extPort))
     listenWS(robot)
 
+    # Metrics
+    if metricsPort:
+        reactor.listenTCP(metricsPort, Site(MetricsResource(registry)))
+
+    # Detect callbacks which block the reactor
+    ReactorWatchdog(reactor).start()
+
     reactor.addSystemEventTrigger('before', 'shutdown', client.terminate)
+    reactor.addSystemEventTrigger('before', 'shutdown', loader.persist)
     reactor.run()
@@ -31,29 +31,25 @@
 #
 
 # Python specific imports
+import os
+import time
 import httplib
 import json
-import fcntl
 
 # ROS specific imports
 import rospy
-from rosservice import get_service_list
-# TODO: Unused imports
-#from rosservice import get_service_type as rosservice_get_service_type
-#from rosservice import get_service_node as rosservice_get_service_node
-#from rosservice import get_service_uri
-#from rostopic import find_by_type
-#from rosnode import get_node_names
-#from rosgraph.masterapi import Master
-
-get_published_topics = rospy.get_published_topics
+from rosgraph.masterapi import Master
 
 # twisted specific imports
 from twisted.cred.error import UnauthorizedLogin
 from twisted.python import log
 from twisted.web.resource import Resource
 from twisted.web.server import NOT_DONE_YET, Site
-from twisted.internet.defer import fail, succeed
+from twisted.internet.defer import Deferred, fail, succeed, maybeDeferred
+from twisted.internet.threads import deferToThreadPool
+from twisted.internet.error import ConnectError
+from twisted.internet.protocol import ClientCreator
+from twisted.protocols.basic import LineReceiver
 
 # rce specific imports
 from rce.util.error import InternalError
@@ -65,15 +61,164 @@ class InvalidRequest(Exception):
 
 
 class ROSProxy(object):
+    """ Cache of the ROS graph, i.e. the topics and services with their types
+        and the nodes using them, which is used to answer the queries of the
+        console without contacting the ROS master for every request.
+
+        The graph is fetched in a separate thread. Once the graph is older
+        than the TTL the next query starts a refresh in the background, but
+        is answered immediately with the cached graph. Only one refresh is in
+        progress at any time, hence there can not be more than one request to
+        the ROS master regardless of the number of queries.
+    """
+    # CONFIG
+    TTL = 5  # Time in seconds after which the cached graph is refreshed
+
+    def __init__(self, reactor):
+        """ Initialize the ROS Proxy.
+
+            @param reactor:     Reference to the twisted reactor.
+            @type  reactor:     twisted::reactor
+        """
+        self._reactor = reactor
+        self._master = Master('/rosproxy')
+
+        self._graph = None
+        self._timestamp = 0
+        self._refreshing = False
+        self._waiting = []
+
+    def _fetch(self):
+        """ Internally used method to fetch the ROS graph from the ROS master.
+            This method blocks and should not be called from the reactor.
+        """
+        publishers, subscribers, services = self._master.getSystemState()
+        types = dict(self._master.getTopicTypes())
+
+        topics = {}
+
+        def topic(name):
+            return topics.setdefault(name, {'type':types.get(name),
+                                            'publishers':[],
+                                            'subscribers':[]})
+
+        for name, nodes in publishers:
+            topic(name)['publishers'] = nodes
+
+        for name, nodes in subscribers:
+            topic(name)['subscribers'] = nodes
+
+        return {'topics':topics,
+                'services':dict((name, {'providers':nodes})
+                                for name, nodes in services)}
+
+    def _refresh(self):
+        """ Internally used method to start a refresh of the cached graph if
+            there is none in progress.
+        """
+        if self._refreshing:
+            return
+
+        self._refreshing = True
+
+        d = deferToThreadPool(self._reactor, self._reactor.getThreadPool(),
+                              self._fetch)
+        d.addCallbacks(self._refreshed, self._refreshFailed)
+
+    def _refreshed(self, graph):
+        self._refreshing = False
+        self._graph = graph
+        self._timestamp = time.time()
+
+        waiting, self._waiting = self._waiting, []
+
+        for d in waiting:
+            d.callback(graph)
+
+    def _refreshFailed(self, failure):
+        self._refreshing = False
+
+        waiting, self._waiting = self._waiting, []
+
+        if not waiting:
+            log.err(failure, 'Could not refresh the ROS graph.')
+
+        for d in waiting:
+            d.errback(InternalError('Could not query the ROS master: '
+                                    '{0}'.format(failure.getErrorMessage())))
+
+    def get_graph(self):
+        """ Returns the ROS graph as a dictionary with the keys 'topics' and
+            'services'. Each topic contains its type, publishers and
+            subscribers, each service its providers.
+        """
+        if (self._graph is None or
+            time.time() - self._timestamp > self.TTL):
+            self._refresh()
+
+        if self._graph is not None:
+            return succeed(self._graph)
+
+        d = Deferred()
+        self._waiting.append(d)
+        return d
+
     def get_services(self):
         """ Returns a list of all the services advertised in the ROS system
         """
-        return get_service_list()
+        return self.get_graph().addCallback(
+            lambda graph: sorted(graph['services']))
 
     def get_topics(self):
         """ Returns a list of all the topics being published in the ROS system
         """
-        return [x[0] for x in get_published_topics()]
+        return self.get_graph().addCallback(
+            lambda graph: sorted(name for name, topic
+                                 in graph['topics'].iteritems()
+                                 if topic['publishers']))
+
+
+class _NodeLogStream(LineReceiver):
+    """ Protocol which forwards the output of a node from the local server in
+        the environment process to a HTTP request. As no content length is
+        set, the response is sent using chunked transfer encoding.
+    """
+    delimiter = '\n'
+
+    def __init__(self, query, request):
+        self._query = query
+        self._request = request
+        self._finished = False
+
+    def connectionMade(self):
+        self._request.notifyFinish().addBoth(self._requestFinished)
+        self.sendLine(self._query)
+
+    def _requestFinished(self, _):
+        self._finished = True
+        self.transport.loseConnection()
+
+    def lineReceived(self, line):
+        if line == 'OK':
+            self._request.setResponseCode(httplib.OK)
+            self._request.setHeader('content-type',
+                                    'text/plain; charset=utf-8')
+            self.setRawMode()
+        else:
+            self._request.setResponseCode(httplib.NOT_FOUND)
+            self._request.setHeader('content-type',
+                                    'text/plain; charset=utf-8')
+            self._request.write(line.split(' ', 1)[-1])
+            self.transport.loseConnection()
+
+    def rawDataReceived(self, data):
+        if not self._finished:
+            self._request.write(data)
+
+    def connectionLost(self, reason):
+        if not self._finished:
+            self._finished = True
+            self._request.finish()
 
 
 class ConsoleROSProxyAuthentication(Resource):
@@ -81,10 +226,48 @@ class ConsoleROSProxyAuthentication(Resource):
     """
     isLeaf = True
 
-    def __init__(self):
-        self._ros = ROSProxy()
+    # CONFIG
+    NODE_LOG_SOCKET = '/opt/rce/data/nodelog.sock'  # Socket for log streams
+
+    def __init__(self, reactor):
+        self._reactor = reactor
+        self._ros = ROSProxy(reactor)
         self._dbFile = "/opt/rce/data/rosenvbridge.db"
 
+        # Cached content of the database; userID -> set of keys
+        self._users = {}
+        self._dbStat = None
+
+    def _loadDB(self):
+        """ Internally used method to reload the rosproxy database if the file
+            has changed since it was read the last time. The file is replaced
+            atomically by the environment process; therefore, a change of the
+            file is detected by its inode, modification time and size.
+        """
+        try:
+            st = os.stat(self._dbFile)
+        except OSError:
+            self._users = {}
+            self._dbStat = None
+            return
+
+        if (st.st_ino, st.st_mtime, st.st_size) == self._dbStat:
+            return
+
+        users = {}
+
+        with open(self._dbFile, 'r') as bridgefile:
+            st = os.fstat(bridgefile.fileno())
+
+            for line in bridgefile:
+                userID, _, key = line.rstrip().partition(':')
+
+                if key:
+                    users.setdefault(userID, set()).add(key)
+
+        self._users = users
+        self._dbStat = (st.st_ino, st.st_mtime, st.st_size)
+
     def _checkDB(self, userID, key):
         """ Method to check the rosproxy database to authenticate a web
             request.
@@ -95,18 +278,8 @@ class ConsoleROSProxyAuthentication(Resource):
             @param key:       Secret key
             @type key:        string
         """
-        # TODO: Why not return True directly instead all lines will be read
-        # TODO: Should this be deferred to a separate thread due to flock,
-        #       which is a blocking call?
-        found = False
-        with open(self._dbFile, 'r') as bridgefile:
-            fcntl.flock(bridgefile.fileno(), fcntl.LOCK_EX)
-            lines = bridgefile.readlines()
-            for line in lines:
-                g = line.split(':')
-                if g[0] == userID and str(g[1].rstrip()) == str(key):
-                    found = True
-        return found
+        self._loadDB()
+        return str(key) in self._users.get(userID, ())
 
     def _processGETReq(self, args):
         """ Internally used method to process a GET request.
@@ -139,7 +312,7 @@ class ConsoleROSProxyAuthentication(Resource):
         if action is not None and action is not '':
             func = getattr(self, 'cmd_' + str(action[0]).upper(), None)
             if func is not None:
-                output = func()
+                return maybeDeferred(func)
             else:
                 return fail(InvalidRequest("No such action"))
         return succeed(output)
@@ -154,6 +327,46 @@ class ConsoleROSProxyAuthentication(Resource):
         """
         return self._ros.get_topics()
 
+    def cmd_GRAPH(self):
+        """ Handler for graph call.
+        """
+        return self._ros.get_graph()
+
+    def _processLogsReq(self, request):
+        """ Internally used method to process a request to stream the output
+            of a node. Additionally to the authentication the parameter 'node'
+            with the ID of the node and optionally the parameters 'stream'
+            ('out' or 'err') and 'lines' (number of previous lines) are used.
+        """
+        args = request.args
+
+        try:
+            userID = args['userID'][0]
+            key = args['key'][0]
+            node = args['node'][0]
+        except KeyError as e:
+            return fail(InvalidRequest('Request is missing parameter: '
+                                       '{0}'.format(e)))
+
+        stream = args.get('stream', ['out'])[0]
+
+        if stream not in ('out', 'err'):
+            return fail(InvalidRequest("Parameter 'stream' has to be 'out' or "
+                                       "'err'."))
+
+        try:
+            lines = int(args.get('lines', ['0'])[0])
+        except ValueError:
+            return fail(InvalidRequest("Parameter 'lines' has to be an "
+                                       'integer.'))
+
+        if not self._checkDB(userID, key):
+            return fail(UnauthorizedLogin("Unknown user or key"))
+
+        query = '{0} {1} {2}'.format(node, stream, lines)
+        creator = ClientCreator(self._reactor, _NodeLogStream, query, request)
+        return creator.connectUNIX(self.NODE_LOG_SOCKET)
+
     def _processGETResp(self, output, request):
         """ Internally used method to process a response to a GET request from
             the realm.
@@ -167,7 +380,10 @@ class ConsoleROSProxyAuthentication(Resource):
         """ Internally used method to process an error to a GET request from
             the realm.
         """
-        if e.check(InvalidRequest):
+        if e.check(ConnectError):
+            msg = 'Environment is not available.'
+            code = httplib.SERVICE_UNAVAILABLE
+        elif e.check(InvalidRequest):
             msg = e.getErrorMessage()
             code = httplib.BAD_REQUEST
         elif e.check(UnauthorizedLogin):
@@ -196,6 +412,11 @@ class ConsoleROSProxyAuthentication(Resource):
         """ This method is called by the twisted framework when a GET request
             was received.
         """
+        if request.args.get('action') == ['logs']:
+            d = self._processLogsReq(request)
+            d.addErrback(self._processGETErr, request)
+            return NOT_DONE_YET
+
         d = self._processGETReq(request.args)
         d.addCallback(self._processGETResp, request)
         d.addErrback(self._processGETErr, request)
@@ -213,7 +434,8 @@ def main(reactor, rosproxyPort):
     rospy.on_shutdown(terminate)
 
     #HTTP Server
-    reactor.listenTCP(rosproxyPort, Site(ConsoleROSProxyAuthentication()))
+    reactor.listenTCP(rosproxyPort,
+                      Site(ConsoleROSProxyAuthentication(reactor)))
 
     reactor.run(installSignalHandlers=False)
 
@@ -30,6 +30,11 @@
 #
 #
 
+# Python specific imports
+import os
+import errno
+from uuid import uuid4
+
 # twisted specific imports
 from twisted.python import log
 from twisted.python.failure import Failure
@@ -39,7 +44,9 @@ from twisted.spread.pb import Referenceable, Error, \
     DeadReferenceError, PBConnectionLost
 
 # rce specific imports
-from rce.slave.protocol import Loopback, RCEInternalProtocol
+from rce.util.error import InternalError
+from rce.util.profiler import SamplingProfiler
+from rce.slave.protocol import Loopback, RCEInternalProtocol, SharedMemory
 
 
 class ConnectionError(Error):
@@ -50,6 +57,9 @@ class ConnectionError(Error):
 class Endpoint(Referenceable):
     """ Abstract base class for an Endpoint in a slave process.
     """
+    # CONFIG
+    SHM_DIR = None  # Directory for the shared memory and local sockets
+
     def __init__(self, reactor, loader, commPort):
         """ Initialize the Endpoint.
 
@@ -78,6 +88,30 @@ class Endpoint(Referenceable):
         self._pendingConnections = {}
         self._protocols = set()
 
+        self._profiler = SamplingProfiler(reactor)
+
+        # The directory for the shared memory and the Unix domain sockets is
+        # writable for everyone, but the files in it can only be opened if
+        # their name is known
+        if self.SHM_DIR:
+            try:
+                os.mkdir(self.SHM_DIR)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            else:
+                os.chmod(self.SHM_DIR, 01733)
+
+            # Endpoints in the same machine connect using the Unix domain
+            # socket, which avoids the TCP stack and the port forwarding of
+            # the containers; the other endpoint might run as a different
+            # user, e.g. the environment in a container
+            self._socketName = '{0}.sock'.format(uuid4().hex)
+            reactor.listenUNIX(os.path.join(self.SHM_DIR, self._socketName),
+                               _RCEInternalServerFactory(self), mode=0666)
+        else:
+            self._socketName = None
+
     @property
     def reactor(self):
         """ Reference to twisted::reactor. """
@@ -117,6 +151,28 @@ class Endpoint(Referenceable):
 
         return self._loopback
 
+    def remote_profile(self, duration):
+        """ Profile the process of the endpoint.
+
+            @param duration:    Duration of the profile in seconds.
+            @type  duration:    float
+
+            @return:            Collapsed stacks of the process. (type: str)
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        return self._profiler.profile(duration)
+
+    def remote_getSocketName(self):
+        """ Get the name of the Unix domain socket of the endpoint's internal
+            communication server.
+
+            @return:            Name of the socket in the directory for local
+                                connections or None if the endpoint does not
+                                accept local connections.
+            @rtype:             str
+        """
+        return self._socketName
+
     def remote_prepareConnection(self, connID, key, auth):
         """ Prepare the endpoint for the connection attempt by adding the
             necessary connection information to the remote process.
@@ -137,7 +193,7 @@ class Endpoint(Referenceable):
         assert connID not in self._pendingConnections
         self._pendingConnections[connID] = [key, auth]
 
-    def remote_connect(self, connID, addr):
+    def remote_connect(self, connID, addr, socketName=None):
         """ Connect to the endpoint with the given address using the
             connection information matching the received ID.
 
@@ -148,6 +204,12 @@ class Endpoint(Referenceable):
             @param addr:        Address to which the endpoint should connect.
                                 It consists of an IP address and a port number.
             @type  addr:        (str, int)
+
+            @param socketName:  Name of the Unix domain socket of the other
+                                endpoint, if it is in the same machine. The
+                                socket is used instead of the address and
+                                shared memory is used for the connection.
+            @type  socketName:  str
         """
         assert connID in self._pendingConnections
 
@@ -157,17 +219,69 @@ class Endpoint(Referenceable):
         key, auth = info
         info[0] = None
 
+        if socketName and self.SHM_DIR:
+            try:
+                shm = SharedMemory(self._getSharedMemoryPath(connID), True)
+            except EnvironmentError:
+                log.err(None, 'Shared memory could not be created; messages '
+                              'are sent over the connection only.')
+                shm = None
+        else:
+            shm = None
+
         client = ClientCreator(self._reactor, RCEInternalProtocol, self)
-        d = client.connectTCP(*addr)
-        d.addCallback(lambda p: p.sendInit(connID, key))
-        d.addErrback(self._connectError, auth)
 
-    def _connectError(self, failure, auth):
+        if socketName and self.SHM_DIR:
+            def fallback(failure):
+                log.msg('Connection over the Unix domain socket failed, use '
+                        'TCP instead: {0}'.format(failure.getErrorMessage()))
+                return client.connectTCP(*addr)
+
+            d = client.connectUNIX(os.path.join(self.SHM_DIR, socketName))
+            d.addErrback(fallback)
+        else:
+            d = client.connectTCP(*addr)
+
+        d.addCallback(lambda p: p.sendInit(connID, key, shm))
+        d.addErrback(self._connectError, auth, shm)
+
+    def _connectError(self, failure, auth, shm):
+        if shm:
+            shm.close()
+
         failure.printTraceback()
         # TODO: Signal back the error
         # v does not work
         #auth.callRemote('verifyKey', None, failure)
 
+    def _getSharedMemoryPath(self, connID):
+        """ Internally used method to get the path of the file which is used
+            as shared memory for the connection with the given ID.
+        """
+        return os.path.join(self.SHM_DIR, connID.encode('hex'))
+
+    def openSharedMemory(self, connID):
+        """ Callback for the RCE Internal Protocol which is called when the
+            other side requested to use shared memory for the connection.
+
+            @param connID:      Unique ID which is used to identify the
+                                connection.
+            @type  connID:      str
+
+            @return:            Shared memory which was created by the other
+                                side or None if it can not be used.
+            @rtype:             rce.slave.protocol.SharedMemory
+        """
+        if not self.SHM_DIR or connID not in self._pendingConnections:
+            return None
+
+        try:
+            return SharedMemory(self._getSharedMemoryPath(connID), False)
+        except (EnvironmentError, InternalError):
+            log.err(None, 'Shared memory could not be opened; messages are '
+                          'sent over the connection only.')
+            return None
+
     def processInit(self, protocol, connID, remoteKey):
         """ Callback for the RCE Internal Protocol which is called when the
             protocol received an init message which has to be processed.
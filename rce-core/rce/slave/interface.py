@@ -39,6 +39,8 @@ from twisted.spread.pb import Referenceable, Error
 
 # rce specific imports
 from rce.util.error import InternalError
+from rce.util.metrics import registry
+from rce.util.trace import tracer
 
 
 class Types(object):
@@ -123,6 +125,9 @@ class InvalidResoureName(Error):
 class Interface(Referenceable):
     """ Abstract base class for an Interface in a slave process.
     """
+    _MSGS = 'rce_interface_messages_total'
+    _BYTES = 'rce_interface_bytes_total'
+
     def __init__(self, owner, uid, addr):
         """ Initialize the Interface.
 
@@ -148,6 +153,33 @@ class Interface(Referenceable):
         self._protocols = {}
         self._ready = False
 
+        # The address is only unique in the namespace; the metrics are removed
+        # when the interface is destroyed
+        self._labels = {'namespace':owner.name,
+                        'interface':self._formatAddr(addr)}
+
+        msgs = 'Number of messages passed through the interfaces.'
+        size = 'Number of bytes passed through the interfaces.'
+        self._msgsIn = registry.counter(self._MSGS, msgs, direction='in',
+                                        **self._labels)
+        self._msgsOut = registry.counter(self._MSGS, msgs, direction='out',
+                                         **self._labels)
+        self._bytesIn = registry.counter(self._BYTES, size, direction='in',
+                                         **self._labels)
+        self._bytesOut = registry.counter(self._BYTES, size, direction='out',
+                                          **self._labels)
+
+    @staticmethod
+    def _formatAddr(addr):
+        """ Internally used method to format the address of an interface for
+            the metrics, e.g. the address ('SC', '/add_two_ints') of a ROS-side
+            interface as 'SC:/add_two_ints'.
+        """
+        if isinstance(addr, tuple):
+            return ':'.join(addr)
+
+        return addr
+
     @property
     def UID(self):
         """ Unique ID of the interface (internal communication). """
@@ -229,6 +261,10 @@ class Interface(Referenceable):
 
         self.stop()
 
+        for name in (self._MSGS, self._BYTES):
+            for direction in ('in', 'out'):
+                registry.remove(name, direction=direction, **self._labels)
+
         if self._owner:
             self._owner.unregisterInterface(self)
             self._owner = None
@@ -292,6 +328,10 @@ class Interface(Referenceable):
             log.msg('Received message dropped, because interface does not '
                     'expected the message.')
 
+        self._msgsIn.inc()
+        self._bytesIn.inc(len(msg))
+
+        tracer.record('Interface.send')
         self._send(msg, msgID, protocol, remoteID)
 
     def received(self, msg, msgID):
@@ -306,7 +346,11 @@ class Interface(Referenceable):
                                 message.
             @type  msgID:       str
         """
+        tracer.record('Interface.received')
+
         for protocol in self._protocols:
+            self._msgsOut.inc()
+            self._bytesOut.inc(len(msg))
             protocol.sendMessage(self, msg, msgID)
 
     def respond(self, msg, msgID, protocol, remoteID):
@@ -329,6 +373,10 @@ class Interface(Referenceable):
                                 response be sent.
             @type  remoteID:    uuid.UUID
         """
+        self._msgsOut.inc()
+        self._bytesOut.inc(len(msg))
+
+        tracer.record('Interface.respond')
         protocol.sendMessage(self, msg, msgID, remoteID)
 
     ###
@@ -43,15 +43,28 @@ from rce.util.error import InternalError
 class Namespace(Referenceable):
     """ Abstract base class for a Namespace in a slave process.
     """
-    def __init__(self, endpoint):
+    def __init__(self, endpoint, name):
         """ Initialize the Namespace.
+
+            @param endpoint:    Endpoint to which the namespace belongs.
+            @type  endpoint:    rce.slave.endpoint.Endpoint
+
+            @param name:        Name which identifies the namespace in the
+                                metrics of its interfaces.
+            @type  name:        str
         """
         self._endpoint = endpoint
+        self._name = name
         endpoint.registerNamespace(self)
 
         self._interfaces = {}
         self._map = {}
 
+    @property
+    def name(self):
+        """ Name which identifies the namespace in the metrics. """
+        return self._name
+
     @property
     def reactor(self):
         """ Reference to twisted::reactor. """
@@ -31,6 +31,8 @@
 #
 
 # Python specific imports
+import os
+import mmap
 import struct
 from uuid import UUID
 
@@ -41,6 +43,175 @@ from twisted.spread.pb import Referenceable
 
 # rce specific imports
 from rce.util.error import InternalError
+from rce.util.metrics import registry
+from rce.util.trace import ID_LENGTH, tracer
+
+
+_DROPPED = registry.counter('rce_protocol_dropped_messages_total',
+                            'Number of received messages which have been '
+                            'dropped, because no interface was ready.')
+
+
+class SharedMemory(object):
+    """ Shared memory which is used to transfer the payload of large messages
+        between two endpoints running in the same machine. The memory is a
+        file, which is mapped by both processes, containing one ring buffer
+        for each direction; the position and length of the payload is still
+        sent over the connection.
+
+        Each ring buffer starts with the total number of bytes which have been
+        consumed by the receiving side followed by the data.
+    """
+    # CONFIG
+    SIZE = 16777216  # Size in bytes of the ring buffer for each direction
+
+    _COUNTER_STRUCT = struct.Struct('!Q')
+
+    def __init__(self, fileName, create):
+        """ Initialize the shared memory.
+
+            @param fileName:    Path of the file which is used as shared
+                                memory.
+            @type  fileName:    str
+
+            @param create:      Flag whether the file should be created, i.e.
+                                this is the client side of the connection, or
+                                whether an existing file should be opened.
+            @type  create:      bool
+        """
+        header = self._COUNTER_STRUCT.size
+        total = 2 * (header + self.SIZE)
+
+        if create:
+            fd = os.open(fileName, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0600)
+        else:
+            fd = os.open(fileName, os.O_RDWR)
+
+        try:
+            if create:
+                # The other side might run as a different user, e.g. the
+                # environment in a container; the file is not listed in the
+                # shared memory directory and its name is only known to the
+                # two endpoints
+                os.fchmod(fd, 0666)
+                os.ftruncate(fd, total)
+            elif os.fstat(fd).st_size != total:
+                raise InternalError('Shared memory has an invalid size.')
+
+            self._mmap = mmap.mmap(fd, total)
+        except:
+            os.close(fd)
+
+            if create:
+                os.remove(fileName)
+
+            raise
+
+        os.close(fd)
+
+        # The file is no longer needed as soon as both sides mapped it
+        if create:
+            self._fileName = fileName
+        else:
+            self._fileName = None
+
+            # Fails if the file belongs to another user, because the shared
+            # memory directory is sticky; the creator removes it when closing
+            try:
+                os.remove(fileName)
+            except OSError:
+                pass
+
+        # The client sends using the first and the server using the second
+        # ring buffer
+        if create:
+            self._sendOffset, self._recvOffset = 0, header + self.SIZE
+        else:
+            self._sendOffset, self._recvOffset = header + self.SIZE, 0
+
+        # Total number of bytes written to / read from the ring buffers
+        self._written = 0
+        self._read = 0
+
+    def write(self, data):
+        """ Write data to the ring buffer used for sending.
+
+            @param data:        Data which should be written.
+            @type  data:        str
+
+            @return:            Position of the data which has to be sent to
+                                the other side or None if there is not enough
+                                free space in the ring buffer.
+            @rtype:             int
+        """
+        length = len(data)
+        header = self._COUNTER_STRUCT.size
+        consumed, = self._COUNTER_STRUCT.unpack(
+            self._mmap[self._sendOffset:self._sendOffset + header])
+
+        if self._written - consumed + length > self.SIZE:
+            return None
+
+        pos = self._written
+        start = self._sendOffset + header
+        index = pos % self.SIZE
+        first = min(length, self.SIZE - index)
+
+        if first == length:
+            self._mmap[start + index:start + index + length] = data
+        else:
+            self._mmap[start + index:start + self.SIZE] = data[:first]
+            self._mmap[start:start + length - first] = data[first:]
+
+        self._written += length
+        return pos
+
+    def read(self, pos, length):
+        """ Read data from the ring buffer used for receiving and release the
+            space in the ring buffer.
+
+            @param pos:         Position of the data received from the other
+                                side.
+            @type  pos:         int
+
+            @param length:      Length of the data in bytes.
+            @type  length:      int
+
+            @return:            Data which was read.
+            @rtype:             str
+        """
+        if pos != self._read or length > self.SIZE:
+            raise InternalError('Invalid position in shared memory.')
+
+        header = self._COUNTER_STRUCT.size
+        start = self._recvOffset + header
+        index = pos % self.SIZE
+        first = min(length, self.SIZE - index)
+
+        if first == length:
+            data = self._mmap[start + index:start + index + length]
+        else:
+            data = ''.join((self._mmap[start + index:start + self.SIZE],
+                            self._mmap[start:start + length - first]))
+
+        self._read += length
+        self._mmap[self._recvOffset:self._recvOffset + header] = \
+            self._COUNTER_STRUCT.pack(self._read)
+
+        return data
+
+    def close(self):
+        """ Release the shared memory.
+        """
+        self._mmap.close()
+
+        if self._fileName:
+            try:
+                os.remove(self._fileName)
+            except OSError:
+                pass
+
+            self._fileName = None
 
 
 class _Protocol(Referenceable):
@@ -102,6 +273,7 @@ class _Protocol(Referenceable):
         if remoteID not in self._receivers:
             log.msg('Received message dropped, because there is no interface '
                     'ready for the message.')
+            _DROPPED.inc()
             return
 
         for interface in self._receivers[remoteID]:
@@ -182,10 +354,18 @@ class RCEInternalProtocol(Int32StringReceiver, _Protocol):
     """
     # CONFIG
     MAX_LENGTH = 30000000  # Maximal message length in bytes
+    SHM_THRESHOLD = 65536  # Minimal message length in bytes for shared memory
 
     _MSG_ID_STRUCT = struct.Struct('!B')
-    _TRUE = struct.pack('!?', True)
-    _FALSE = struct.pack('!?', False)
+    _SHM_STRUCT = struct.Struct('!QI')
+
+    # Bits of the flag at the beginning of a message
+    _FLAG_DEST = 0x01  # Message contains the ID of the destination Interface
+    _FLAG_TRACE = 0x02  # Message contains the ID of a trace after the msg ID
+    _FLAG_SHM = 0x04  # Message contains the position of the data in the shm
+
+    # Bits of the optional flag at the end of the init message
+    _INIT_SHM = 0x01  # Shared memory should be used for the connection
 
     def __init__(self, endpoint):
         """ Initialize the Protocol.
@@ -198,6 +378,10 @@ class RCEInternalProtocol(Int32StringReceiver, _Protocol):
         self._initialized = False
         self.stringReceived = self._initReceived
 
+        # Shared memory used for the payload of large messages; only
+        # available if both endpoints are in the same machine
+        self._shm = None
+
     def _initReceived(self, msg):
         """ Internally used method process a complete string message as long as
             the connection is not yet initialized.
@@ -205,12 +389,24 @@ class RCEInternalProtocol(Int32StringReceiver, _Protocol):
             @param msg:         Message which was received.
             @type  msg:         str
         """
-        if len(msg) != 32:
+        if len(msg) not in (32, 33):
             log.msg('Protocol Error: iInit message has invalid format.')
             self.transport.loseConnection()
             return
 
-        d = self._endpoint.processInit(self, msg[:16], msg[16:])
+        connID = msg[:16]
+        shared = len(msg) == 33 and bool(ord(msg[32]) & self._INIT_SHM)
+
+        if self._shm:
+            # The init message of this side requested the shared memory
+            if not shared:
+                log.msg('Shared memory was refused by the other side.')
+                self._shm.close()
+                self._shm = None
+        elif shared:
+            self._shm = self._endpoint.openSharedMemory(connID)
+
+        d = self._endpoint.processInit(self, connID, msg[16:32])
         d.addCallbacks(self._initSuccessful, self._initFailed)
 
     def _initSuccessful(self, _):
@@ -231,18 +427,19 @@ class RCEInternalProtocol(Int32StringReceiver, _Protocol):
         if len(msg) < 17:
             self.transport.loseConnection()
 
-        flag = msg[:1]
+        flag = ord(msg[0])
 
-        if flag == self._TRUE:
+        if flag & ~(self._FLAG_DEST | self._FLAG_TRACE | self._FLAG_SHM):
+            log.msg('Protocol Error: Could not identify flag.')
+            self.transport.loseConnection()
+            return
+
+        if flag & self._FLAG_DEST:
             destID = UUID(bytes=msg[1:17])
             offset = 17
-        elif flag == self._FALSE:
+        else:
             destID = None
             offset = 1
-        else:
-            log.msg('Protocol Error: Could not identify flag.')
-            self.transport.loseConnection()
-            return
 
         remoteID = UUID(bytes=msg[offset:offset + 16])
         offset += 16
@@ -253,9 +450,34 @@ class RCEInternalProtocol(Int32StringReceiver, _Protocol):
         msgID = msg[offset:offset + idLen]
         offset += idLen
 
-        self.messageReceived(remoteID, buffer(msg, offset), msgID, destID)
+        if flag & self._FLAG_TRACE:
+            traceID = msg[offset:offset + ID_LENGTH]
+            offset += ID_LENGTH
+        else:
+            traceID = None
+
+        if flag & self._FLAG_SHM:
+            if not self._shm:
+                log.msg('Protocol Error: Shared memory is not available.')
+                self.transport.loseConnection()
+                return
+
+            pos, length = self._SHM_STRUCT.unpack(
+                msg[offset:offset + self._SHM_STRUCT.size])
+            data = self._shm.read(pos, length)
+        else:
+            data = buffer(msg, offset)
+
+        # The trace is only valid while the message is processed
+        tracer.current = traceID
+        tracer.record('RCEInternalProtocol.messageReceived')
+
+        try:
+            self.messageReceived(remoteID, data, msgID, destID)
+        finally:
+            tracer.current = None
 
-    def sendInit(self, connID, key):
+    def sendInit(self, connID, key, shm=None):
         """ Send an init message to the other side.
 
             @param connID:      Unique ID which is used to identify the
@@ -265,11 +487,23 @@ class RCEInternalProtocol(Int32StringReceiver, _Protocol):
             @param key:         Key which should be sent with the init message
                                 to authenticate this endpoint.
             @type  key:         str
+
+            @param shm:         Shared memory which was created for the
+                                connection and which should be used by the
+                                other side as well. (Only used by the client
+                                side of the connection.)
+            @type  shm:         rce.slave.protocol.SharedMemory
         """
         assert len(connID) == 16
         assert len(key) == 16
 
-        self.sendString(connID + key)
+        if shm:
+            self._shm = shm
+
+        if self._shm:
+            self.sendString(connID + key + chr(self._INIT_SHM))
+        else:
+            self.sendString(connID + key)
 
     def sendMessage(self, interface, msg, msgID, remoteID=None):
         assert self._initialized
@@ -283,14 +517,30 @@ class RCEInternalProtocol(Int32StringReceiver, _Protocol):
             raise InternalError('Message ID is too long.')
 
         if remoteID:
-            flag = self._TRUE
+            flag = self._FLAG_DEST
             rmtID = remoteID.bytes
             assert len(rmtID) == 16
         else:
-            flag = self._FALSE
+            flag = 0
             rmtID = ''
 
-        self.sendString(''.join((flag, rmtID, uid, idLen, msgID, msg)))
+        traceID = tracer.current
+
+        if traceID:
+            flag |= self._FLAG_TRACE
+            tracer.record('RCEInternalProtocol.sendMessage')
+        else:
+            traceID = ''
+
+        if self._shm and len(msg) >= self.SHM_THRESHOLD:
+            pos = self._shm.write(str(msg))
+
+            if pos is not None:
+                flag |= self._FLAG_SHM
+                msg = self._SHM_STRUCT.pack(pos, len(msg))
+
+        self.sendString(''.join((chr(flag), rmtID, uid, idLen, msgID, traceID,
+                                 msg)))
 
     sendMessage.__doc__ = _Protocol.sendMessage.__doc__
 
@@ -298,6 +548,10 @@ class RCEInternalProtocol(Int32StringReceiver, _Protocol):
         """ Method is called by the twisted framework when the connection is
             lost.
         """
+        if self._shm:
+            self._shm.close()
+            self._shm = None
+
         _Protocol.remote_destroy(self)
 
     def remote_destroy(self):
@@ -37,6 +37,7 @@ pjoin = os.path.join
 
 # twisted specific imports
 from twisted.python import log
+from twisted.internet.defer import DeferredList, succeed
 
 # rce specific imports
 from rce.util.process import execute
@@ -61,6 +62,67 @@ lxc.cgroup.devices.allow = c 5:2 rwm
 lxc.cgroup.devices.allow = c 254:0 rwm
 """
 
+_CONFIG_LIMITS = """
+# resource limits
+lxc.cgroup.cpu.shares = {shares}
+"""
+
+_CONFIG_CPU_QUOTA = """lxc.cgroup.cpu.cfs_period_us = {period}
+lxc.cgroup.cpu.cfs_quota_us = {quota}
+"""
+
+_CONFIG_MEMORY = """lxc.cgroup.memory.limit_in_bytes = {memory}
+"""
+
+# Period in microseconds which is used for the CPU quota
+_CPU_PERIOD = 100000
+
+# Directories in which the cgroup of a container can be found depending on how
+# the cgroup hierarchies are mounted in the host system
+_CGROUP_DIRS = ('/sys/fs/cgroup/{subsystem}/lxc/{name}',
+                '/sys/fs/cgroup/lxc/{name}',
+                '/cgroup/{name}')
+
+# Commands to shape the traffic of a network interface in both directions;
+# ingress of the host interface is egress of the container and vice versa
+_TC_COMMANDS = (('/sbin/tc', 'qdisc', 'add', 'dev', '{dev}', 'root', 'tbf',
+                 'rate', '{rate}kbit', 'burst', '{burst}kbit', 'latency',
+                 '400ms'),
+                ('/sbin/tc', 'qdisc', 'add', 'dev', '{dev}', 'handle',
+                 'ffff:', 'ingress'),
+                ('/sbin/tc', 'filter', 'add', 'dev', '{dev}', 'parent',
+                 'ffff:', 'protocol', 'ip', 'u32', 'match', 'u32', '0', '0',
+                 'police', 'rate', '{rate}kbit', 'burst', '{burst}kbit',
+                 'drop', 'flowid', ':1'))
+
+
+def _readCgroup(name, subsystem, key):
+    """ Read a value from the cgroup of a container.
+
+        @param name:        Name of the container.
+        @type  name:        str
+
+        @param subsystem:   Name of the cgroup subsystem, i.e. 'memory'.
+        @type  subsystem:   str
+
+        @param key:         Name of the cgroup file, i.e. 'memory.usage_in_bytes'.
+        @type  key:         str
+
+        @return:            Value of the cgroup file or None if the file could
+                            not be read.
+        @rtype:             int / None
+    """
+    for path in _CGROUP_DIRS:
+        try:
+            with open(pjoin(path.format(subsystem=subsystem, name=name),
+                            key)) as f:
+                return int(f.read())
+        except (IOError, ValueError):
+            continue
+
+    return None
+
+
 _CONFIG_CAP = """
 # restrict capabilities
 #   can't use: lxc.cap.drop = sys_admin
@@ -135,7 +197,17 @@ class Container(object):
         self._ifs = []
         self._fstabExt = []
 
-    def addNetworkInterface(self, name, link=None, ip=None, up=None, down=None):
+        # Flag whether the configuration and fstab file are already written
+        self._prepared = False
+
+        # Resource limits
+        self._cpuShares = 1024
+        self._cpuQuota = None
+        self._memory = None
+        self._bandwidth = []
+
+    def addNetworkInterface(self, name, link=None, ip=None, up=None, down=None,
+                            pair=None):
         """ Add a network interface to the configuration file.
 
             @param name:    Name of the network interface inside the container.
@@ -157,6 +229,11 @@ class Container(object):
             @param down:    Path to a script which should be executed in the
                             host system once the interface has to teared down.
             @type  down:    str
+
+            @param pair:    Name of the network interface in the host system
+                            which is paired with the container network
+                            interface. If None, a random name is used.
+            @type  pair:    str
         """
         if up:
             if not os.path.isabs(up):
@@ -178,7 +255,72 @@ class Container(object):
             if not os.access(down, os.X_OK):
                 raise ValueError('Down script is not executable.')
 
-        self._ifs.append((name, link, ip, up, down))
+        self._ifs.append((name, link, ip, up, down, pair))
+
+    def limitResources(self, cpuShares, cpuQuota=None, memory=None):
+        """ Limit the resources which the container can use.
+
+            @param cpuShares:   Relative share of the CPU time which the
+                                container gets if the CPUs are contended. The
+                                default value is 1024.
+            @type  cpuShares:   int
+
+            @param cpuQuota:    Maximum number of CPUs which the container can
+                                use. If None, there is no limit.
+            @type  cpuQuota:    float / None
+
+            @param memory:      Maximum amount of memory in bytes which the
+                                container can use. If None, there is no limit.
+            @type  memory:      int / None
+        """
+        if cpuShares < 2:
+            raise ValueError('CPU shares have to be at least 2.')
+
+        if cpuQuota is not None and cpuQuota <= 0:
+            raise ValueError('CPU quota has to be positive.')
+
+        if memory is not None and memory <= 0:
+            raise ValueError('Memory limit has to be positive.')
+
+        self._cpuShares = int(cpuShares)
+        self._cpuQuota = cpuQuota
+        self._memory = memory
+
+    def limitBandwidth(self, pair, rate):
+        """ Limit the bandwidth of a network interface of the container. The
+            limit is applied in both directions once the container is started.
+
+            @param pair:    Name of the network interface in the host system,
+                            which has to be set using 'addNetworkInterface'.
+            @type  pair:    str
+
+            @param rate:    Maximum rate in kbit/s.
+            @type  rate:    int
+        """
+        if pair not in (p for _, _, _, _, _, p in self._ifs):
+            raise ValueError("There is no network interface '{0}'.".format(pair))
+
+        if rate <= 0:
+            raise ValueError('Bandwidth limit has to be positive.')
+
+        self._bandwidth.append((pair, int(rate)))
+
+    def getUsage(self, name):
+        """ Get the resource usage of the container from its cgroup.
+
+            @param name:    Name of the container.
+            @type  name:    str
+
+            @return:        Dictionary with the used CPU time in nanoseconds
+                            ('cpu'), the currently used memory ('memory') and
+                            the maximal used memory ('memoryMax') in bytes.
+                            Values which can not be read are None.
+            @rtype:         dict
+        """
+        return {'cpu':_readCgroup(name, 'cpuacct', 'cpuacct.usage'),
+                'memory':_readCgroup(name, 'memory', 'memory.usage_in_bytes'),
+                'memoryMax':_readCgroup(name, 'memory',
+                                        'memory.max_usage_in_bytes')}
 
     def extendFstab(self, src, fs, ro):
         """ Add a line to the fstab file using bind.
@@ -218,7 +360,7 @@ class Container(object):
             f.write('lxc.mount = {0}\n'.format(self._fstab))
 
             # Write interface config
-            for name, link, ip, up, down in self._ifs:
+            for name, link, ip, up, down, pair in self._ifs:
                 f.write('\n')
                 f.write('lxc.network.type = veth\n')
                 f.write('lxc.network.flags = up\n')
@@ -236,10 +378,22 @@ class Container(object):
                 if down:
                     f.write('lxc.network.script.down = {0}\n'.format(down))
 
+                if pair:
+                    f.write('lxc.network.veth.pair = {0}\n'.format(pair))
 
             # Write cgroup config
             f.write(_CONFIG_CGROUP)
 
+            # Write resource limits
+            f.write(_CONFIG_LIMITS.format(shares=self._cpuShares))
+
+            if self._cpuQuota:
+                f.write(_CONFIG_CPU_QUOTA.format(period=_CPU_PERIOD,
+                    quota=int(self._cpuQuota * _CPU_PERIOD)))
+
+            if self._memory:
+                f.write(_CONFIG_MEMORY.format(memory=int(self._memory)))
+
             # Write capabilities config
             # TODO: Add at some point?
             # f.write(_CONFIG_CAP)
@@ -253,6 +407,15 @@ class Container(object):
                 f.write(_FSTAB_BIND.format(srcDir=src, dstDir=dst,
                                            ro=',ro' if ro else ''))
 
+    def prepare(self):
+        """ Write the configuration and fstab file of the container. The
+            method blocks on file I/O and can therefore be called from a
+            thread before the container is started; the configuration of the
+            container can't be changed afterwards.
+        """
+        self._setupFiles()
+        self._prepared = True
+
     def start(self, name):
         """ Start the container.
 
@@ -264,11 +427,46 @@ class Container(object):
                             error message.
             @rtype:         twisted.internet.defer.Deferred
         """
-        self._setupFiles()
+        if not self._prepared:
+            self._setupFiles()
 
         log.msg("Start container '{0}'".format(name))
-        return execute(('/usr/bin/lxc-start', '-n', name, '-f', self._conf,
-                        '-d'), reactor=self._reactor)
+        d = execute(('/usr/bin/lxc-start', '-n', name, '-f', self._conf,
+                     '-d'), reactor=self._reactor)
+
+        if self._bandwidth:
+            d.addCallback(self._shapeNetwork)
+
+        return d
+
+    def _shapeNetwork(self, result):
+        """ Internally used method to apply the bandwidth limits to the
+            network interfaces of the started container. Failures are only
+            logged as the container is already running.
+        """
+        def eb(failure):
+            log.msg('Could not limit bandwidth: {0}'.format(
+                        failure.getErrorMessage()))
+
+        deferreds = []
+
+        for dev, rate in self._bandwidth:
+            # Allow bursts of 100 ms at full rate, but at least 32 kbit
+            burst = max(32, rate // 10)
+
+            # The commands for one interface have to run sequentially
+            d = succeed(None)
+
+            for cmd in _TC_COMMANDS:
+                cmd = tuple(arg.format(dev=dev, rate=rate, burst=burst)
+                            for arg in cmd)
+                d.addCallback(lambda _, cmd=cmd: execute(cmd,
+                                                         reactor=self._reactor))
+
+            d.addErrback(eb)
+            deferreds.append(d)
+
+        return DeferredList(deferreds).addCallback(lambda _: result)
 
     def stop(self, name):
         """ Stop the container.
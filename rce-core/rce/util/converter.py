@@ -31,6 +31,7 @@
 #
 
 # Python specific imports
+import re
 import time
 from datetime import datetime
 from functools import partial
@@ -48,10 +49,12 @@ except ImportError:
         return isinstance(obj, StringIO)
 
 # ROS specific imports
+#   The time classes are taken from genpy instead of rospy as importing rospy
+#   loads the complete ROS client library, which is not needed here.
 try:
     from genmsg.names import package_resource_name
     from genpy.message import Message
-    from rospy.rostime import Duration, Time
+    from genpy.rostime import Duration, Time
 except ImportError:
     print('Can not import ROS Python libraries.')
     print('Make sure they are installed and the ROS Environment is setup.')
@@ -84,13 +87,13 @@ class _DurationConverter(object):
     implements(ICustomROSConverter)
 
     def decode(self, data):
-        """ Generate a rospy.rostime.Duration instance based on the given data
+        """ Generate a genpy.rostime.Duration instance based on the given data
             which should be a string representation of a float.
         """
         return Duration.from_sec(float(data))
 
     def encode(self, rosMsg):
-        """ Transform the rospy.rostime.Duration instance to a float.
+        """ Transform the genpy.rostime.Duration instance to a float.
         """
         try:
             return (rosMsg.to_sec(), {})
@@ -104,7 +107,7 @@ class _TimeConverter(object):
     implements(ICustomROSConverter)
 
     def decode(self, data):
-        """ Generate a rospy.rostime.Time instance based on the given data of
+        """ Generate a genpy.rostime.Time instance based on the given data of
             the form 'YYYY-MM-DDTHH:MM:SS.mmmmmm' (ISO 8601).
         """
         if '+' in data:
@@ -121,7 +124,7 @@ class _TimeConverter(object):
         return Time.from_sec(time.mktime(dt.timetuple()))
 
     def encode(self, rosMsg):
-        """ Transform the rospy.rostime.Time instance to a string of the form
+        """ Transform the genpy.rostime.Time instance to a string of the form
             'YYYY-MM-DDTHH:MM:SS.mmmmmm' (ISO 8601).
         """
         try:
@@ -163,6 +166,9 @@ class Converter(object):
     _SPECIAL_TYPES = {  'time'     : _TimeConverter,
                         'duration' : _DurationConverter }
 
+    # Suffix of variable-length and fixed-size array slot types
+    _ARRAY_RE = re.compile(r'\[\d*\]$')
+
     def __init__(self, loader):
         """ Initialize the Converter.
 
@@ -171,6 +177,7 @@ class Converter(object):
         """
         self._loader = loader
         self._customTypes = {}
+        self._prepared = set()
 
     def addCustomConverter(self, converter):
         """ Register a new custom Converter.
@@ -208,6 +215,47 @@ class Converter(object):
             InternalError('Tried to remove a custom converter which was '
                           'never added.')
 
+    def _prepare(self, msgCls):
+        """ Internally used method to load all message classes which are
+            referenced by the given message class.
+        """
+        if msgCls in self._prepared:
+            return
+
+        for slotType in msgCls._slot_types:
+            slotType = self._ARRAY_RE.sub('', slotType)
+
+            if (slotType in self._BASE_TYPES or
+                slotType in self._SPECIAL_TYPES or
+                slotType in self._customTypes):
+                continue
+
+            resource = slotType.split('/')
+
+            if len(resource) != 2:
+                continue
+
+            self._prepare(self._loader.loadMsg(*resource))
+
+        self._prepared.add(msgCls)
+
+    def prepare(self, cls):
+        """ Prepare the Converter for the given message or service class
+            such that the first conversion does not have to load any
+            referenced message classes.
+
+            @param cls:     ROS message or service class which should be
+                            prepared.
+            @type  cls:     ROS Message class / ROS service class
+
+            @raise:         rce.util.loader.ResourceNotFound
+        """
+        if hasattr(cls, '_request_class'):
+            self._prepare(cls._request_class)
+            self._prepare(cls._response_class)
+        else:
+            self._prepare(cls)
+
     def _encode(self, rosMsg):
         """ Internally used method which is responsible for the heavy lifting.
         """
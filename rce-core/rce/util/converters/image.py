@@ -43,12 +43,6 @@ except ImportError:
     def _checkIsStringIO(obj):
         return isinstance(obj, StringIO)
 
-try:
-    import Image
-except ImportError:
-    print('Can not import Python Image Library.')
-    exit(1)
-
 # ROS specific imports
 try:
     import sensor_msgs.msg
@@ -64,6 +58,29 @@ from zope.interface import implements
 from rce.util.converters.interfaces import ICustomROSConverter
 
 
+# Python Image Library is loaded on first use as it is expensive to import
+_Image = None
+
+
+def _getImage():
+    """ Internally used function to get the module 'Image' of the Python
+        Image Library, which is imported on the first call.
+
+        @raise:             ValueError, if the library can not be imported.
+    """
+    global _Image
+
+    if not _Image:
+        try:
+            import Image
+        except ImportError:
+            raise ValueError('Can not import Python Image Library.')
+
+        _Image = Image
+
+    return _Image
+
+
 class ImageConverter(object):
     """ Convert images from PNG file format to ROS sensor message format and
         back.
@@ -86,6 +103,8 @@ class ImageConverter(object):
         if not _checkIsStringIO(imgObj):
             raise TypeError('Given object is not a StringIO instance.')
 
+        Image = _getImage()
+
         # Checking of image according to django.forms.fields.ImageField
         try:
             imgObj.seek(0)
@@ -118,6 +137,8 @@ class ImageConverter(object):
             raise TypeError('Given object is not a sensor_msgs.msg.Image '
                             'instance.')
 
+        Image = _getImage()
+
         # Convert to PIL Image
         pil = Image.fromstring(
                 ImageConverter._ENCODINGMAP_ROS_TO_PY[rosMsg.encoding],
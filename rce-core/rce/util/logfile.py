@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     rce-core/rce/util/logfile.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+
+# Python specific imports
+import os
+import gzip
+import shutil
+from collections import deque
+
+# twisted specific imports
+from twisted.python import log
+from twisted.internet.defer import succeed
+from twisted.internet.task import LoopingCall
+from twisted.internet.threads import deferToThreadPool
+
+
+def _compress(path):
+    """ Compress the file using gzip and remove the uncompressed file.
+
+        @return:            Path of the compressed file.
+        @rtype:             str
+    """
+    gzPath = '{0}.gz'.format(path)
+
+    with open(path, 'rb') as src:
+        dst = gzip.open(gzPath, 'wb')
+
+        try:
+            shutil.copyfileobj(src, dst)
+        finally:
+            dst.close()
+
+    os.remove(path)
+    return gzPath
+
+
+class BufferedLogFile(object):
+    """ File-like sink for the output of a process. Writes are buffered and
+        flushed periodically or when the buffer is full, the file is rotated
+        when it reaches its maximal size and the rotated files are compressed
+        in a separate thread. Additionally, the last lines are kept in memory
+        such that they can be retrieved without reading the file and complete
+        lines are passed on to registered listeners as they arrive.
+    """
+    # CONFIG
+    BUFFER_SIZE = 64 * 1024  # Buffered bytes after which the data is written
+    FLUSH_INTERVAL = 2  # Interval in seconds between two flushes
+    MAX_SIZE = 10 * 1024 * 1024  # Size in bytes after which file is rotated
+    BACKUPS = 5  # Number of compressed rotated files which are kept
+    TAIL_SIZE = 500  # Number of lines which are kept in memory
+    MAX_LINE = 4096  # Characters after which an incomplete line is split
+
+    def __init__(self, reactor, path):
+        """ Initialize the log file.
+
+            @param reactor:     Reference to the twisted reactor.
+            @type  reactor:     twisted::reactor
+
+            @param path:        Path of the log file. The rotated files are
+                                stored as 'path.N.gz' where N is 1 for the
+                                newest file.
+            @type  path:        str
+        """
+        self._reactor = reactor
+        self._path = path
+
+        self._file = open(path, 'a')
+        self._size = os.path.getsize(path)
+
+        self._buffer = []
+        self._buffered = 0
+
+        self._tail = deque(maxlen=self.TAIL_SIZE)
+        self._partial = ''
+        self._listeners = set()
+
+        self._rotation = succeed(None)
+        self._rotations = 0
+
+        self._call = LoopingCall(self.flush)
+        self._call.clock = reactor
+        self._call.start(self.FLUSH_INTERVAL, now=False)
+
+    @property
+    def path(self):
+        """ Path of the log file. """
+        return self._path
+
+    def write(self, data):
+        """ Write data to the log file.
+
+            @param data:        Data which should be written.
+            @type  data:        str
+        """
+        if self._file is None:
+            return
+
+        self._buffer.append(data)
+        self._buffered += len(data)
+
+        lines = (self._partial + data).split('\n')
+        self._partial = lines.pop()
+
+        if len(self._partial) > self.MAX_LINE:
+            lines.append(self._partial)
+            self._partial = ''
+
+        self._tail.extend(lines)
+
+        if lines:
+            for cb in self._listeners.copy():
+                cb(lines)
+
+        if self._buffered >= self.BUFFER_SIZE:
+            self.flush()
+
+    def addListener(self, cb):
+        """ Register a callback which is called with the list of new complete
+            lines whenever data is written and with None when the log file is
+            closed.
+
+            @param cb:          Callback which should be registered.
+            @type  cb:          callable
+        """
+        if self._file is None:
+            cb(None)
+        else:
+            self._listeners.add(cb)
+
+    def removeListener(self, cb):
+        """ Unregister a callback.
+
+            @param cb:          Callback which should be unregistered.
+            @type  cb:          callable
+        """
+        self._listeners.discard(cb)
+
+    def tail(self, n=None):
+        """ Get the last lines which have been written to the log file.
+
+            @param n:           Number of lines which should be returned. If
+                                omitted all lines kept in memory are returned.
+            @type  n:           int
+
+            @return:            Last lines of the log file, where the last
+                                line might be incomplete.
+            @rtype:             [str]
+        """
+        lines = list(self._tail)
+
+        if self._partial:
+            lines.append(self._partial)
+
+        if n is not None:
+            lines = lines[-n:] if n > 0 else []
+
+        return lines
+
+    def flush(self):
+        """ Write the buffered data to the file and rotate the file if it
+            reached its maximal size.
+        """
+        if not self._buffer or self._file is None:
+            return
+
+        data = ''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+        if self._size >= self.MAX_SIZE:
+            self._rotate()
+
+    def _rotate(self):
+        """ Internally used method to start a new log file. The old file is
+            renamed and compressed in a separate thread.
+        """
+        self._file.close()
+
+        self._rotations += 1
+        rotated = '{0}.rotated-{1}'.format(self._path, self._rotations)
+        os.rename(self._path, rotated)
+
+        self._file = open(self._path, 'a')
+        self._size = 0
+
+        # Rotations are chained such that the order of the files is kept
+        pool = self._reactor.getThreadPool()
+        self._rotation.addCallback(lambda _: deferToThreadPool(self._reactor,
+                                                               pool, _compress,
+                                                               rotated))
+        self._rotation.addCallback(self._shift)
+        self._rotation.addErrback(log.err)
+
+    def _shift(self, gzPath):
+        """ Internally used method to move the newly compressed file into the
+            first position and shift all older files by one.
+        """
+        last = '{0}.{1}.gz'.format(self._path, self.BACKUPS)
+
+        if os.path.exists(last):
+            os.remove(last)
+
+        for i in xrange(self.BACKUPS - 1, 0, -1):
+            src = '{0}.{1}.gz'.format(self._path, i)
+
+            if os.path.exists(src):
+                os.rename(src, '{0}.{1}.gz'.format(self._path, i + 1))
+
+        os.rename(gzPath, '{0}.1.gz'.format(self._path))
+
+    def close(self):
+        """ Flush the buffered data and close the log file.
+        """
+        if self._file is None:
+            return
+
+        if self._call.running:
+            self._call.stop()
+
+        self.flush()
+        self._file.close()
+        self._file = None
+
+        for cb in self._listeners.copy():
+            cb(None)
+
+        self._listeners = set()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     rce-core/rce/util/profiler.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+# Python specific imports
+import sys
+from time import time, sleep
+from thread import get_ident
+from threading import Thread, enumerate as enumerateThreads
+
+# twisted specific imports
+from twisted.python.failure import Failure
+from twisted.internet.defer import Deferred, fail
+
+# rce specific imports
+from rce.util.error import InternalError
+
+
+class SamplingProfiler(object):
+    """ Statistical profiler which periodically samples the stacks of all
+        threads of the process. The profile is returned as collapsed stacks,
+        i.e. one line per distinct stack containing the frames from the
+        outermost to the innermost frame separated by ';' followed by the
+        number of samples, which can be used to create a flame graph.
+    """
+    # CONFIG
+    INTERVAL = 0.005  # Interval in seconds between two samples
+    MAX_DURATION = 300  # Maximum duration in seconds of a profile
+    MAX_SIZE = 500000  # Maximum size in bytes of a profile
+
+    def __init__(self, reactor):
+        """ Initialize the profiler.
+
+            @param reactor:     Reference to the twisted reactor.
+            @type  reactor:     twisted::reactor
+        """
+        self._reactor = reactor
+        self._running = False
+
+        # Cache for the names of the frames with the code object as key
+        self._names = {}
+
+    def profile(self, duration):
+        """ Profile the process.
+
+            @param duration:    Duration of the profile in seconds.
+            @type  duration:    float
+
+            @return:            Collapsed stacks. (type: str)
+            @rtype:             twisted.internet.defer.Deferred
+        """
+        if self._running:
+            return fail(InternalError('Profiler is already running.'))
+
+        if not 0 < duration <= self.MAX_DURATION:
+            return fail(InternalError('Duration of the profile has to be in '
+                                      '(0, {0}] seconds.'.format(
+                                          self.MAX_DURATION)))
+
+        self._running = True
+        d = Deferred()
+
+        def run():
+            try:
+                stacks = self._sample(duration)
+            except:
+                self._reactor.callFromThread(d.errback, Failure())
+            else:
+                self._reactor.callFromThread(d.callback, stacks)
+
+        def done(result):
+            self._running = False
+            return result
+
+        d.addBoth(done)
+        d.addCallback(self._collapse)
+
+        thread = Thread(target=run, name='SamplingProfiler')
+        thread.daemon = True
+        thread.start()
+
+        return d
+
+    def _name(self, code):
+        """ Internally used method to get the name of a frame.
+        """
+        name = self._names.get(code)
+
+        if name is None:
+            fileName = code.co_filename
+            pos = fileName.rfind('/rce/')
+
+            if pos >= 0:
+                fileName = fileName[pos + 1:]
+            else:
+                fileName = fileName.rsplit('/', 1)[-1]
+
+            name = self._names[code] = '{0}:{1}'.format(fileName, code.co_name)
+
+        return name
+
+    def _sample(self, duration):
+        """ Internally used method to sample the stacks; runs in a separate
+            thread.
+
+            @return:            Dictionary with the stacks as key and the
+                                number of samples as value.
+            @rtype:             { (str) : int }
+        """
+        ident = get_ident()
+        threads = {}
+        stacks = {}
+        end = time() + duration
+
+        while time() < end:
+            for threadID, frame in sys._current_frames().iteritems():
+                if threadID == ident:
+                    continue
+
+                stack = []
+
+                while frame is not None:
+                    stack.append(self._name(frame.f_code))
+                    frame = frame.f_back
+
+                # The name of the thread is used as the outermost frame
+                if threadID not in threads:
+                    threads.update((thread.ident, thread.name)
+                                   for thread in enumerateThreads())
+                    threads.setdefault(threadID, str(threadID))
+
+                stack.append(threads[threadID])
+                stack.reverse()
+
+                stack = tuple(stack)
+                stacks[stack] = stacks.get(stack, 0) + 1
+
+            sleep(self.INTERVAL)
+
+        return stacks
+
+    def _collapse(self, stacks):
+        """ Internally used method to convert the sampled stacks into the
+            collapsed format; the stacks with the fewest samples are omitted
+            if the profile would exceed the maximum size.
+        """
+        lines = []
+        size = 0
+
+        for stack, count in sorted(stacks.iteritems(), key=lambda s: -s[1]):
+            line = '{0} {1}'.format(';'.join(stack), count)
+            size += len(line) + 1
+
+            if size > self.MAX_SIZE:
+                break
+
+            lines.append(line)
+
+        return '\n'.join(lines)
@@ -210,6 +210,18 @@ class _Settings(object):
         # Converters
         self._converters = None
 
+        # Preload
+        self._preload = None
+
+        # Trace
+        self._trace_rate = None
+        self._trace_file = None
+
+        # Metrics
+        self._metrics_master_port = None
+        self._metrics_robot_port = None
+        self._metrics_environment_port = None
+
         # Machine
         self._size = None
         self._cpu = None
@@ -332,6 +344,51 @@ class _Settings(object):
         """
         return self._converters
 
+    @property
+    def preload(self):
+        """ List of ROS message and service classes which are loaded before
+            the Robot and Environment processes accept connections. Each
+            element is a tuple containing the type of the class, i.e. 'msg' or
+            'srv', and the name of the class, i.e. 'std_msgs/Int32'.
+        """
+        return self._preload
+
+    @property
+    def trace_rate(self):
+        """ Probability with which a message received from a robot is traced
+            through the cloud engine; 0 disables the tracing.
+        """
+        return self._trace_rate
+
+    @property
+    def trace_file(self):
+        """ File to which the Robot process exports the recorded traces
+            when it is shut down.
+        """
+        return self._trace_file
+
+    @property
+    def metrics_master_port(self):
+        """ Port where the Master process serves its metrics over HTTP; 0
+            disables the metrics server.
+        """
+        return self._metrics_master_port
+
+    @property
+    def metrics_robot_port(self):
+        """ Port where the Robot processes serve their metrics over HTTP; 0
+            disables the metrics server.
+        """
+        return self._metrics_robot_port
+
+    @property
+    def metrics_environment_port(self):
+        """ Port where the Environment processes serve their metrics over
+            HTTP on the IP address of their container; 0 disables the metrics
+            server.
+        """
+        return self._metrics_environment_port
+
     @property
     def size(self):
         """ Maximum number of containers which can run in the machine. """
@@ -432,6 +489,39 @@ class _Settings(object):
         # Converters
         settings._converters = tuple(c for _, c in parser.items('converters'))
 
+        # Preload
+        settings._preload = []
+
+        for clsType in ('msg', 'srv'):
+            if parser.has_option('preload', clsType):
+                for clsName in parser.get('preload', clsType).split(','):
+                    clsName = clsName.strip()
+
+                    if clsName:
+                        settings._preload.append((clsType, clsName))
+
+        settings._preload = tuple(settings._preload)
+
+        # Trace
+        if parser.has_option('trace', 'rate'):
+            settings._trace_rate = parser.getfloat('trace', 'rate')
+        else:
+            settings._trace_rate = 0.0
+
+        if parser.has_option('trace', 'file'):
+            settings._trace_file = parser.get('trace', 'file')
+        else:
+            settings._trace_file = 'robot.trace'
+
+        # Metrics
+        for process in ('master', 'robot', 'environment'):
+            if parser.has_option('metrics', process + '_port'):
+                port = parser.getint('metrics', process + '_port')
+            else:
+                port = 0
+
+            setattr(settings, '_metrics_{0}_port'.format(process), port)
+
         # Machine
         settings._size = parser.getint('machine', 'size')
         settings._cpu = parser.getint('machine', 'cpu')
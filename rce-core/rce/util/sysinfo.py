@@ -1325,3 +1325,269 @@ class Process(object):
                 ip = socket.inet_ntop(socket.AF_INET6,
                                 struct.pack('<4I', *struct.unpack('<4I', ip)))
         return (ip, port)
+
+
+# Snapshot based sampling of processes
+
+nt_proc_sample = namedtuple('procsample', ' '.join([
+    'pid', 'status', 'cpu_percent', 'user', 'system', 'rss', 'vms',
+    'num_threads', 'num_fds', 'read_bytes', 'write_bytes']))
+
+_STAT_STATE = 0
+_STAT_UTIME = 11
+_STAT_STIME = 12
+_STAT_NUM_THREADS = 17
+_STAT_STARTTIME = 19
+
+
+def _read_fd(fd):
+    """Rewind the file descriptor and return the complete content of
+    the (proc) file.
+    """
+    os.lseek(fd, 0, os.SEEK_SET)
+    chunks = []
+    while True:
+        chunk = os.read(fd, 4096)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return ''.join(chunks)
+
+
+def get_children_map():
+    """Return a dictionary which maps the pid of every running process to
+    the list of pids of its children. Each /proc/<pid>/stat is read only
+    once, hence it is considerably cheaper than calling get_children()
+    on multiple processes.
+    """
+    ret = defaultdict(list)
+    for pid in get_pid_list():
+        try:
+            f = open("/proc/%s/stat" % pid)
+            try:
+                st = f.read()
+            finally:
+                f.close()
+        except EnvironmentError:
+            # process has gone in the meantime
+            continue
+        ret[int(st[st.rfind(')') + 2:].split(' ')[1])].append(pid)
+    return ret
+
+
+def get_descendants(pid, children_map):
+    """Return the pids of all descendants of the process with the given
+    pid using a dictionary as returned by get_children_map().
+    """
+    ret = []
+    checkpids = [pid]
+    for pid in checkpids:
+        for child in children_map.get(pid, ()):
+            if child not in ret:
+                ret.append(child)
+                checkpids.append(child)
+    return ret
+
+
+class _ProcessFiles(object):
+    """Open file descriptors of the /proc files of a single process."""
+
+    __slots__ = ["pid", "stat", "statm", "io", "create_time",
+                 "last_cpu", "last_io"]
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.stat = self.statm = self.io = None
+
+        try:
+            self.stat = os.open("/proc/%s/stat" % pid, os.O_RDONLY)
+            self.statm = os.open("/proc/%s/statm" % pid, os.O_RDONLY)
+        except EnvironmentError:
+            err = sys.exc_info()[1]
+            self.close()
+            if err.errno in (errno.ENOENT, errno.ESRCH):
+                raise NoSuchProcess(pid)
+            if err.errno in (errno.EPERM, errno.EACCES):
+                raise AccessDenied(pid)
+            raise
+
+        try:
+            self.io = os.open("/proc/%s/io" % pid, os.O_RDONLY)
+        except EnvironmentError:
+            # io counters are only accessible for processes of the same
+            # user or may not be available at all
+            pass
+
+        self.create_time = None
+        self.last_cpu = None
+        self.last_io = None
+
+    def close(self):
+        for fd in (self.stat, self.statm, self.io):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+        self.stat = self.statm = self.io = None
+
+
+class ProcessSampler(object):
+    """Sampler which takes snapshots of a set of processes.
+
+    In contrast to Process, which opens and parses the /proc files on
+    every call of a getter, the sampler keeps the /proc files of all
+    monitored processes open and reads all required values in a single
+    pass per snapshot. The CPU utilization is computed from the delta
+    to the previous snapshot, hence a call to sample() never blocks
+    and can be done periodically, e.g. from a LoopingCall.
+
+    An open file descriptor refers to the process for which it was
+    opened; once the process has terminated reading fails with ESRCH
+    even if the pid has been reused in the meantime.
+    """
+
+    def __init__(self, pids=()):
+        self._procs = {}
+        self._sys_fd = os.open('/proc/stat', os.O_RDONLY)
+        self._last_sys_cpu = None
+
+        for pid in pids:
+            self.add(pid)
+
+    @property
+    def pids(self):
+        """Set of pids which are currently monitored."""
+        return set(self._procs)
+
+    def add(self, pid):
+        """Start monitoring the process with the given pid.
+
+        Raises NoSuchProcess or AccessDenied if the /proc files of the
+        process can not be opened.
+        """
+        if not isinstance(pid, int):
+            raise TypeError('pid must be an integer')
+
+        if pid not in self._procs:
+            self._procs[pid] = _ProcessFiles(pid)
+
+    def remove(self, pid):
+        """Stop monitoring the process with the given pid."""
+        proc = self._procs.pop(pid, None)
+
+        if proc:
+            proc.close()
+
+    def close(self):
+        """Close all open file descriptors of the sampler."""
+        for proc in self._procs.itervalues():
+            proc.close()
+
+        self._procs = {}
+
+        if self._sys_fd is not None:
+            os.close(self._sys_fd)
+            self._sys_fd = None
+
+    def _sample_sys_cpu(self):
+        line = _read_fd(self._sys_fd).split('\n', 1)[0]
+        return sum(int(x) for x in line.split()[1:8])
+
+    def _sample_proc(self, proc, delta_sys):
+        st = _read_fd(proc.stat)
+        # ignore the first two values ("pid (exe)")
+        values = st[st.rfind(')') + 2:].split(' ')
+
+        create_time = int(values[_STAT_STARTTIME])
+
+        if proc.create_time is None:
+            proc.create_time = create_time
+        elif proc.create_time != create_time:
+            raise NoSuchProcess(proc.pid)
+
+        utime = int(values[_STAT_UTIME])
+        stime = int(values[_STAT_STIME])
+        cpu = utime + stime
+
+        if proc.last_cpu is None or not delta_sys:
+            cpu_percent = 0.0
+        else:
+            cpu_percent = round((cpu - proc.last_cpu) * 100.0 * NUM_CPUS /
+                                delta_sys, 1)
+
+        proc.last_cpu = cpu
+
+        vms, rss = _read_fd(proc.statm).split()[:2]
+
+        read_bytes = write_bytes = None
+
+        if proc.io is not None:
+            try:
+                for line in _read_fd(proc.io).splitlines():
+                    if line.startswith("read_bytes"):
+                        read_bytes = int(line.split()[1])
+                    elif line.startswith("write_bytes"):
+                        write_bytes = int(line.split()[1])
+            except EnvironmentError:
+                err = sys.exc_info()[1]
+                if err.errno not in (errno.EPERM, errno.EACCES):
+                    raise
+                os.close(proc.io)
+                proc.io = None
+
+        try:
+            num_fds = len(os.listdir("/proc/%s/fd" % proc.pid))
+        except EnvironmentError:
+            err = sys.exc_info()[1]
+            if err.errno not in (errno.EPERM, errno.EACCES):
+                raise
+            num_fds = None
+
+        return nt_proc_sample(proc.pid,
+                              _status_map.get(values[_STAT_STATE], '?'),
+                              cpu_percent,
+                              float(utime) / _CLOCK_TICKS,
+                              float(stime) / _CLOCK_TICKS,
+                              int(rss) * _PAGESIZE, int(vms) * _PAGESIZE,
+                              int(values[_STAT_NUM_THREADS]), num_fds,
+                              read_bytes, write_bytes)
+
+    def sample(self):
+        """Take a snapshot of all monitored processes.
+
+        Returns a tuple containing a dictionary which maps the pid to
+        a procsample named tuple and the set of pids of the processes
+        which are gone since the last snapshot. Processes which are gone
+        are no longer monitored. The CPU utilization of a process is
+        reported relative to a single CPU and is 0.0 for the first
+        snapshot of the process.
+        """
+        sys_cpu = self._sample_sys_cpu()
+
+        if self._last_sys_cpu is None:
+            delta_sys = 0
+        else:
+            delta_sys = sys_cpu - self._last_sys_cpu
+
+        self._last_sys_cpu = sys_cpu
+
+        samples = {}
+        gone = set()
+
+        for pid, proc in self._procs.iteritems():
+            try:
+                samples[pid] = self._sample_proc(proc, delta_sys)
+            except NoSuchProcess:
+                gone.add(pid)
+            except EnvironmentError:
+                err = sys.exc_info()[1]
+                if err.errno not in (errno.ENOENT, errno.ESRCH):
+                    raise
+                gone.add(pid)
+
+        for pid in gone:
+            self.remove(pid)
+
+        return samples, gone
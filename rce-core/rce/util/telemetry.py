@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     rce-core/rce/util/telemetry.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+
+# Python specific imports
+from collections import deque
+
+
+# Order of the values in a sample of the machine resources; all values are
+# integers: the time in seconds since the epoch, the CPU utilization in tenth
+# of a percent, the used and total memory in bytes, and the counters of the
+# bytes sent/received over the network and read/written from/to the disks
+FIELDS = ('time', 'cpu', 'memUsed', 'memTotal', 'netSent', 'netRecv',
+          'diskRead', 'diskWrite')
+
+# Fields which are monotonically increasing counters
+_COUNTERS = ('netSent', 'netRecv', 'diskRead', 'diskWrite')
+
+
+def encodeBatch(samples):
+    """ Delta encode a batch of samples, i.e. the first sample is stored as
+        is and each following sample as the difference to its predecessor.
+
+        @param samples:     Samples which should be encoded.
+        @type  samples:     [(int)]
+
+        @return:            Delta encoded batch.
+        @rtype:             [[int]]
+    """
+    batch = []
+    last = None
+
+    for sample in samples:
+        if last is None:
+            batch.append(list(sample))
+        else:
+            batch.append([v - l for v, l in zip(sample, last)])
+
+        last = sample
+
+    return batch
+
+
+def decodeBatch(batch):
+    """ Decode a batch of samples which was encoded using 'encodeBatch'.
+
+        @param batch:       Delta encoded batch.
+        @type  batch:       [[int]]
+
+        @return:            Decoded samples.
+        @rtype:             [(int)]
+    """
+    samples = []
+    last = None
+
+    for delta in batch:
+        if len(delta) != len(FIELDS):
+            raise ValueError('Sample has an invalid number of fields.')
+
+        if last is None:
+            last = tuple(delta)
+        else:
+            last = tuple(l + d for l, d in zip(last, delta))
+
+        samples.append(last)
+
+    return samples
+
+
+class SysinfoBuffer(object):
+    """ Fixed-size ring buffer which keeps the most recent samples of the
+        resources of a machine.
+    """
+    def __init__(self, size):
+        """ Initialize the buffer.
+
+            @param size:        Maximum number of samples kept in the buffer.
+            @type  size:        int
+        """
+        self._samples = deque(maxlen=size)
+
+    def add(self, batch):
+        """ Add a delta encoded batch of samples to the buffer.
+
+            @param batch:       Delta encoded batch.
+            @type  batch:       [[int]]
+
+            @raise:             ValueError, if the batch is not valid.
+        """
+        self._samples.extend(decodeBatch(batch))
+
+    def _toDict(self, prev, sample):
+        """ Internally used method to convert a sample to a dictionary. The
+            counters are converted to rates in bytes per second using the
+            previous sample.
+        """
+        data = dict(zip(FIELDS, sample))
+        data['cpu'] /= 10.0
+
+        if prev:
+            prev = dict(zip(FIELDS, prev))
+            dt = float(data['time'] - prev['time']) or 1.0
+
+            for field in _COUNTERS:
+                data[field] = max(0, data[field] - prev[field]) / dt
+        else:
+            for field in _COUNTERS:
+                data[field] = None
+
+        return data
+
+    @property
+    def latest(self):
+        """ Most recent sample as a dictionary with the keys given in FIELDS or
+            None if there is no sample. The network and disk values are given
+            in bytes per second.
+        """
+        if not self._samples:
+            return None
+
+        prev = self._samples[-2] if len(self._samples) > 1 else None
+        return self._toDict(prev, self._samples[-1])
+
+    def history(self, n=None):
+        """ Get the most recent samples.
+
+            @param n:           Maximum number of samples which should be
+                                returned. If None, all samples are returned.
+            @type  n:           int / None
+
+            @return:            Samples as dictionaries (see 'latest') in
+                                chronological order.
+            @rtype:             [dict]
+        """
+        samples = list(self._samples)
+
+        if n is not None:
+            samples = samples[-(n + 1):]
+
+        history = [self._toDict(prev, sample) for prev, sample
+                   in zip([None] + samples[:-1], samples)]
+
+        if n is not None:
+            history = history[-n:]
+
+        return history
+
+    def average(self, field, n=None):
+        """ Get the average value of a field over the most recent samples.
+
+            @param field:       Field for which the average should be
+                                computed; has to be in FIELDS.
+            @type  field:       str
+
+            @param n:           Number of samples which should be used. If
+                                None, all samples are used.
+            @type  n:           int / None
+
+            @return:            Average or None if there are no values.
+            @rtype:             float / None
+        """
+        values = [s[field] for s in self.history(n) if s[field] is not None]
+        return sum(values) / float(len(values)) if values else None
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     rce-core/rce/util/threadpool.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+
+# Python specific imports
+import time
+from threading import Lock
+
+# twisted specific imports
+from twisted.python.threadpool import ThreadPool
+
+
+class InstrumentedThreadPool(ThreadPool):
+    """ Thread pool which keeps statistics about the calls which it executes,
+        i.e. the number of queued and active calls and the time the calls spent
+        waiting in the queue and running in a thread.
+    """
+    def __init__(self, minthreads=5, maxthreads=20, name=None):
+        """ Initialize the thread pool.
+
+            @param minthreads:  Minimum number of threads in the pool.
+            @type  minthreads:  int
+
+            @param maxthreads:  Maximum number of threads in the pool.
+            @type  maxthreads:  int
+
+            @param name:        Name of the thread pool.
+            @type  name:        str
+        """
+        ThreadPool.__init__(self, minthreads, maxthreads, name)
+
+        self._statsLock = Lock()
+        self._queued = 0
+        self._active = 0
+        self._calls = 0
+        self._failures = 0
+        self._waitTime = 0.0
+        self._maxWaitTime = 0.0
+        self._runTime = 0.0
+        self._maxRunTime = 0.0
+
+    def callInThreadWithCallback(self, onResult, func, *args, **kw):
+        submitted = time.time()
+
+        with self._statsLock:
+            self._queued += 1
+
+        def instrumented():
+            started = time.time()
+            wait = started - submitted
+
+            with self._statsLock:
+                self._queued -= 1
+                self._active += 1
+                self._waitTime += wait
+                self._maxWaitTime = max(self._maxWaitTime, wait)
+
+            failed = True
+
+            try:
+                result = func(*args, **kw)
+                failed = False
+                return result
+            finally:
+                run = time.time() - started
+
+                with self._statsLock:
+                    self._active -= 1
+                    self._calls += 1
+                    self._failures += failed
+                    self._runTime += run
+                    self._maxRunTime = max(self._maxRunTime, run)
+
+        ThreadPool.callInThreadWithCallback(self, onResult, instrumented)
+
+    callInThreadWithCallback.__doc__ = \
+        ThreadPool.callInThreadWithCallback.__doc__
+
+    @property
+    def stats(self):
+        """ Statistics of the thread pool as a dictionary with the number of
+            queued, active, finished and failed calls as well as the average
+            and maximum time in seconds the calls spent waiting and running.
+        """
+        with self._statsLock:
+            calls = self._calls or 1
+
+            return {'threads':len(self.threads),
+                    'queued':self._queued,
+                    'active':self._active,
+                    'calls':self._calls,
+                    'failures':self._failures,
+                    'avgWaitTime':self._waitTime / calls,
+                    'maxWaitTime':self._maxWaitTime,
+                    'avgRunTime':self._runTime / calls,
+                    'maxRunTime':self._maxRunTime}
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     rce-core/rce/util/watchdog.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+# Python specific imports
+import sys
+from time import time, sleep
+from thread import get_ident
+from threading import Thread, Event
+from traceback import extract_stack, format_list
+
+# twisted specific imports
+from twisted.python import log
+from twisted.internet.task import LoopingCall
+
+# rce specific imports
+from rce.util.metrics import registry
+
+
+class ReactorWatchdog(object):
+    """ Watchdog which measures the scheduling lag of the reactor and detects
+        callbacks which block the reactor.
+
+        The reactor periodically updates a heartbeat. A separate thread checks
+        the heartbeat and, as long as it is older than the threshold, samples
+        the stack of the reactor thread. The samples are aggregated by the
+        call site, i.e. the innermost frame of the cloud engine code in the
+        stack; the stack of a call site is logged the first time the call site
+        blocks the reactor and the aggregated counts are logged periodically.
+    """
+    # CONFIG
+    INTERVAL = 0.05  # Interval in seconds of the heartbeat and the samples
+    THRESHOLD = 0.2  # Time in seconds after which the reactor is blocked
+    REPORT_INTERVAL = 300  # Interval in seconds between two reports
+    REPORT_SIZE = 10  # Number of call sites in a report
+    DEPTH = 30  # Maximum number of frames in a stack sample
+
+    def __init__(self, reactor, threshold=THRESHOLD):
+        """ Initialize the watchdog.
+
+            @param reactor:     Reference to the twisted reactor.
+            @type  reactor:     twisted::reactor
+
+            @param threshold:   Time in seconds without heartbeat after which
+                                the reactor is considered to be blocked.
+            @type  threshold:   float
+        """
+        self._reactor = reactor
+        self._threshold = threshold
+
+        self._ident = None
+        self._last = None
+        self._blocked = None
+        self._stopped = Event()
+
+        # Dictionary with the call site as key and a list containing the
+        # number of blocks, the sampled time in seconds and the stack of the
+        # first sample as value
+        self._sites = {}
+        self._reported = 0
+
+        self._lag = registry.gauge('rce_reactor_lag_seconds',
+                                   'Lag of the last heartbeat of the reactor.')
+        self._hist = registry.histogram('rce_reactor_lag_distribution_seconds',
+                                        'Distribution of the lag of the '
+                                        'heartbeats of the reactor.')
+        self._slow = registry.counter('rce_reactor_blocked_total',
+                                      'Number of times the reactor has been '
+                                      'blocked longer than the threshold.')
+
+        self._heartbeat = LoopingCall(self._beat)
+        self._report = LoopingCall(self.report)
+
+    def start(self):
+        """ Start the watchdog; has to be called from the reactor thread.
+        """
+        self._ident = get_ident()
+        self._last = None
+        self._stopped.clear()
+
+        self._heartbeat.start(self.INTERVAL)
+        self._report.start(self.REPORT_INTERVAL, now=False)
+
+        thread = Thread(target=self._watch, name='ReactorWatchdog')
+        thread.daemon = True
+        thread.start()
+
+        self._reactor.addSystemEventTrigger('before', 'shutdown', self.stop)
+
+    def stop(self):
+        """ Stop the watchdog.
+        """
+        self._stopped.set()
+
+        if self._heartbeat.running:
+            self._heartbeat.stop()
+
+        if self._report.running:
+            self._report.stop()
+
+    def _beat(self):
+        """ Internally used method to update the heartbeat; runs in the reactor
+            thread.
+        """
+        now = time()
+
+        if self._last is not None:
+            lag = max(now - self._last - self.INTERVAL, 0.0)
+            self._lag.set(lag)
+            self._hist.observe(lag)
+
+        self._last = now
+
+    def _watch(self):
+        """ Internally used method which checks the heartbeat; runs in a
+            separate thread.
+        """
+        while not self._stopped.is_set():
+            sleep(self.INTERVAL)
+
+            last = self._last
+
+            if last is None or time() - last < self._threshold + self.INTERVAL:
+                self._blocked = None
+                continue
+
+            frame = sys._current_frames().get(self._ident)
+
+            if frame is None:
+                continue
+
+            stack = extract_stack(frame, self.DEPTH)
+            del frame
+
+            site = self._site(stack)
+            stats = self._sites.get(site)
+
+            if stats is None:
+                stats = self._sites[site] = [0, 0.0, stack]
+
+            if self._blocked != last:
+                # New block of the reactor
+                self._blocked = last
+                self._slow.inc()
+                stats[0] += 1
+
+                if stats[0] == 1:
+                    log.msg('Reactor is blocked by {0}:\n{1}'.format(
+                                _formatSite(site), ''.join(format_list(stack))))
+
+            stats[1] += self.INTERVAL
+
+    @staticmethod
+    def _site(stack):
+        """ Internally used method to get the call site of a stack sample,
+            i.e. the innermost frame of the cloud engine code or the innermost
+            frame if the stack contains no frame of the cloud engine code.
+
+            @return:            Tuple containing the file name, the line
+                                number and the function name.
+            @rtype:             (str, int, str)
+        """
+        for fileName, lineNr, func, _ in reversed(stack):
+            if '/rce/' in fileName and not fileName.endswith('watchdog.py'):
+                return fileName, lineNr, func
+
+        fileName, lineNr, func, _ = stack[-1]
+        return fileName, lineNr, func
+
+    @property
+    def sites(self):
+        """ Call sites which blocked the reactor as a list of tuples
+            containing the call site, the number of blocks and the sampled
+            blocked time in seconds, sorted by the sampled time.
+        """
+        sites = [(site, stats[0], stats[1])
+                 for site, stats in self._sites.items()]
+        sites.sort(key=lambda site: -site[2])
+        return sites
+
+    def report(self):
+        """ Log the call sites which blocked the reactor the longest if the
+            reactor has been blocked since the last report.
+        """
+        sites = self.sites
+        blocks = sum(count for _, count, _ in sites)
+
+        if blocks == self._reported:
+            return
+
+        self._reported = blocks
+
+        lines = ['{0:>6d} | {1:>10.2f} | {2}'.format(count, duration,
+                                                      _formatSite(site))
+                 for site, count, duration in sites[:self.REPORT_SIZE]]
+        log.msg('Call sites which blocked the reactor:\n'
+                '{0:>6} | {1:>10} | call site\n{2}'.format('blocks',
+                                                            'time [s]',
+                                                            '\n'.join(lines)))
+
+
+def _formatSite(site):
+    return '{2}() in {0}:{1}'.format(*site)
@@ -67,6 +67,7 @@
 # Python specific imports
 import os
 import sys
+import cPickle as pickle
 
 # ROS specific imports
 try:
@@ -77,6 +78,11 @@ except ImportError:
     print('Make sure they are installed and the ROS Environment is setup.')
     exit(1)
 
+
+# Default location of the persisted resource index
+INDEX_FILE = os.path.join(os.path.expanduser('~'), '.rce', 'loader.idx')
+
+
 class ResourceNotFound(Exception):
     """ Exception is raised by the Loader when a resource can not be found.
     """
@@ -86,15 +92,29 @@ class Loader(object):
     """ The Loader should be used to dynamically find and load message and
         service classes. Additionally, the Loader can be used to locate
         nodes/executables in packages.
-        To increase the speed the Loader has a cache for the classes and the
-        paths to the nodes.
+        To increase the speed the Loader has a cache for the classes and an
+        index, which is persisted to disk, for the package paths, the Python
+        paths and the paths to the nodes. The index is keyed by the ROS path
+        and every entry is invalidated when the manifest of the package or of
+        one of its dependencies is modified.
+        Furthermore, the Loader counts how often the classes are requested and
+        persists the most used classes together with the index such that they
+        can be preloaded the next time the process is started.
     """
-    def __init__(self, rosPath=None):
+    # CONFIG
+    USAGE_SIZE = 50  # Maximum number of classes persisted as most used
+
+    def __init__(self, rosPath=None, indexFile=INDEX_FILE):
         """ Initialize the Loader.
 
             @param rosPath:     Ordered list of paths to search for resources.
                                 If None (default), use environment ROS path.
             @type  rosPath:     [str] / None
+
+            @param indexFile:   Path to the file where the index of the
+                                packages should be persisted. If None, the
+                                index is only kept in memory.
+            @type  indexFile:   str / None
         """
         self._rp = rospkg.RosPack(rosPath)
 
@@ -105,6 +125,30 @@ class Loader(object):
         # Value:  msg/srv module
         self._moduleCache = {}
 
+        # Key:    package name
+        # Value:  dict with the keys
+        #             'path'        path to the package
+        #             'python'      Python paths of package and dependencies
+        #             'depends'     packages which are covered by 'python'
+        #             'manifests'   list of tuples (manifest file, mtime)
+        #             'nodes'       dict mapping executable names to paths
+        self._indexFile = indexFile
+        self._indexKey = os.pathsep.join(self._rp.get_ros_paths())
+
+        stored = self._readIndex().get(self._indexKey)
+
+        if not isinstance(stored, dict):
+            stored = {}
+
+        self._index = stored.get('packages', {})
+
+        # Key:    tuple (package name, clsType, cls)
+        # Value:  number of requests of the class
+        self._usage = stored.get('usage', {})
+
+        # Set of all packages whose index entry has already been validated
+        self._validated = set()
+
     def _getDepends(self, pkg):
         """ roslib.launcher
 
@@ -144,41 +188,155 @@ class Loader(object):
             dirs = [os.path.join(pkgDir, d) for d in ['src', 'lib']]
             paths.extend(d for d in dirs if os.path.isdir(d))
 
-    def _generatePythonPath(self, pkg):
-        """ roslib.launcher
+    def _readIndex(self):
+        """ Internally used method to read the persisted index.
 
-            Recursive subroutine for building dependency list and Python path.
+            @return:        Persisted index for all ROS paths.
+            @rtype:         dict
+        """
+        if not self._indexFile:
+            return {}
 
-            @param pkg:     Name of package for which Python paths should be
-                            generated.
-            @type  pkg:     str
+        if not os.path.exists(self._indexFile):
+            return {}
+
+        # Unpickling a damaged file can raise nearly any exception; the index
+        # is only a cache and is rebuilt in this case
+        try:
+            with open(self._indexFile, 'rb') as f:
+                index = pickle.load(f)
+        except Exception as e:
+            print('Can not read the index file {0}, it is rebuilt: '
+                  '{1}'.format(self._indexFile, e))
+            return {}
+
+        return index if isinstance(index, dict) else {}
+
+    def _writeIndex(self):
+        """ Internally used method to persist the index. Indices of other ROS
+            paths in the same file are preserved and the file is replaced
+            atomically; failures are ignored as the index is only a cache.
         """
-        if pkg in self._packages:
-            return []
+        if not self._indexFile:
+            return
 
-        # short-circuit if this is a catkin-ized package
-        m = self._rp.get_manifest(pkg)
+        usage = sorted(self._usage.iteritems(), key=lambda item: item[1],
+                       reverse=True)[:self.USAGE_SIZE]
 
-        if m.is_catkin:
-            self._packages.add(pkg)
-            return []
+        index = self._readIndex()
+        index[self._indexKey] = {'packages':self._index, 'usage':dict(usage)}
 
-        packages = self._getDepends(pkg)
-        packages.append(pkg)
+        tmp = '{0}.{1}'.format(self._indexFile, os.getpid())
 
-        paths = []
+        try:
+            dirname = os.path.dirname(self._indexFile)
+
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+
+            with open(tmp, 'wb') as f:
+                pickle.dump(index, f, pickle.HIGHEST_PROTOCOL)
+
+            os.rename(tmp, self._indexFile)
+        except (IOError, OSError):
+            pass
+
+    def _getManifestFile(self, pkgDir):
+        """ Internally used method to get the manifest file of a package.
+
+            @param pkgDir:      Package's filesystem directory path
+            @type  pkgDir:      str
+
+            @return:            Path to the manifest file of the package.
+            @rtype:             str
+        """
+        path = os.path.join(pkgDir, rospkg.MANIFEST_FILE)
+
+        if os.path.isfile(path):
+            return path
+
+        return os.path.join(pkgDir, rospkg.PACKAGE_FILE)
+
+    def _isValid(self, entry):
+        """ Internally used method to check if an index entry is still valid.
+
+            @param entry:   Index entry which should be checked.
+            @type  entry:   dict
 
+            @return:        True if none of the manifests has been modified.
+            @rtype:         bool
+        """
         try:
+            return all(os.path.getmtime(f) == mtime
+                       for f, mtime in entry['manifests'])
+        except OSError:
+            return False
+
+    def _createEntry(self, pkg):
+        """ roslib.launcher
+
+            Build the index entry for a package, i.e. resolve the path, the
+            dependency list and the Python path of the package.
+
+            @param pkg:     Name of package for which the entry should be
+                            created.
+            @type  pkg:     str
+
+            @return:        Index entry for the package.
+            @rtype:         dict
+        """
+        pkgDir = self._rp.get_path(pkg)
+        paths = []
+
+        # short-circuit if this is a catkin-ized package
+        if self._rp.get_manifest(pkg).is_catkin:
+            packages = [pkg]
+        else:
+            packages = self._getDepends(pkg)
+            packages.append(pkg)
+
             for p in packages:
                 m = self._rp.get_manifest(p)
                 d = self._rp.get_path(p)
                 self._appendPackagePaths(m, paths, d)
-                self._packages.add(p)
-        except:
-            self._packages.discard(pkg)
-            raise
 
-        return paths
+        manifests = []
+
+        for p in packages:
+            f = self._getManifestFile(self._rp.get_path(p))
+            manifests.append((f, os.path.getmtime(f)))
+
+        return {'path':pkgDir, 'python':paths, 'depends':packages,
+                'manifests':manifests, 'nodes':{}}
+
+    def _getEntry(self, pkg):
+        """ Internally used method to get the index entry of a package. If
+            there is no valid entry in the index the package is resolved
+            using rospkg and the index is updated.
+
+            @param pkg:     Name of the package.
+            @type  pkg:     str
+
+            @return:        Index entry for the package.
+            @rtype:         dict
+
+            @raise:         rospkg.ResourceNotFound
+        """
+        entry = self._index.get(pkg)
+
+        if entry and (pkg in self._validated or self._isValid(entry)):
+            self._validated.add(pkg)
+            return entry
+
+        try:
+            entry = self._createEntry(pkg)
+        except OSError:
+            raise rospkg.ResourceNotFound(pkg)
+
+        self._index[pkg] = entry
+        self._validated.add(pkg)
+        self._writeIndex()
+        return entry
 
     def _loadManifest(self, pkg):
         """ roslib.launcher
@@ -192,7 +350,9 @@ class Loader(object):
         if pkg in self._packages:
             return
 
-        sys.path = self._generatePythonPath(pkg) + sys.path
+        entry = self._getEntry(pkg)
+        sys.path = entry['python'] + sys.path
+        self._packages.update(entry['depends'])
 
     def _checkPermission(self, module):
         """ Internally used method to check if there might me a candidate for
@@ -270,6 +430,7 @@ class Loader(object):
                 raise ValueError('The class "{0}" is not valid.'.format(cls))
 
         key = (pkg, 'msg', cls)
+        self._usage[key] = self._usage.get(key, 0) + 1
 
         try:
             module = self._moduleCache[key]
@@ -313,6 +474,7 @@ class Loader(object):
                 raise ValueError('The class "{0}" is not valid.'.format(cls))
 
         key = (pkg, 'srv', cls)
+        self._usage[key] = self._usage.get(key, 0) + 1
 
         try:
             module = self._moduleCache[key]
@@ -326,6 +488,68 @@ class Loader(object):
             raise ResourceNotFound('ROS package "{0}" does not have '
                                    'service class "{1}"'.format(pkg, cls))
 
+    def getMostUsed(self):
+        """ Get the classes which were requested most often in this and the
+            previous runs of the Loader.
+
+            @return:        List of tuples containing the type of the class,
+                            i.e. 'msg' or 'srv', and the name of the class,
+                            i.e. 'std_msgs/Int32', in descending order of
+                            usage.
+            @rtype:         [(str, str)]
+        """
+        usage = sorted(self._usage.iteritems(), key=lambda item: item[1],
+                       reverse=True)[:self.USAGE_SIZE]
+        return [(clsType, '{0}/{1}'.format(pkg, cls))
+                for (pkg, clsType, cls), _ in usage]
+
+    def preload(self, classes):
+        """ Load the given classes such that the first request of one of the
+            classes is served from the cache. Classes which can not be loaded
+            are skipped.
+
+            @param classes: List of tuples containing the type of the class,
+                            i.e. 'msg' or 'srv', and the name of the class,
+                            i.e. 'std_msgs/Int32'.
+            @type  classes: [(str, str)]
+
+            @return:        List of the loaded message and service classes.
+            @rtype:         list
+        """
+        load = {'msg':self.loadMsg, 'srv':self.loadSrv}
+        loaded = []
+
+        for clsType, clsName in classes:
+            args = clsName.split('/')
+
+            if clsType not in load or len(args) != 2:
+                continue
+
+            # Preloading should not count as usage of the class
+            key = (args[0], clsType, args[1])
+            count = self._usage.get(key)
+
+            try:
+                cls = load[clsType](*args)
+            except (ValueError, ResourceNotFound):
+                continue
+            finally:
+                if count:
+                    self._usage[key] = count
+                else:
+                    self._usage.pop(key, None)
+
+            if cls not in loaded:
+                loaded.append(cls)
+
+        return loaded
+
+    def persist(self):
+        """ Write the index and the usage of the classes to disk. Should be
+            called before the process is terminated.
+        """
+        self._writeIndex()
+
     def findPkgPath(self, pkg):
         """ Find the path to the given package.
 
@@ -339,7 +563,7 @@ class Loader(object):
             @raise:         rce.util.loader.ResourceNotFound
         """
         try:
-            return self._rp.get_path(pkg)
+            return self._getEntry(pkg)['path']
         except rospkg.ResourceNotFound:
             raise ResourceNotFound('Can not find ROS package '
                                    '"{0}".'.format(pkg))
@@ -360,10 +584,25 @@ class Loader(object):
             @raise:         rce.util.loader.ResourceNotFound
         """
         try:
-            return roslib.packages.find_node(pkg, exe, rospack=self._rp)[0]
+            nodes = self._getEntry(pkg)['nodes']
+        except rospkg.ResourceNotFound:
+            raise ResourceNotFound('Can not find ROS package '
+                                   '"{0}".'.format(pkg))
+
+        path = nodes.get(exe)
+
+        if path and os.access(path, os.X_OK):
+            return path
+
+        try:
+            path = roslib.packages.find_node(pkg, exe, rospack=self._rp)[0]
         except rospkg.ResourceNotFound:
             raise ResourceNotFound('Can not find ROS package '
                                    '"{0}".'.format(pkg))
         except IndexError:
             raise ResourceNotFound('Can not find executable "{0}" in '
                                    'ROS package "{1}".'.format(exe, pkg))
+
+        nodes[exe] = path
+        self._writeIndex()
+        return path
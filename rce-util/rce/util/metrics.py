@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     rce-util/rce/util/metrics.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+
+# Python specific imports
+from bisect import bisect_left
+from threading import Lock
+from thread import get_ident
+
+# twisted specific imports
+from twisted.web.resource import Resource
+
+
+# The metrics are updated without locks: each thread only modifies its own
+# shard, which is created the first time the thread updates the metric, and
+# the shards are only combined when the metric is read. Reading a metric
+# while it is updated might therefore return a slightly outdated value.
+
+class Counter(object):
+    """ Monotonically increasing counter, e.g. of the number of messages.
+    """
+    def __init__(self):
+        """ Initialize the counter.
+        """
+        self._shards = {}
+
+    def inc(self, amount=1):
+        """ Increase the counter.
+
+            @param amount:      Non-negative amount by which the counter is
+                                increased.
+            @type  amount:      int / float
+        """
+        ident = get_ident()
+        self._shards[ident] = self._shards.get(ident, 0) + amount
+
+    @property
+    def value(self):
+        """ Current value of the counter. """
+        return sum(self._shards.values())
+
+
+class Gauge(object):
+    """ Value which can go up and down, e.g. the number of connections.
+    """
+    def __init__(self, func=None):
+        """ Initialize the gauge.
+
+            @param func:        Optional callable without arguments which is
+                                used to get the value when the gauge is read
+                                instead of the value which has been set.
+            @type  func:        callable
+        """
+        self._func = func
+        self._value = 0
+
+    def set(self, value):
+        """ Set the value of the gauge.
+
+            @param value:       New value.
+            @type  value:       int / float
+        """
+        self._value = value
+
+    @property
+    def value(self):
+        """ Current value of the gauge. """
+        if self._func:
+            return self._func()
+
+        return self._value
+
+
+class Histogram(object):
+    """ Histogram with fixed buckets which is used to keep track of the
+        distribution of measured values, e.g. latencies.
+    """
+    # Default upper bounds of the buckets in seconds
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+               2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, buckets=BUCKETS):
+        """ Initialize the histogram.
+
+            @param buckets:     Sorted upper bounds of the buckets. Values
+                                larger than the last bound are counted in an
+                                additional overflow bucket.
+            @type  buckets:     (float)
+        """
+        self._bounds = tuple(buckets)
+
+        # Each shard contains the counts of the buckets followed by the sum
+        # of the values
+        self._shards = {}
+
+    def observe(self, value):
+        """ Add a value to the histogram.
+
+            @param value:       Measured value.
+            @type  value:       float
+        """
+        ident = get_ident()
+        shard = self._shards.get(ident)
+
+        if shard is None:
+            shard = self._shards[ident] = [0] * (len(self._bounds) + 1) + [0.0]
+
+        shard[bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+
+    def _combine(self):
+        """ Internally used method to combine the shards.
+
+            @return:            Counts of the buckets and sum of the values.
+            @rtype:             ([int], float)
+        """
+        shards = self._shards.values()
+
+        if not shards:
+            return [0] * (len(self._bounds) + 1), 0.0
+
+        combined = [sum(values) for values in zip(*shards)]
+        return combined[:-1], combined[-1]
+
+    def percentile(self, q):
+        """ Get an estimate of a percentile of the values in the histogram,
+            i.e. the upper bound of the bucket in which the percentile lies.
+
+            @param q:           Percentile in the range [0, 100].
+            @type  q:           float
+
+            @return:            Estimate of the percentile or None if there are
+                                no values or the percentile lies in the
+                                overflow bucket.
+            @rtype:             float / None
+        """
+        counts, _ = self._combine()
+        total = sum(counts)
+
+        if not total:
+            return None
+
+        rank = q / 100.0 * total
+        acc = 0
+
+        for bound, count in zip(self._bounds, counts):
+            acc += count
+
+            if acc >= rank:
+                return bound
+
+        return None
+
+    @property
+    def snapshot(self):
+        """ Current state of the histogram as a dictionary containing the
+            number of values, the sum of the values and the list of buckets
+            as tuples (upper bound, number of values), where the upper bound
+            of the overflow bucket is None.
+        """
+        counts, total = self._combine()
+        return {'count':sum(counts),
+                'sum':total,
+                'buckets':zip(self._bounds + (None,), counts)}
+
+
+class Registry(object):
+    """ Registry of the metrics of a process which can be rendered in the
+        text format used by Prometheus.
+
+        Metrics are identified by their name and their labels; metrics with
+        the same name have to be of the same type.
+    """
+    def __init__(self):
+        """ Initialize the registry.
+        """
+        # The lock is only used when metrics are added or removed
+        self._lock = Lock()
+
+        # Dictionary with the name as key and a tuple (type, help, metrics) as
+        # value, where metrics is a dictionary with the sorted labels as key
+        # and the metric as value
+        self._families = {}
+
+    def _get(self, name, kind, doc, labels, factory):
+        """ Internally used method to get a metric or add it if it does not
+            exist yet.
+        """
+        key = tuple(sorted(labels.iteritems()))
+
+        try:
+            return self._families[name][2][key]
+        except KeyError:
+            pass
+
+        with self._lock:
+            family = self._families.setdefault(name, (kind, doc, {}))
+
+            if family[0] != kind:
+                raise ValueError("Metric '{0}' is already registered as a "
+                                 '{1}.'.format(name, family[0]))
+
+            metrics = family[2]
+
+            if key not in metrics:
+                metrics[key] = factory()
+
+            return metrics[key]
+
+    def counter(self, name, doc, **labels):
+        """ Get the counter with the given name and labels.
+
+            @param name:        Name of the metric, e.g.
+                                'rce_messages_total'.
+            @type  name:        str
+
+            @param doc:         Description of the metric.
+            @type  doc:         str
+
+            @param labels:      Labels of the metric.
+
+            @rtype:             rce.util.metrics.Counter
+        """
+        return self._get(name, 'counter', doc, labels, Counter)
+
+    def gauge(self, name, doc, func=None, **labels):
+        """ Get the gauge with the given name and labels.
+
+            @param func:        Optional callable which is used to get the
+                                value of the gauge when the gauge is created.
+            @type  func:        callable
+
+            For the other parameters refer to 'counter'.
+
+            @rtype:             rce.util.metrics.Gauge
+        """
+        return self._get(name, 'gauge', doc, labels, lambda: Gauge(func))
+
+    def histogram(self, name, doc, buckets=Histogram.BUCKETS, **labels):
+        """ Get the histogram with the given name and labels.
+
+            @param buckets:     Upper bounds of the buckets which are used
+                                when the histogram is created.
+            @type  buckets:     (float)
+
+            For the other parameters refer to 'counter'.
+
+            @rtype:             rce.util.metrics.Histogram
+        """
+        return self._get(name, 'histogram', doc, labels,
+                         lambda: Histogram(buckets))
+
+    def remove(self, name, **labels):
+        """ Remove the metric with the given name and labels, e.g. when the
+            monitored object is destroyed.
+        """
+        key = tuple(sorted(labels.iteritems()))
+
+        with self._lock:
+            family = self._families.get(name)
+
+            if family:
+                family[2].pop(key, None)
+
+                if not family[2]:
+                    del self._families[name]
+
+    def render(self):
+        """ Render all metrics in the text format used by Prometheus.
+
+            @rtype:             str
+        """
+        with self._lock:
+            families = sorted((name, kind, doc, metrics.items())
+                              for name, (kind, doc, metrics)
+                              in self._families.iteritems())
+
+        lines = []
+
+        for name, kind, doc, metrics in families:
+            lines.append('# HELP {0} {1}'.format(name, doc))
+            lines.append('# TYPE {0} {1}'.format(name, kind))
+
+            for key, metric in sorted(metrics):
+                if kind == 'histogram':
+                    snapshot = metric.snapshot
+                    acc = 0
+
+                    for bound, count in snapshot['buckets']:
+                        acc += count
+                        le = '+Inf' if bound is None else repr(float(bound))
+                        lines.append('{0}_bucket{1} {2}'.format(
+                            name, _labels(key + (('le', le),)), acc))
+
+                    lines.append('{0}_sum{1} {2!r}'.format(
+                        name, _labels(key), float(snapshot['sum'])))
+                    lines.append('{0}_count{1} {2}'.format(
+                        name, _labels(key), snapshot['count']))
+                else:
+                    lines.append('{0}{1} {2!r}'.format(name, _labels(key),
+                                                       float(metric.value)))
+
+        lines.append('')
+        return '\n'.join(lines)
+
+
+def _labels(key):
+    """ Internally used function to render the labels of a metric.
+    """
+    if not key:
+        return ''
+
+    return '{{{0}}}'.format(','.join(
+        '{0}="{1}"'.format(label, str(value).replace('\\', '\\\\')
+                                            .replace('"', '\\"')
+                                            .replace('\n', '\\n'))
+        for label, value in key))
+
+
+class MetricsResource(Resource):
+    """ Twisted web.Resource which serves the metrics of a registry in the
+        text format used by Prometheus.
+    """
+    isLeaf = True
+
+    def __init__(self, registry):
+        """ Initialize the Metrics resource.
+
+            @param registry:    Registry which should be served.
+            @type  registry:    rce.util.metrics.Registry
+        """
+        Resource.__init__(self)
+        self._registry = registry
+
+    def render_GET(self, request):
+        """ This method is called by the twisted framework when a GET request
+            was received.
+        """
+        request.setHeader('content-type', 'text/plain; version=0.0.4; '
+                                          'charset=utf-8')
+        return self._registry.render()
+
+
+# Registry of this process
+registry = Registry()
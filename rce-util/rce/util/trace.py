@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     rce-util/rce/util/trace.py
+#
+#     This file is part of the RoboEarth Cloud Engine framework.
+#
+#     This file was originally created for RoboEearth
+#     http://www.roboearth.org/
+#
+#     The research leading to these results has received funding from
+#     the European Union Seventh Framework Programme FP7/2007-2013 under
+#     grant agreement no248942 RoboEarth.
+#
+#     Copyright 2013 RoboEarth
+#
+#     Licensed under the Apache License, Version 2.0 (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+#
+#     \author/s: Dominique Hunziker
+#
+#
+
+# Python specific imports
+import os
+import json
+import random
+from time import time
+from collections import deque
+from binascii import hexlify
+
+
+# Length of a trace ID in bytes
+ID_LENGTH = 8
+
+# Default argument of Tracer.record to use the current trace
+_CURRENT = object()
+
+
+class Tracer(object):
+    """ Opt-in tracer which follows sampled messages through the processing
+        stages of the cloud engine.
+
+        A trace is started for a sampled message at the entry point of a
+        process and the ID of the trace is carried along with the message to
+        the next process, e.g. in the header of the internal messages. While
+        the message is processed the trace is the current trace of the
+        tracer and each stage records its name and a timestamp into a ring
+        buffer. The timestamps are wall clock times, i.e. traces recorded in
+        different processes can only be combined if the clocks of the
+        machines are synchronized.
+    """
+    # CONFIG
+    SIZE = 100000  # Number of recorded stages which are kept
+
+    def __init__(self):
+        self.name = ''
+
+        # ID of the trace which belongs to the message which is currently
+        # processed or None if the message is not traced
+        self.current = None
+
+        self._rate = 0.0
+        self._events = deque(maxlen=self.SIZE)
+
+    def configure(self, name, rate=0.0, size=SIZE):
+        """ Configure the tracer.
+
+            @param name:        Name of the process which is used to identify
+                                the recorded stages in the exported traces.
+            @type  name:        str
+
+            @param rate:        Probability with which a new trace is started
+                                for a message. If the rate is 0, traces are
+                                only recorded for messages which have been
+                                sampled by another process.
+            @type  rate:        float
+
+            @param size:        Number of recorded stages which are kept.
+            @type  size:        int
+        """
+        self.name = name
+        self._rate = rate
+        self._events = deque(self._events, maxlen=size)
+
+    def sample(self):
+        """ Decide whether the message which is processed next should be
+            traced and set the current trace accordingly.
+
+            @return:            ID of the new trace or None if the message
+                                should not be traced.
+            @rtype:             str
+        """
+        if self._rate and random.random() < self._rate:
+            self.current = os.urandom(ID_LENGTH)
+        else:
+            self.current = None
+
+        return self.current
+
+    def record(self, stage, traceID=_CURRENT):
+        """ Record that a stage has been reached for a trace. Nothing is
+            recorded if the message is not traced.
+
+            @param stage:       Name of the reached stage.
+            @type  stage:       str
+
+            @param traceID:     ID of the trace; required if the stage is
+                                reached outside of the reactor thread, where
+                                None means that the message is not traced.
+                                The current trace is used if it is omitted.
+            @type  traceID:     str
+        """
+        if traceID is _CURRENT:
+            traceID = self.current
+
+        if traceID:
+            self._events.append((traceID, stage, time()))
+
+    def export(self, fileName):
+        """ Write the recorded traces to a file. Each line contains a JSON
+            object with the keys 'trace', 'process' and 'events', where
+            'events' is the list of the recorded stages as tuples of the stage
+            name and the timestamp in seconds. Nothing is written if no traces
+            have been recorded.
+
+            @param fileName:    Path of the file.
+            @type  fileName:    str
+        """
+        traces = {}
+        order = []
+
+        for traceID, stage, timestamp in list(self._events):
+            if traceID not in traces:
+                traces[traceID] = []
+                order.append(traceID)
+
+            traces[traceID].append((stage, timestamp))
+
+        if not order:
+            return
+
+        with open(fileName, 'w') as f:
+            for traceID in order:
+                f.write(json.dumps({'trace':hexlify(traceID),
+                                    'process':self.name,
+                                    'events':traces[traceID]}))
+                f.write('\n')
+
+
+# Tracer of this process
+tracer = Tracer()